@@ -3,11 +3,16 @@
 class for executing NASMAT problems
 """
 import os
+import re
 import sys
+import asyncio
 import subprocess
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from util.npp_settings import get_npp_settings #pylint: disable=C0413
 
+#increment progress written by the solver (e.g., "Increment 5 of 100", "INC = 5/100")
+INC_RE = re.compile(r'\bINC(?:REMENT)?\b\s*[=:#]?\s*(\d+)(?:\s*(?:OF|/)\s*(\d+))?',re.IGNORECASE)
+ERROR_STR = '*****ERROR*****'
 
 class NASMAT(): #pylint: disable=C0103
     """
@@ -46,14 +51,17 @@ class NASMAT(): #pylint: disable=C0103
             env = os.environ.copy()
 
         if h5path:
-            new_path = h5path + env["PATH"] #Windows convention
+            h5p = h5path if h5path.endswith(os.pathsep) else h5path + os.pathsep
+            new_path = h5p + env["PATH"]
             env["PATH"]=new_path
         # print(new_path)
         self.env=env
         self.echo = False
         self.mac=None
         self.proc = None
-        self._setup_env()
+        self._async_proc = None
+        self._loop = None
+        self._cancelled = False
 
     def __enter__(self):
         return self
@@ -121,6 +129,8 @@ class NASMAT(): #pylint: disable=C0103
             self.mac=[mac]
         else:
             self.mac=mac
+        if self.proc is None:
+            self._setup_env()
         #solver_cmd = self.solver + ' ' + mac
         #run_cmd = f'"{self.intel_path}" {self.intel_options} >nul 2>&1 && {solver_cmd}'
         #run_cmd = solver_cmd #Testing
@@ -157,6 +167,114 @@ class NASMAT(): #pylint: disable=C0103
             print("NASMAT executed successfully.")
 
 
+    async def run_async(self,mac):
+        """
+        function for executing NASMAT without blocking, yielding events as the solver runs.
+        Each mac file is run as its own solver process (no cmd.exe shell is kept open).
+
+        Parameters:
+            mac (str or list): mac file(s) to execute
+
+        Yields:
+            event (dict): solver event with keys
+                          'event': 'started', 'increment', 'output', 'error', or 'finished'
+                          'mac': mac file being executed
+                          'pid': solver process id ('started')
+                          'inc', 'ninc': current and total increments ('increment',
+                                         ninc is None if not written by the solver)
+                          'line': solver output line ('output', 'error')
+                          'returncode', 'cancelled': exit status ('finished')
+        """
+
+        if not isinstance(mac, list):
+            mac=[mac]
+        self.mac=mac
+        self._loop=asyncio.get_running_loop()
+        self._cancelled=False
+
+        for m in mac:
+            if self._cancelled:
+                break
+            #solver writes outputs next to the mac file, run there with the bare file name
+            wdir=os.path.dirname(os.path.abspath(m))
+            cmd=self._get_cmd(os.path.basename(m))
+            if isinstance(cmd,str):
+                proc=await asyncio.create_subprocess_shell(cmd,cwd=wdir,env=self.env,
+                                                           stdout=asyncio.subprocess.PIPE,
+                                                           stderr=asyncio.subprocess.STDOUT)
+            else:
+                proc=await asyncio.create_subprocess_exec(*cmd,cwd=wdir,env=self.env,
+                                                          stdout=asyncio.subprocess.PIPE,
+                                                          stderr=asyncio.subprocess.STDOUT)
+            self._async_proc=proc
+            try:
+                yield {'event':'started','mac':m,'pid':proc.pid}
+                async for raw in proc.stdout:
+                    line=raw.decode('utf-8',errors='replace').rstrip()
+                    yield self._parse_line(m,line)
+                returncode=await proc.wait()
+            finally:
+                #task cancelled or generator closed before the solver finished
+                if proc.returncode is None:
+                    kill_proc_tree(proc)
+                    await proc.wait()
+                self._async_proc=None
+            yield {'event':'finished','mac':m,'returncode':returncode,
+                   'cancelled':self._cancelled}
+
+    def cancel(self):
+        """
+        function to stop a run started with run_async, can be called from any thread
+
+        Parameters:
+            None.
+
+        Returns:
+            None.
+        """
+
+        self._cancelled=True
+        proc=self._async_proc
+        if proc is not None and self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(kill_proc_tree,proc)
+
+    def _get_cmd(self,mac):
+        """
+        function to get the command used to launch the solver for run_async
+
+        Parameters:
+            mac (str): mac file name, relative to the working directory of the solver
+
+        Returns:
+            cmd (list or str): command list, or shell str if the intel environment is needed
+        """
+
+        if os.name=='nt' and (self.intel_path or self.intel_options):
+            #intel environment has to be set up in the same shell as the solver
+            return f'"{self.intel_path}" {self.intel_options} >nul 2>&1 && {self.solver} "{mac}"'
+        return [self.solver,mac]
+
+    def _parse_line(self,mac,line):
+        """
+        function to convert a line of solver output to an event
+
+        Parameters:
+            mac (str): mac file being executed
+            line (str): solver output line
+
+        Returns:
+            event (dict): solver event
+        """
+
+        if ERROR_STR in line:
+            return {'event':'error','mac':mac,'line':line}
+        m=INC_RE.search(line)
+        if m:
+            ninc=int(m.group(2)) if m.group(2) else None
+            return {'event':'increment','mac':mac,'inc':int(m.group(1)),'ninc':ninc,
+                    'line':line}
+        return {'event':'output','mac':mac,'line':line}
+
     def _call_subprocess(self,run_cmd):
         """
         function for calling subprocess commands (not used)
@@ -181,6 +299,31 @@ class NASMAT(): #pylint: disable=C0103
         except Exception as e:
             raise Exception(f"An unexpected error occurred:{e}") #pylint: disable=W0707,W0719
 
+def kill_proc_tree(proc):
+    """
+    Helper function to kill a solver process and its child processes if it is still running,
+    e.g., the solver started by cmd.exe when the intel environment is set up in a shell
+
+    Parameters:
+        proc (subprocess.Popen or asyncio.subprocess.Process): solver process
+
+    Returns:
+        None.
+    """
+
+    if isinstance(proc,subprocess.Popen):
+        proc.poll()
+    if proc.returncode is not None:
+        return
+    if os.name=='nt':
+        #killing cmd.exe alone would leave the solver running
+        subprocess.run(['taskkill','/T','/F','/PID',str(proc.pid)],stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL,check=False)
+    try:
+        proc.kill()
+    except (ProcessLookupError,OSError):
+        pass
+
 if __name__ == "__main__":
 
     npps=get_npp_settings(echo=True)
@@ -1 +1,3 @@
 from .NASMAT import NASMAT
+from .nasmat_batch import NASMATBatch
+from .job_cache import JobCache
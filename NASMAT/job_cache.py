@@ -0,0 +1,282 @@
+#pylint: disable=C0103
+"""
+class for reusing NASMAT outputs of previously solved input decks
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+
+#default location and size limit of the job cache
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'),'.nasmat_prepost','job_cache')
+DEFAULT_MAX_BYTES = 10*1024**3
+
+#NASMAT output files stored for each job, names after the (MAC file or upper case) base,
+#e.g., job_1.out, job_1.h5, JOB_1_macro.data (*XYPLOT macro and micro results)
+OUTPUT_SUFFIXES = ('.out','.h5','_macro.data','_micro.data')
+
+
+class JobCache():
+    """
+    JobCache - stores NASMAT outputs keyed by a hash of the MAC file text and the solver,
+    so identical decks (e.g., repeated parameter sweep samples) are only solved once.
+
+    Note: files referenced by the MAC file (e.g., *.rot files) are not part of the key.
+    """
+    def __init__(self,cache_dir=None,max_bytes=DEFAULT_MAX_BYTES,link=True):
+        """
+        initialize class
+
+        Parameters:
+            cache_dir (str): directory holding the cached outputs
+            max_bytes (int): maximum size of the cache, least recently used entries are removed
+            link (bool): hard-link cached outputs into place (copied if linking is not possible)
+
+        Returns:
+            None.
+        """
+
+        self.cache_dir=os.path.abspath(cache_dir or DEFAULT_CACHE_DIR)
+        self.max_bytes=max_bytes
+        self.link=link
+        self._solver_ids={}
+        self._lock=threading.Lock()
+        os.makedirs(self.cache_dir,exist_ok=True)
+
+    def get_key(self,mac,solver):
+        """
+        function to get the cache key for a job
+
+        Parameters:
+            mac (str): mac file to execute
+            solver (str or list): NASMAT exectuable file, or a command list
+
+        Returns:
+            key (str): hex digest of the solver identity and mac file text
+        """
+
+        h=hashlib.sha256()
+        h.update(self._get_solver_id(solver).encode('utf-8'))
+        with open(mac,'rb') as f:
+            h.update(f.read().replace(b'\r\n',b'\n'))
+        return h.hexdigest()
+
+    def _get_solver_id(self,solver):
+        """
+        function to get a hash of the solver executable(s)
+
+        Parameters:
+            solver (str or list): NASMAT exectuable file, or a command list
+
+        Returns:
+            str: hex digest of the solver files (or the command text if not a file)
+        """
+
+        if isinstance(solver,str):
+            solver=[solver]
+        solver=tuple(solver)
+        with self._lock:
+            if solver in self._solver_ids:
+                return self._solver_ids[solver]
+
+        h=hashlib.sha256()
+        for s in solver:
+            path=shutil.which(s) or s
+            if os.path.isfile(path):
+                with open(path,'rb') as f:
+                    for block in iter(lambda f=f: f.read(1024**2),b''):
+                        h.update(block)
+            else:
+                h.update(s.encode('utf-8'))
+        with self._lock:
+            self._solver_ids[solver]=h.hexdigest()
+        return self._solver_ids[solver]
+
+    def restore(self,key,workdir,base):
+        """
+        function to place cached outputs for a job in its working directory
+
+        Parameters:
+            key (str): cache key
+            workdir (str): working directory of the job
+            base (str): mac file name without extension
+
+        Returns:
+            files (list): restored output files (None if the job is not cached)
+        """
+
+        entry=os.path.join(self.cache_dir,key)
+        try:
+            with open(os.path.join(entry,'manifest.json'),'rt',encoding='utf-8') as f:
+                manifest=json.load(f)
+        except (OSError,ValueError):
+            return None
+
+        files=[]
+        try:
+            for item in manifest['files']:
+                name=(base.upper() if item['upper'] else base)+item['suffix']
+                dst=os.path.join(workdir,name)
+                self._place(os.path.join(entry,item['stored']),dst)
+                files.append(dst)
+            os.utime(entry) #mark as recently used
+        except (OSError,KeyError,TypeError):
+            #entry evicted (e.g., by another batch sharing cache_dir) or damaged, the job is
+            #run instead of using a partial set of outputs
+            for dst in files:
+                if os.path.lexists(dst):
+                    os.remove(dst)
+            return None
+        return files
+
+    def store(self,key,workdir,base,since=0.0):
+        """
+        function to add the outputs of a finished job to the cache
+
+        Parameters:
+            key (str): cache key
+            workdir (str): working directory of the job
+            base (str): mac file name without extension
+            since (float): only files modified after this time are stored
+
+        Returns:
+            None.
+        """
+
+        entry=os.path.join(self.cache_dir,key)
+        if os.path.isdir(entry):
+            return
+
+        outputs=self._find_outputs(workdir,base,since)
+        if not outputs:
+            return
+
+        #outputs are gathered in a temporary directory so other processes never see a partial entry
+        tmp=f"{entry}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(tmp)
+            for item in outputs:
+                #always copied, the solver may later rewrite the job outputs in place
+                shutil.copy2(item.pop('src'),os.path.join(tmp,item['stored']))
+            with open(os.path.join(tmp,'manifest.json'),'wt',encoding='utf-8') as f:
+                json.dump({'files':outputs,'created':time.time()},f)
+            os.rename(tmp,entry)
+        except OSError as e:
+            if not os.path.isdir(entry):
+                print(f"Warning: unable to store NASMAT outputs in job cache: {e}")
+            shutil.rmtree(tmp,ignore_errors=True)
+            return
+
+        self.evict()
+
+    def release(self,workdir,base):
+        """
+        function to remove hard-linked cached outputs from a working directory before the
+        solver is run, so rewriting them does not modify the cache
+
+        Parameters:
+            workdir (str): working directory of the job
+            base (str): mac file name without extension
+
+        Returns:
+            None.
+        """
+
+        for item in self._find_outputs(workdir,base):
+            if os.stat(item['src']).st_nlink>1:
+                os.remove(item['src'])
+
+    def _find_outputs(self,workdir,base,since=0.0):
+        """
+        function to find the NASMAT outputs of a job
+
+        Parameters:
+            workdir (str): working directory of the job
+            base (str): mac file name without extension
+            since (float): only files modified after this time are returned
+
+        Returns:
+            outputs (list): dicts with the file path ('src'), the name after the base ('suffix'),
+                            and if the base is upper case ('upper')
+        """
+
+        outputs=[]
+        if not os.path.isdir(workdir):
+            return outputs
+        for name in sorted(os.listdir(workdir)):
+            path=os.path.join(workdir,name)
+            #only the exact output names, other jobs in workdir may share the base as a
+            #prefix (e.g., ply and ply_fine)
+            for prefix,upper in ((base,False),(base.upper(),True)):
+                suffix=name[len(prefix):]
+                if name.startswith(prefix) and suffix.lower() in OUTPUT_SUFFIXES:
+                    if os.path.isfile(path) and os.path.getmtime(path)>=since:
+                        outputs.append({'stored':f"{len(outputs)}{os.path.splitext(name)[1]}",
+                                        'upper':upper,'suffix':suffix,'src':path})
+                    break
+        return outputs
+
+    def _place(self,src,dst):
+        """
+        function to hard-link (or copy) a file
+
+        Parameters:
+            src (str): source file
+            dst (str): destination file, replaced if it exists
+
+        Returns:
+            None.
+        """
+
+        if os.path.lexists(dst):
+            os.remove(dst)
+        if self.link:
+            try:
+                os.link(src,dst)
+                return
+            except OSError: #e.g., different file systems
+                pass
+        shutil.copy2(src,dst)
+
+    def evict(self):
+        """
+        function to remove least recently used entries until the cache fits in max_bytes
+
+        Parameters:
+            None.
+
+        Returns:
+            None.
+        """
+
+        entries=[]
+        total=0
+        for key in os.listdir(self.cache_dir):
+            entry=os.path.join(self.cache_dir,key)
+            if key.endswith('.tmp') or not os.path.isdir(entry):
+                continue
+            size=sum(f.stat().st_size for f in os.scandir(entry) if f.is_file())
+            entries.append((os.path.getmtime(entry),size,entry))
+            total+=size
+
+        for _,size,entry in sorted(entries):
+            if total<=self.max_bytes:
+                break
+            shutil.rmtree(entry,ignore_errors=True)
+            total-=size
+
+    def clear(self):
+        """
+        function to remove all cached outputs
+
+        Parameters:
+            None.
+
+        Returns:
+            None.
+        """
+
+        for key in os.listdir(self.cache_dir):
+            shutil.rmtree(os.path.join(self.cache_dir,key),ignore_errors=True)
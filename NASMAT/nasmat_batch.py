@@ -0,0 +1,289 @@
+#pylint: disable=C0103
+"""
+class for executing many NASMAT problems in parallel
+"""
+import os
+import sys
+import time
+import queue
+import shutil
+import threading
+import argparse
+import subprocess
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from util.npp_settings import get_npp_settings #pylint: disable=C0413
+from .job_cache import JobCache #pylint: disable=C0413
+from .NASMAT import kill_proc_tree #pylint: disable=C0413
+
+
+class NASMATBatch(): #pylint: disable=R0902
+    """
+    NASMATBatch - executes a queue of NASMAT *.MAC files with several solver processes at once
+    """
+    def __init__(self,solver,h5path='',intel_path='',intel_options='',clean_cmd=False, #pylint: disable=R0913,R0917
+                 njobs=None,solver_threads=1,timeout=None,retries=0,progress=None,cache=None):
+        """
+        initialize class
+
+        Parameters:
+            solver (str or list): NASMAT exectuable file, or a command list
+                                  (e.g., [sys.executable, 'stub_solver.py'] for testing)
+            h5path (str): location of the hdf5 shared libraries
+            intel_path (str): location of setvars.bat (OneAPI) or ifortvars.bat (older
+                              compilers), only used on Windows
+            intel_options (str): space-delimeted str of intel options to pass to
+                                 intel_path *.bat file (e.g., "intel64 vs2022")
+            clean_cmd (bool): flag to overwrite current OS environment with clean one
+            njobs (int): number of solver processes run at once
+                         (defaults to number of cores / solver_threads)
+            solver_threads (int): number of threads used by each solver process
+            timeout (float): maximum time (seconds) allowed per job, no limit if None
+            retries (int): number of times a failed or timed out job is rerun
+            progress (callable): called as progress(job, ndone, ntotal) after each job finishes
+            cache (JobCache): cache of previously solved decks, outputs are reused instead of
+                              rerunning the solver (no caching if None)
+
+        Returns:
+            None.
+        """
+
+        if isinstance(solver,str):
+            solver=[solver]
+        self.solver=list(solver)
+        self.intel_path=intel_path
+        self.intel_options=intel_options
+        self.solver_threads=max(1,int(solver_threads))
+        if not njobs:
+            njobs=max(1,(os.cpu_count() or 1)//self.solver_threads)
+        self.njobs=njobs
+        self.timeout=timeout
+        self.retries=retries
+        self.progress=progress
+        self.cache=cache
+        self.force=False
+        self.echo=False
+        self.jobs=[]
+
+        if clean_cmd:
+            env={"PATH":''}
+        else:
+            env = os.environ.copy()
+
+        if h5path:
+            h5p = h5path if h5path.endswith(os.pathsep) else h5path + os.pathsep
+            env["PATH"]=h5p + env.get("PATH",'')
+            if os.name!='nt': #shared libraries are found through LD_LIBRARY_PATH on Linux
+                env["LD_LIBRARY_PATH"]=h5p + env.get("LD_LIBRARY_PATH",'')
+        env["OMP_NUM_THREADS"]=str(self.solver_threads)
+        self.env=env
+
+        self._queue=queue.Queue()
+        self._lock=threading.Lock()
+        self._ndone=0
+        self._ntotal=0
+
+    def add(self,mac,workdir=None):
+        """
+        function to add a job to the queue
+
+        Parameters:
+            mac (str): mac file to execute
+            workdir (str): working directory for the job, the mac file is copied into it
+                           if needed (defaults to the directory of the mac file)
+
+        Returns:
+            job (dict): job information, updated when the job is run
+        """
+
+        mac=os.path.abspath(mac)
+        if workdir:
+            workdir=os.path.abspath(workdir)
+            os.makedirs(workdir,exist_ok=True)
+            if os.path.dirname(mac)!=workdir:
+                shutil.copy2(mac,workdir)
+        else:
+            workdir=os.path.dirname(mac)
+
+        job={'id':len(self.jobs),'mac':os.path.basename(mac),'workdir':workdir,
+             'status':'queued','returncode':None,'attempts':0,'elapsed':0.0,'cached':False,
+             'log':os.path.join(workdir,os.path.splitext(os.path.basename(mac))[0]+'.log')}
+        self.jobs.append(job)
+        return job
+
+    def run(self,mac=None,echo=True,force=False):
+        """
+        function for executing all queued NASMAT jobs
+
+        Parameters:
+            mac (str or list): optional mac file(s) to add to the queue before running
+            echo (bool): flag to print job status to screen
+            force (bool): flag to run the solver even if outputs are in the cache
+
+        Returns:
+            jobs (list): job information for all jobs
+        """
+
+        self.echo=echo
+        self.force=force
+        if mac:
+            if not isinstance(mac, list):
+                mac=[mac]
+            for m in mac:
+                self.add(m)
+
+        todo=[job for job in self.jobs if job['status']=='queued']
+        self._ndone=0
+        self._ntotal=len(todo)
+        for job in todo:
+            self._queue.put(job)
+
+        workers=[threading.Thread(target=self._worker,daemon=True)
+                 for _ in range(min(self.njobs,len(todo)))]
+        for w in workers:
+            w.start()
+        self._queue.join()
+
+        if self.echo:
+            nfail=sum(1 for job in todo if job['status']!='finished')
+            print(f"NASMAT batch complete: {len(todo)-nfail} of {len(todo)} jobs "
+                  "executed successfully.")
+
+        return self.jobs
+
+    def _worker(self):
+        """
+        function run by each worker thread, executes jobs until the queue is empty
+
+        Parameters:
+            None.
+
+        Returns:
+            None.
+        """
+
+        while True:
+            try:
+                job=self._queue.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                self._run_job(job)
+                if job['status']!='finished' and job['attempts']<=self.retries:
+                    if self.echo:
+                        print(f"Retrying NASMAT job {job['id']} ({job['mac']})...")
+                    job['status']='queued'
+                    self._queue.put(job)
+                else:
+                    with self._lock:
+                        self._ndone+=1
+                        ndone=self._ndone
+                    if self.echo:
+                        cached=' (cached)' if job['cached'] else ''
+                        print(f"NASMAT job {job['id']} ({job['mac']}): {job['status']}{cached}")
+                    if self.progress:
+                        self.progress(job,ndone,self._ntotal)
+            finally:
+                self._queue.task_done()
+
+    def _get_cmd(self,mac):
+        """
+        function to get the command used to launch the solver
+
+        Parameters:
+            mac (str): mac file to execute
+
+        Returns:
+            cmd (list or str): command passed to subprocess
+        """
+
+        cmd=self.solver+[mac]
+        if os.name=='nt' and (self.intel_path or self.intel_options):
+            #intel environment has to be set up in the same shell as the solver
+            solver_cmd=subprocess.list2cmdline(cmd)
+            return f'"{self.intel_path}" {self.intel_options} >nul 2>&1 && {solver_cmd}'
+        return cmd
+
+    def _run_job(self,job):
+        """
+        function to execute a single NASMAT job
+
+        Parameters:
+            job (dict): job information
+
+        Returns:
+            None.
+        """
+
+        job['attempts']+=1
+        job['status']='running'
+        base=os.path.splitext(job['mac'])[0]
+        key=None
+        if self.cache is not None:
+            key=self.cache.get_key(os.path.join(job['workdir'],job['mac']),self.solver)
+            if not self.force and self.cache.restore(key,job['workdir'],base) is not None:
+                job['status']='finished'
+                job['returncode']=0
+                job['cached']=True
+                return
+            self.cache.release(job['workdir'],base)
+
+        cmd=self._get_cmd(job['mac'])
+        start=time.time()
+        try:
+            with open(job['log'],'w',encoding='utf-8') as log, \
+                 subprocess.Popen(cmd,cwd=job['workdir'],env=self.env,
+                                  stdout=log,stderr=subprocess.STDOUT,
+                                  shell=isinstance(cmd,str)) as proc:
+                try:
+                    proc.wait(timeout=self.timeout)
+                finally:
+                    #on timeout the solver (not only cmd.exe) must stop writing to workdir
+                    kill_proc_tree(proc)
+            job['returncode']=proc.returncode
+            if proc.returncode!=0:
+                job['status']='failed'
+            elif self._log_has_error(job['log']):
+                job['status']='error'
+            else:
+                job['status']='finished'
+        except subprocess.TimeoutExpired:
+            job['status']='timeout'
+        except OSError as e:
+            print(f"Error launching NASMAT job {job['id']}: {e}")
+            job['status']='failed'
+        job['elapsed']=time.time()-start
+
+        if key is not None and job['status']=='finished':
+            self.cache.store(key,job['workdir'],base,since=start)
+
+    def _log_has_error(self,log):
+        """
+        function to check solver output for NASMAT errors
+
+        Parameters:
+            log (str): solver output file
+
+        Returns:
+            bool: True if an error was reported
+        """
+
+        with open(log,'rt',encoding='utf-8',errors='replace') as f:
+            return any('*****ERROR*****' in line for line in f)
+
+
+if __name__ == "__main__":
+
+    #run as: python -m NASMAT.nasmat_batch [--force] job_1.MAC job_2.MAC ...
+    parser=argparse.ArgumentParser(description='Run NASMAT *.MAC files in parallel.')
+    parser.add_argument('mac',nargs='+',help='mac files to execute')
+    parser.add_argument('--njobs',type=int,default=None,help='number of solver processes')
+    parser.add_argument('--cache-dir',default=None,help='directory of the job cache')
+    parser.add_argument('--no-cache',action='store_true',help='do not use the job cache')
+    parser.add_argument('--force',action='store_true',help='rerun jobs found in the job cache')
+    args=parser.parse_args()
+
+    npps=get_npp_settings(echo=True)
+    batch=NASMATBatch(npps['NASMAT_SOLVER'],npps['HDF5_PATH'],
+                      npps.get('INTEL_PATH',''),npps.get('INTEL_OPTS',''),njobs=args.njobs,
+                      cache=None if args.no_cache else JobCache(args.cache_dir))
+    batch.run(mac=args.mac,force=args.force)
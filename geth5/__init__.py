@@ -1 +1 @@
-from .geth5 import GetH5
+from .geth5 import GetH5, add_file_callback
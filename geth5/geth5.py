@@ -1,8 +1,44 @@
 """ class for getting NASMAT hdf5 results."""
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 import h5py
 import numpy as np
+from .h5_index import H5Index, strip_inc
+
+#functions called (without arguments) before a GetH5 file is opened or closed, e.g., to
+#clear results cached for a previous file with the same name
+_FILE_CALLBACKS = []
+
+
+def add_file_callback(func):
+    """
+    adds a function called before any GetH5 file is opened or closed
+
+    Parameters:
+        func (callable): function with no arguments
+
+    Returns:
+        None.
+    """
+
+    if func not in _FILE_CALLBACKS:
+        _FILE_CALLBACKS.append(func)
+
+
+def _run_file_callbacks():
+    """
+    calls the functions added with add_file_callback
+
+    Parameters:
+        None.
+
+    Returns:
+        None.
+    """
+
+    for func in list(_FILE_CALLBACKS):
+        func()
 
 
 def vfunc(name, obj):
@@ -32,7 +68,7 @@ class GetH5():
     """
     gets HDF5 files (*.h5) and results
     """
-    def __init__(self,h5name='',visit=False, echo = True):
+    def __init__(self,h5name='',visit=False, echo = True, index_dir=None):
         """
         initialize class
 
@@ -40,6 +76,8 @@ class GetH5():
             h5name (str): h5 file name including extension.
             visit (bool): option to visit h5 file and print relevant information.
             echo (bool): option to control screen printing.
+            index_dir (str): directory for the h5 index sidecar file
+                             (defaults to the directory of h5name)
         
         Returns:
             None.
@@ -50,6 +88,11 @@ class GetH5():
         print(f"Reading HDF5 file:{h5name}")
         self.h5name=h5name
         self.echo=echo
+        self.index_dir=index_dir
+        self.index=None
+        self.groups={}
+        self.group_pids={}
+        _run_file_callbacks()
         self.file=h5py.File(self.h5name, "r")
         self._get_h5_struct()
         self.ninc=max(self.h5_struct['incs'])
@@ -83,6 +126,20 @@ class GetH5():
         if self.echo:
             print(f"Total h5 setup time: {elapsed_time:.4f} seconds")
 
+    def close(self):
+        """
+        closes the h5 file
+
+        Parameters:
+            None.
+
+        Returns:
+            None.
+        """
+
+        _run_file_callbacks()
+        self.file.close()
+
     def setup_mac(self):
         """
         creates mac dict based on h5 content
@@ -341,36 +398,6 @@ class GetH5():
         if search_string in name:
             found_paths.append(name)
 
-    def collect_paths(self, name, obj):
-        """
-        visitor function to grab all paths from h5 file 
-
-        Parameters:
-            name (str): object name
-            obj (various): h5 data object 
-        
-        Returns:
-            None.
-        """
-
-        if isinstance(obj, h5py.Dataset):
-            if name.startswith('NASMAT Data'):
-                grp_path= "/".join(name.split("/")[:-1])
-                self.path_list.add(grp_path)
-            elif name.startswith('NASMAT Materials'):
-                grp_path= "/".join(name.split("/")[:-2])
-                self.path_list.add(grp_path)
-            elif name.startswith('NASMAT RUCs'):
-                grp_path= "/".join(name.split("/")[:-1])
-                self.path_list.add(grp_path)
-            elif name.startswith('NASMAT INPUT DECKS'):
-                if 'NASMAT Materials' in name:
-                    icut = -2
-                else:
-                    icut = -1
-                grp_path= "/".join(name.split("/")[:icut])
-                self.path_list.add(grp_path)
-
     def _get_h5_struct(self):
         """
         function determine h5 data structure 
@@ -389,25 +416,15 @@ class GetH5():
             print('Error with H5 file, no RUC data available!')
             return
 
-        reset_paths = False #for debugging
-        if "path_index" not in self.file or reset_paths:
-            print('path_index not found in h5 file, creating and appending to file...')
-            self.file.close()
-            self.file=h5py.File(self.h5name, "a")
-            if reset_paths and 'path_index' in self.file:
-                del self.file['path_index']
-            self.path_list = set()
-            self.file.visititems(self.collect_paths)
-            str_dtype = h5py.string_dtype(encoding='utf-8')
-            grps=sorted(self.path_list)
-            self.file.create_dataset("path_index", data=grps, dtype=str_dtype)
-            self.file.close()
-            self.file=h5py.File(self.h5name, "r")
-            file=self.file
-
-
-        pi = self.file["path_index"][:]
-        self.path_index=[path.decode('utf-8') for path in pi]
+        #index is kept outside of the h5 file, which is only ever opened read-only
+        self.index=H5Index(self.h5name,file=self.file,index_dir=self.index_dir,echo=self.echo)
+        self.path_index=self.index.path_index
+
+        #lookup tables to avoid string searches when getting data
+        self.groups=self.index.get_group_table()
+        self.group_pids={}
+        for key in self.groups:
+            self.group_pids.setdefault(key[:2]+key[3:],key[2])
 
         search_list = []
         search_list = [path for path in self.path_index if 'Parent' in path]
@@ -479,28 +496,8 @@ class GetH5():
             ia,ib,ig=self._indices_from_ic(ic,nb,ng)
         else:
             ia,ib,ig=ind
-            pstr=f"MSM={msm}, IA={ia}, IB={ib}, IG={ig}, IPA={ipa}, IPB={ipb}, IPG={ipg}"
             #find pid at level from msm, indices -> assumes group names are unique!!!
-
-            #original method - visit function slow for large data sets,
-            #                  visiting all items recursively
-            # search_list = []
-            # self.file[hgrp].visititems(lambda name,
-            #                   obj: self.find_paths_with_string(name, pstr, search_list))
-            # resall = [l for l in search_list if len(l.split('/'))==1]
-            # # print('ind: ', ind)
-            # # print('res: ', resall)
-            # respt=resall[0]
-
-            #new method
-            respt=None
-            for name in self.file[hgrp].keys():
-                if pstr in name:
-                    respt=name
-                    break
-
-            pid=int(respt.split(',')[0].split('=')[1])
-
+            pid=self._find_pid(grp,lvl,msm,ia,ib,ig,ipa,ipb,ipg)
 
         h5str=(hgrp
                 +f"Parent RUCID={pid}, RUCDef MSM={msm}, IA={ia}, IB={ib}, IG={ig}, "
@@ -510,6 +507,60 @@ class GetH5():
         #       +f"/Inc={inc+1}")
         return h5str
 
+    def _find_pid(self,macro,lvl,msm,ia,ib,ig,ipa,ipb,ipg):
+        """
+        function to find the parent ruc id of a data group
+
+        Parameters:
+            macro (str): MacroAPI group name (None for standalone files)
+            lvl (int): NASMAT level
+            msm (int): actual material number
+            ia,ib,ig (int): subvol indices in the 1-, 2-, and 3-directions
+            ipa,ipb,ipg (int): integration point numbers in three directions
+
+        Returns:
+            pid (int): parent ruc id
+        """
+
+        key=(macro,lvl,msm,ia,ib,ig,ipa,ipb,ipg)
+        try:
+            return self.group_pids[key]
+        except KeyError:
+            raise KeyError(f"No h5 data group found for (macro, level, msm, ia, ib, ig, "
+                           f"ipa, ipb, ipg)={key}") from None
+
+    def locate(self,level,msm,ia,ib,ig,ipa=1,ipb=1,ipg=1,pid=None,macro=None,inc=None):
+        """
+        function to get a data group from its NASMAT keys
+
+        Parameters:
+            level (int): NASMAT level
+            msm (int): actual material number
+            ia,ib,ig (int): subvol indices in the 1-, 2-, and 3-directions
+            ipa,ipb,ipg (int): integration point numbers in three directions
+            pid (int): parent ruc id (found from the other keys if not given)
+            macro (str): MacroAPI group name (None for standalone files)
+            inc (int): increment number, returns the group for all increments if not given
+
+        Returns:
+            h5py.Group: data group
+        """
+
+        if pid is None:
+            pid=self._find_pid(macro,level,msm,ia,ib,ig,ipa,ipb,ipg)
+
+        key=(macro,level,pid,msm,ia,ib,ig,ipa,ipb,ipg)
+        try:
+            grp=self.groups[key]
+        except KeyError:
+            raise KeyError(f"No h5 data group found for (macro, level, pid, msm, ia, ib, ig, "
+                           f"ipa, ipb, ipg)={key}") from None
+
+        if inc is not None:
+            grp=grp+f"/Inc={inc}"
+
+        return self.file[grp]
+
     def get_data_by_str(self,h5str):
         """
         function get h5 data based on string 
@@ -523,6 +574,142 @@ class GetH5():
 
         return self.file[h5str]
 
+    def get_history(self,location,var,comp=None,incs=None,nthreads=None):
+        """
+        function to get a field variable for many increments in one array
+
+        Parameters:
+            location (str or tuple): data group path (with or without Inc=#) or
+                                     key from self.groups
+            var (str): variable name (e.g., 'Stress')
+            comp (int): 0-based component index, a value equal to the number of
+                        components returns the magnitude, all components if None
+            incs (slice or list): 1-based increments to read (slice is applied to all
+                                  increments in the file), all increments if None
+            nthreads (int): number of threads used for reading increments
+                            (h5py serializes file access, mainly useful for compressed data)
+
+        Returns:
+            data (np.ndarray): field data with shape (number of increments, ...)
+        """
+
+        if isinstance(location,tuple):
+            grp=self.groups[location]
+        else:
+            grp=strip_inc(location)
+
+        all_incs=self.h5_struct['incs']
+        if incs is None:
+            inc_list=all_incs
+        elif isinstance(incs,slice):
+            inc_list=all_incs[incs]
+        else:
+            inc_list=[int(i) for i in incs]
+
+        dset0=self.file[f"{grp}/Inc={inc_list[0]}/{var}"]
+        shape=dset0.shape
+        ncomp=shape[-1]
+        mag=comp is not None and comp>ncomp-1
+        if comp is None or mag:
+            src_sel=np.s_[...]
+            out_shape=shape
+        else:
+            src_sel=np.s_[...,comp]
+            out_shape=shape[:-1]
+
+        data=np.empty((len(inc_list),)+out_shape,dtype=dset0.dtype)
+
+        def _read(i):
+            dset=self.file[f"{grp}/Inc={inc_list[i]}/{var}"]
+            dset.read_direct(data,source_sel=src_sel,dest_sel=np.s_[i])
+
+        if nthreads and nthreads>1:
+            with ThreadPoolExecutor(max_workers=nthreads) as pool:
+                list(pool.map(_read,range(len(inc_list))))
+        else:
+            for i in range(len(inc_list)):
+                _read(i)
+
+        if mag:
+            data=np.linalg.norm(data,axis=-1)
+
+        return data
+
+    def gather(self,var,inc,level,msm,ia,ib,ig,index=None,comp=None,ipa=1,ipb=1,ipg=1, #pylint: disable=R0913,R0914,R0917
+               pid=None,macro=None):
+        """
+        function to get a field variable for many data groups in one flat array.
+        Each data group is read once, no matter how many entries refer to it.
+
+        Parameters:
+            var (str): variable name (e.g., 'Stress')
+            inc (int): 1-based increment number
+            level,msm,ia,ib,ig (int or np.ndarray): NASMAT keys of each entry
+            index (np.ndarray): leading dataset indices of each entry with shape (n,k),
+                                the full dataset is used for each entry if None
+            comp (int): 0-based component index, a value equal to the number of
+                        components returns the magnitude, all components if None
+            ipa,ipb,ipg (int or np.ndarray): integration point numbers in three directions
+            pid (int or np.ndarray): parent ruc ids, found from the other keys if None or < 0
+            macro (str): MacroAPI group name (None for standalone files)
+
+        Returns:
+            data (np.ndarray): flattened values of each entry, in entry order
+        """
+
+        if pid is None:
+            pid=-1
+        keys=[np.atleast_1d(np.asarray(k,dtype=np.int64)) for k in
+              (level,pid,msm,ia,ib,ig,ipa,ipb,ipg)]
+        if index is not None:
+            index=np.asarray(index,dtype=np.int64)
+            index=index.reshape(index.shape[0],-1)
+            keys.append(np.zeros(index.shape[0],dtype=np.int64)) #entries set by index
+        keys=np.column_stack(np.broadcast_arrays(*keys))[:,:9]
+        ukeys,inv=np.unique(keys,axis=0,return_inverse=True)
+        inv=inv.ravel()
+
+        #read each data group once
+        blocks=[]
+        for key in ukeys.tolist():
+            lvl,p,m,a,b,g,pa,pb,pg=key
+            if p<0:
+                p=self._find_pid(macro,lvl,m,a,b,g,pa,pb,pg)
+            try:
+                grp=self.groups[(macro,lvl,p,m,a,b,g,pa,pb,pg)]
+            except KeyError:
+                raise KeyError(f"No h5 data group found for (macro, level, pid, msm, ia, ib, ig, "
+                               f"ipa, ipb, ipg)={(macro,lvl,p,m,a,b,g,pa,pb,pg)}") from None
+            dset=self.file[f"{grp}/Inc={inc}/{var}"]
+            mag=comp is not None and comp>dset.shape[-1]-1
+            if comp is None or mag:
+                block=dset[()]
+            else:
+                block=np.empty(dset.shape[:-1],dtype=dset.dtype)
+                dset.read_direct(block,source_sel=np.s_[...,comp])
+            if mag:
+                block=np.linalg.norm(block,axis=-1)
+            blocks.append(block)
+
+        #values of each entry
+        if index is None:
+            sizes=np.array([block.size for block in blocks],dtype=np.int64)[inv]
+        else:
+            sizes=np.array([block[tuple([0]*index.shape[1])].size for block in blocks],
+                           dtype=np.int64)[inv]
+        start=np.concatenate([[0],np.cumsum(sizes)])
+        dtype=np.result_type(*blocks) if blocks else np.float64
+        data=np.empty(start[-1],dtype=dtype)
+        for i,block in enumerate(blocks):
+            rows=np.flatnonzero(inv==i)
+            if index is None:
+                vals=np.broadcast_to(block.ravel(),(rows.size,block.size))
+            else:
+                vals=block[tuple(index[rows].T)].reshape(rows.size,-1)
+            data[start[rows][:,None]+np.arange(vals.shape[1])[None,:]]=vals
+
+        return data
+
     def get_number_incs(self):
         """
         function to calculate number of increments 
@@ -0,0 +1,351 @@
+""" class for indexing NASMAT hdf5 files without modifying them."""
+import os
+import re
+import time
+import h5py
+import numpy as np
+
+#version of the sidecar layout, bump if the stored content changes
+INDEX_VERSION = 1
+
+#columns of the parsed key array (macro is an index into H5Index.macros, -1 if standalone)
+KEY_FIELDS = ('macro','level','pid','msm','ia','ib','ig','ipa','ipb','ipg','inc')
+
+_LEVEL_RE = re.compile(r'^Level=(-?\d+)$')
+_GRP_RE = re.compile(r'^Parent RUCID=(-?\d+), RUCDef MSM=(-?\d+), IA=(-?\d+), IB=(-?\d+), '
+                     r'IG=(-?\d+), IPA=(-?\d+), IPB=(-?\d+), IPG=(-?\d+)$')
+_INC_RE = re.compile(r'^Inc=(-?\d+)$')
+
+
+def get_group_path(name):
+    """
+    function to get the indexed group path for a dataset in a NASMAT h5 file
+
+    Parameters:
+        name (str): full path of the dataset in the h5 file
+
+    Returns:
+        grp_path (str): group path to index (None if dataset is not indexed)
+    """
+
+    if name.startswith('NASMAT Data') or name.startswith('NASMAT RUCs'):
+        icut = -1
+    elif name.startswith('NASMAT Materials'):
+        icut = -2
+    elif name.startswith('NASMAT INPUT DECKS'):
+        if 'NASMAT Materials' in name:
+            icut = -2
+        else:
+            icut = -1
+    else:
+        return None
+
+    return "/".join(name.split("/")[:icut])
+
+
+def strip_inc(path):
+    """
+    function to remove the increment group from a NASMAT data path
+
+    Parameters:
+        path (str): path in h5 file, possibly containing an Inc=# group
+
+    Returns:
+        str: path with the Inc=# group removed
+    """
+
+    return "/".join(p for p in path.split("/") if not _INC_RE.match(p))
+
+
+def parse_path(path,macros):
+    """
+    function to parse the NASMAT keys from a data group path
+
+    Parameters:
+        path (str): group path in h5 file
+        macros (list): macro group names found so far, appended to if a new one is found
+
+    Returns:
+        key (list): ints in the order of KEY_FIELDS, -1 where not present
+    """
+
+    key = [-1]*len(KEY_FIELDS)
+    parts = path.split("/")
+    if parts[0] != 'NASMAT Data':
+        return key
+
+    for i,p in enumerate(parts[1:]):
+        m = _LEVEL_RE.match(p)
+        if m:
+            key[1] = int(m.group(1))
+            continue
+        m = _GRP_RE.match(p)
+        if m:
+            key[2:10] = [int(v) for v in m.groups()]
+            continue
+        m = _INC_RE.match(p)
+        if m:
+            key[10] = int(m.group(1))
+            continue
+        if i == 0: #MacroAPI files nest the data under one group per element/int. pt.
+            if p not in macros:
+                macros.append(p)
+            key[0] = macros.index(p)
+
+    return key
+
+
+class H5Index():
+    """
+    H5Index - index of the group paths, NASMAT keys and dataset shapes in an h5 file.
+
+    The index is stored in a sidecar file next to the h5 file (or in index_dir) and
+    reused as long as the size and modification time of the h5 file do not change.
+    The h5 file itself is never modified.
+    """
+    def __init__(self,h5name,file=None,index_dir=None,use_sidecar=True,echo=True):
+        """
+        initialize class
+
+        Parameters:
+            h5name (str): h5 file name including extension.
+            file (h5py.File): already opened h5 file (opened read-only if not given)
+            index_dir (str): directory for the sidecar file (defaults to the h5 directory)
+            use_sidecar (bool): option to read/write the sidecar file, in-memory only if False
+            echo (bool): option to control screen printing.
+
+        Returns:
+            None.
+        """
+
+        self.h5name=h5name
+        self.echo=echo
+        self.use_sidecar=use_sidecar
+        self.path_index=[]
+        self.macros=[]
+        self.keys=np.zeros((0,len(KEY_FIELDS)),dtype=np.int64)
+        self.shapes={}
+
+        if index_dir:
+            self.sidecar=os.path.join(index_dir,os.path.basename(h5name)+'.idx')
+        else:
+            self.sidecar=h5name+'.idx'
+
+        close_file = file is None
+        if close_file:
+            file=h5py.File(h5name,'r')
+
+        try:
+            self._load(file)
+        finally:
+            if close_file:
+                file.close()
+
+    def _load(self,file):
+        """
+        function to load the index from the fastest available source
+
+        Parameters:
+            file (h5py.File): opened h5 file
+
+        Returns:
+            None.
+        """
+
+        begin_time = time.time()
+        if 'path_index' in file:
+            #older files had the index appended to the results file
+            src='path_index'
+            pi = file['path_index'][:]
+            self.path_index=[path.decode('utf-8') for path in pi]
+            self._parse_keys()
+        elif self.use_sidecar and self._read_sidecar():
+            src=self.sidecar
+        else:
+            src='h5 visit'
+            self._build(file)
+            if self.use_sidecar:
+                self._write_sidecar()
+
+        if self.echo:
+            print(f"H5 index loaded from {src} in {time.time()-begin_time:.4f} seconds")
+
+    def _source_stat(self):
+        """
+        function to get the values used to check if the sidecar is up to date
+
+        Parameters:
+            None.
+
+        Returns:
+            size (int): size of h5 file in bytes
+            mtime (float): modification time of the h5 file
+        """
+
+        st=os.stat(self.h5name)
+        return st.st_size,st.st_mtime
+
+    def _parse_keys(self):
+        """
+        function to parse the NASMAT keys for all paths in path_index
+
+        Parameters:
+            None.
+
+        Returns:
+            None.
+        """
+
+        self.macros=[]
+        keys=[parse_path(path,self.macros) for path in self.path_index]
+        self.keys=np.array(keys,dtype=np.int64).reshape(-1,len(KEY_FIELDS))
+
+    def _build(self,file):
+        """
+        function to build the index in a single pass over the h5 file
+
+        Parameters:
+            file (h5py.File): opened h5 file
+
+        Returns:
+            None.
+        """
+
+        path_list=set()
+        shapes={}
+        fid=file.id
+
+        def _visit(name,info):
+            if info.type != h5py.h5o.TYPE_DATASET:
+                return None
+            name=name.decode('utf-8')
+            grp_path=get_group_path(name)
+            if grp_path is None:
+                return None
+            path_list.add(grp_path)
+            #shapes are stored once per dataset, not per increment
+            shape_key=strip_inc(name)
+            if shape_key not in shapes:
+                shapes[shape_key]=h5py.h5d.open(fid,name.encode('utf-8')).shape
+            return None
+
+        h5py.h5o.visit(fid,_visit,info=True)
+
+        self.path_index=sorted(path_list)
+        self.shapes=shapes
+        self._parse_keys()
+
+    def _read_sidecar(self):
+        """
+        function to read the sidecar index file if it is up to date
+
+        Parameters:
+            None.
+
+        Returns:
+            bool: True if the sidecar was read
+        """
+
+        if not os.path.isfile(self.sidecar):
+            return False
+
+        try:
+            with h5py.File(self.sidecar,'r') as f:
+                size,mtime=self._source_stat()
+                if (f.attrs['version'] != INDEX_VERSION or
+                    f.attrs['source_size'] != size or
+                    f.attrs['source_mtime'] != mtime or
+                    f.attrs['source_name'] != os.path.basename(self.h5name)):
+                    if self.echo:
+                        print(f"H5 index {self.sidecar} is out of date, rebuilding...")
+                    return False
+
+                self.path_index=f['paths'].asstr()[()].tolist()
+                self.macros=f['macros'].asstr()[()].tolist()
+                self.keys=f['keys'][()].reshape(-1,len(KEY_FIELDS))
+                dims=f['shape_dims'][()]
+                self.shapes={name:tuple(int(i) for i in dim if i>=0) for name,dim in
+                             zip(f['shape_paths'].asstr()[()].tolist(),dims)}
+        except (OSError,KeyError) as e:
+            print(f"Warning: unable to read H5 index {self.sidecar}: {e}")
+            return False
+
+        return True
+
+    def _write_sidecar(self):
+        """
+        function to write the sidecar index file
+
+        Parameters:
+            None.
+
+        Returns:
+            None.
+        """
+
+        str_dtype = h5py.string_dtype(encoding='utf-8')
+        shape_paths=sorted(self.shapes.keys())
+        maxdim=max([len(self.shapes[name]) for name in shape_paths],default=0)
+        dims=np.full((len(shape_paths),maxdim),-1,dtype=np.int64)
+        for i,name in enumerate(shape_paths):
+            dims[i,:len(self.shapes[name])]=self.shapes[name]
+
+        tmpname=self.sidecar+'.tmp'
+        try:
+            size,mtime=self._source_stat()
+            with h5py.File(tmpname,'w') as f:
+                f.attrs['version']=INDEX_VERSION
+                f.attrs['source_size']=size
+                f.attrs['source_mtime']=mtime
+                f.attrs['source_name']=os.path.basename(self.h5name)
+                f.create_dataset('paths',data=self.path_index,dtype=str_dtype)
+                f.create_dataset('macros',data=self.macros,dtype=str_dtype)
+                f.create_dataset('keys',data=self.keys)
+                f.create_dataset('shape_paths',data=shape_paths,dtype=str_dtype)
+                f.create_dataset('shape_dims',data=dims)
+            os.replace(tmpname,self.sidecar)
+        except OSError as e:
+            #e.g., read-only archive mounts, index is kept in memory only
+            print(f"Warning: unable to write H5 index {self.sidecar}: {e}")
+            if os.path.isfile(tmpname):
+                os.remove(tmpname)
+
+    def get_shape(self,path):
+        """
+        function to get the shape of a dataset from the index
+
+        Parameters:
+            path (str): dataset path in h5 file (with or without the Inc=# group)
+
+        Returns:
+            tuple: dataset shape (None if not stored in the index)
+        """
+
+        return self.shapes.get(strip_inc(path))
+
+    def get_group_table(self):
+        """
+        function to get a lookup table of the NASMAT data groups
+
+        Parameters:
+            None.
+
+        Returns:
+            groups (dict): group path (without Inc=#) for each
+                           (macro, level, pid, msm, ia, ib, ig, ipa, ipb, ipg) key,
+                           macro is None for standalone NASMAT files
+        """
+
+        groups={}
+        rows=np.flatnonzero(self.keys[:,2]>=0)
+        if rows.size==0:
+            return groups
+
+        #only need one path per group, not one per increment
+        _,first=np.unique(self.keys[rows,:10],axis=0,return_index=True)
+        for i in rows[np.sort(first)]:
+            k=self.keys[i].tolist()
+            macro=self.macros[k[0]] if k[0]>=0 else None
+            groups[(macro,*k[1:10])]=strip_inc(self.path_index[i])
+
+        return groups
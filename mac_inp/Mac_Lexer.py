@@ -0,0 +1,162 @@
+"""class for reading MAC files once and parsing their numeric rows""" #pylint: disable=C0103
+import warnings
+import numpy as np
+from .Get_After_EqSign import get_after_eqsign
+
+class MacLexer():
+    """
+    MacLexer - MAC file held in memory as lines, read from disk only once.
+
+    The keyword readers (Read_RUC, Read_Mech, etc.) use it like an opened file (readline,
+    tell, seek), where positions are line numbers. keyword_blocks gives the line offsets of
+    each keyword so the file does not have to be scanned again between keywords.
+    """
+    def __init__(self,name=None,text=None):
+        """
+        initialize class
+
+        Parameters:
+            name (str): MAC file name, read if text is not given
+            text (str): MAC file contents
+
+        Returns:
+            None.
+        """
+
+        if text is None:
+            with open(name,'r', encoding='utf-8') as f:
+                text=f.read()
+        else: #same newlines as writing and reading the text with open
+            text=text.replace('\r\n','\n').replace('\r','\n')
+
+        #lines with their newline, as from readlines
+        self.lines=text.split('\n')
+        if self.lines[-1]:
+            self.lines=[line+'\n' for line in self.lines[:-1]]+[self.lines[-1]]
+        else:
+            self.lines=[line+'\n' for line in self.lines[:-1]]
+        self.pos=0
+
+    def readline(self):
+        """
+        function to read the next line
+
+        Parameters:
+            None.
+
+        Returns:
+            str: line including the newline, '' at the end of the file
+        """
+
+        if self.pos>=len(self.lines):
+            return ''
+        self.pos+=1
+        return self.lines[self.pos-1]
+
+    def readlines(self):
+        """
+        function to read the remaining lines
+
+        Parameters:
+            None.
+
+        Returns:
+            list: lines including their newlines
+        """
+
+        lines=self.lines[self.pos:]
+        self.pos=len(self.lines)
+        return lines
+
+    def tell(self):
+        """
+        function to get the current position
+
+        Parameters:
+            None.
+
+        Returns:
+            int: number of the next line to read
+        """
+
+        return self.pos
+
+    def seek(self,pos):
+        """
+        function to set the current position
+
+        Parameters:
+            pos (int): number of the next line to read (from tell)
+
+        Returns:
+            None.
+        """
+
+        self.pos=min(max(pos,0),len(self.lines))
+
+    def keyword_blocks(self):
+        """
+        function to find the keywords (lines starting with '*') and their data lines
+
+        Parameters:
+            None.
+
+        Returns:
+            generator: (keyword, start, stop) for each keyword, where keyword is upper case
+                       and lines start to stop-1 follow the keyword
+        """
+
+        kws=[(i,line.strip().upper()) for i,line in enumerate(self.lines)
+             if line.lstrip().startswith('*')]
+        for j,(i,kw) in enumerate(kws):
+            stop=kws[j+1][0] if j+1<len(kws) else len(self.lines)
+            yield kw,i+1,stop
+
+
+def parse_values(s,dtype=np.double):
+    """
+    function to parse comma separated values (e.g., from get_after_eqsign)
+
+    Parameters:
+        s (str): values separated by commas
+        dtype (type): type of the values
+
+    Returns:
+        vals (np.ndarray): values
+    """
+
+    try:
+        with warnings.catch_warnings(): #incomplete parsing is checked below
+            warnings.simplefilter('ignore',DeprecationWarning)
+            vals=np.fromstring(s,dtype=dtype,sep=',')
+    except ValueError:
+        vals=None
+    if vals is None or vals.size!=s.count(',')+1:
+        #values np.fromstring can not read, errors are raised as for np.asarray
+        vals=np.asarray(s.split(','),dtype=dtype)
+    return vals
+
+
+def read_rows(f,nrows,ncols,dtype=np.double):
+    """
+    function to read rows of values after equal signs (e.g., SM=1,2,1) into one array
+
+    Parameters:
+        f (MacLexer or io.TextIOWrapper): opened file to read
+        nrows (int): number of rows
+        ncols (int): number of values used from each row
+        dtype (type): type of the values
+
+    Returns:
+        vals (np.ndarray): (nrows,ncols) array
+    """
+
+    rows=[get_after_eqsign(f) for _ in range(nrows)]
+    try:
+        vals=parse_values(','.join(rows),dtype=dtype)
+    except ValueError:
+        vals=None
+    if vals is None or vals.size!=nrows*ncols:
+        #rows with extra values (only the first ncols are used) or trailing commas
+        vals=np.asarray([row.split(',')[:ncols] for row in rows],dtype=dtype)
+    return vals.reshape(nrows,ncols)
@@ -0,0 +1,302 @@
+"""functions for saving and loading parsed MAC files as binary snapshots""" #pylint: disable=C0103
+import os
+import gc
+import json
+import hashlib
+from collections import deque
+import numpy as np
+
+#snapshots written with a different version are parsed again
+SNAPSHOT_VERSION = 2
+
+#dicts of at least this many dicts with the same keys are stored as columns, and trees of
+#dicts (e.g., the results hierarchy) with at least this many nodes as key and parent arrays
+TABLE_MIN_ROWS = 64
+
+
+def get_snapshot_name(name):
+    """
+    function to get the snapshot file of a MAC file
+
+    Parameters:
+        name (str): MAC file name including extension
+
+    Returns:
+        str: snapshot file name (<MAC file>.npz)
+    """
+
+    return name+'.npz'
+
+
+def get_source_hash(name,src):
+    """
+    function to get the hash of the inputs of a MAC file
+
+    Parameters:
+        name (str): MAC file name including extension
+        src (bytes): contents of the MAC file
+
+    Returns:
+        str: sha256 of the MAC file and its *.rot file (CROT orientations), if present
+    """
+
+    h=hashlib.sha256(src)
+    rot=name[:-4]+'.rot'
+    if os.path.exists(rot):
+        with open(rot,'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def save_snapshot(mac,name,src_hash):
+    """
+    function to save a parsed MAC file, a warning is printed if it can not be saved. The
+    name (from the path the file was opened with) is not saved, so snapshots of copied or
+    moved MAC files can be loaded.
+
+    Parameters:
+        mac (dict): parsed keywords (mac_inp.mac)
+        name (str): MAC file name including extension
+        src_hash (str): hash from get_source_hash
+
+    Returns:
+        bool: True if the snapshot was saved
+    """
+
+    snap=get_snapshot_name(name)
+    arrays={}
+    gc_enabled=gc.isenabled()
+    gc.disable()
+    try:
+        mac={key:val for key,val in mac.items() if key!='name'}
+        header={'version':SNAPSHOT_VERSION,'hash':src_hash,'mac':_encode(mac,arrays)}
+        arrays['header']=np.frombuffer(json.dumps(header).encode('utf-8'),dtype=np.uint8)
+        tmp=snap+'.tmp'
+        with open(tmp,'wb') as f:
+            np.savez(f,**arrays)
+        os.replace(tmp,snap)
+    except (TypeError,ValueError,OSError) as e:
+        print(f"WARNING: snapshot {snap} not saved: {e}")
+        return False
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return True
+
+
+def load_snapshot(name,src_hash):
+    """
+    function to load a parsed MAC file if its snapshot matches the MAC file
+
+    Parameters:
+        name (str): MAC file name including extension
+        src_hash (str): hash from get_source_hash
+
+    Returns:
+        mac (dict): parsed keywords (mac_inp.mac) without the name, None if there is no
+                    valid snapshot
+    """
+
+    snap=get_snapshot_name(name)
+    if not os.path.exists(snap):
+        return None
+    gc_enabled=gc.isenabled()
+    gc.disable() #millions of new dicts would trigger collections that find nothing
+    try:
+        with np.load(snap,allow_pickle=False) as data:
+            header=json.loads(data['header'].tobytes().decode('utf-8'))
+            if header.get('version')!=SNAPSHOT_VERSION or header.get('hash')!=src_hash:
+                return None
+            return _decode(header['mac'],data)
+    except (OSError,ValueError,KeyError,TypeError) as e:
+        print(f"WARNING: snapshot {snap} not read: {e}")
+        return None
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def _add_array(arr,arrays):
+    """
+    function to add an array to the arrays saved in the snapshot
+
+    Parameters:
+        arr (np.ndarray): array to save (not an object array)
+        arrays (dict): arrays saved in the snapshot
+
+    Returns:
+        str: name of the array
+    """
+
+    if arr.dtype.hasobject:
+        raise TypeError('object arrays can not be saved without pickle')
+    key=f"a{len(arrays)}"
+    arrays[key]=arr
+    return key
+
+
+def _encode(val,arrays): #pylint: disable=R0911
+    """
+    function to convert a value to JSON, arrays are added to arrays
+
+    Parameters:
+        val (object): value to convert
+        arrays (dict): arrays saved in the snapshot
+
+    Returns:
+        object: JSON value, containers are {type: contents} so their types are kept
+    """
+
+    if val is None or type(val) in (bool,int,float,str):
+        return val
+    if isinstance(val,np.ndarray):
+        return {'a':_add_array(val,arrays)}
+    if isinstance(val,np.generic):
+        return {'n':[val.dtype.str,val.item()]}
+    if isinstance(val,list):
+        return {'l':[_encode(v,arrays) for v in val]}
+    if isinstance(val,tuple):
+        return {'u':[_encode(v,arrays) for v in val]}
+    if isinstance(val,dict):
+        if all(type(k) is str for k in val): #pylint: disable=C0123
+            table=_encode_table(val,arrays)
+            if table is None:
+                table=_encode_tree(val,arrays)
+            if table is not None:
+                return table
+            return {'d':{k:_encode(v,arrays) for k,v in val.items()}}
+        return {'m':[[_encode(k,arrays),_encode(v,arrays)] for k,v in val.items()]}
+    raise TypeError(f"{type(val).__name__} values can not be saved")
+
+
+def _encode_table(val,arrays):
+    """
+    function to convert a dict of dicts with the same keys and scalar values (e.g., the
+    results hierarchy items) to columns
+
+    Parameters:
+        val (dict): dict with str keys
+        arrays (dict): arrays saved in the snapshot
+
+    Returns:
+        dict: {'t': [row keys, fields, columns]}, None if val is not a table
+    """
+
+    if len(val)<TABLE_MIN_ROWS:
+        return None
+    rows=list(val.values())
+    if not isinstance(rows[0],dict):
+        return None
+    fields=list(rows[0])
+    if not fields or not all(isinstance(row,dict) and list(row)==fields for row in rows):
+        return None
+
+    cols=[]
+    for field in fields:
+        col=[row[field] for row in rows]
+        types={type(v) for v in col}
+        if types=={str}:
+            cols.append({'s':_add_array(np.asarray(col,dtype=str),arrays)})
+        elif types=={float}:
+            cols.append({'f':_add_array(np.asarray(col,dtype=np.float64),arrays)})
+        elif types<={int,np.int64}:
+            #python and numpy ints are kept apart, e.g., for matnum
+            isnp=np.asarray([type(v) is np.int64 for v in col]) #pylint: disable=C0123
+            cols.append({'i':_add_array(np.asarray(col,dtype=np.int64),arrays),
+                         'np':_add_array(isnp,arrays) if isnp.any() else None})
+        else:
+            return None
+    return {'t':[_add_array(np.asarray(list(val),dtype=str),arrays),fields,cols]}
+
+
+def _encode_tree(val,arrays):
+    """
+    function to convert a tree of dicts with str keys and empty dicts as leaves (e.g., the
+    results hierarchy) to key and parent arrays
+
+    Parameters:
+        val (dict): dict with str keys
+        arrays (dict): arrays saved in the snapshot
+
+    Returns:
+        dict: {'g': [keys, parents]} in breadth-first order (-1 for children of val),
+              None if val is not a tree
+    """
+
+    #depth-first check, other dicts of dicts (e.g., tables) fail at their first leaf
+    nnodes=0
+    stack=[val]
+    while stack:
+        node=stack.pop()
+        for key,child in node.items():
+            if not isinstance(child,dict) or type(key) is not str: #pylint: disable=C0123
+                return None
+            stack.append(child)
+            nnodes+=1
+    if nnodes<TABLE_MIN_ROWS:
+        return None
+
+    keys=[]
+    parents=[]
+    queue=deque([(val,-1)])
+    while queue:
+        node,parent=queue.popleft()
+        for key,child in node.items():
+            queue.append((child,len(keys)))
+            keys.append(key)
+            parents.append(parent)
+    return {'g':[_add_array(np.asarray(keys,dtype=str),arrays),
+                 _add_array(np.asarray(parents,dtype=np.int64),arrays)]}
+
+
+def _decode(val,data):
+    """
+    function to convert a JSON value from _encode back
+
+    Parameters:
+        val (object): JSON value
+        data (NpzFile): arrays in the snapshot
+
+    Returns:
+        object: value passed to _encode
+    """
+
+    if not isinstance(val,dict):
+        return val
+    kind,cont=next(iter(val.items()))
+    if kind=='a':
+        return data[cont]
+    if kind=='n':
+        return np.dtype(cont[0]).type(cont[1])
+    if kind=='l': #e.g., raw_input
+        return [_decode(v,data) if isinstance(v,dict) else v for v in cont]
+    if kind=='u':
+        return tuple(_decode(v,data) for v in cont)
+    if kind=='d':
+        return {k:_decode(v,data) for k,v in cont.items()}
+    if kind=='m':
+        return {_decode(k,data):_decode(v,data) for k,v in cont}
+    if kind=='t':
+        keys,fields,cols=cont
+        values=[]
+        for col in cols:
+            if 's' in col:
+                values.append(data[col['s']].tolist())
+            elif 'f' in col:
+                values.append(data[col['f']].tolist())
+            else:
+                ints=data[col['i']].tolist()
+                if col['np'] is not None:
+                    ints=[np.int64(v) if isnp else v for v,isnp in
+                          zip(ints,data[col['np']].tolist())]
+                values.append(ints)
+        return {key:dict(zip(fields,row)) for key,row in zip(data[keys].tolist(),zip(*values))}
+    if kind=='g':
+        tree={}
+        nodes=[]
+        for key,parent in zip(data[cont[0]].tolist(),data[cont[1]].tolist()):
+            node={}
+            (nodes[parent] if parent>=0 else tree)[key]=node
+            nodes.append(node)
+        return tree
+    raise ValueError(f"unknown snapshot value {kind}")
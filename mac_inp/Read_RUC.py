@@ -6,6 +6,7 @@ from PyQt5.QtWidgets import QMessageBox  # pylint: disable=E0611
 from .Get_After_EqSign import get_after_eqsign
 from .Get_Param_Update_Dict import get_param_update_dict
 from .Read_Line import read_line
+from .Mac_Lexer import parse_values,read_rows
 
 def get_builtin_ruc_3d(archid,vf,f,m,r,asp,p): #pylint: disable=R0912,R0913,R0914,R0915,R0917
     """
@@ -629,38 +630,19 @@ def _read_ruc_block(f,legacy):
             r['ng']=int(n[2-ioff][1])
 
             if dim==103:
-                d=get_after_eqsign(f)
-                r['d']=np.asarray(d.split(','),dtype=np.double)
-            d=get_after_eqsign(f)
-            r['h']=np.asarray(d.split(','),dtype=np.double)
-            d=get_after_eqsign(f)
-            r['l']=np.asarray(d.split(','),dtype=np.double)
+                r['d']=parse_values(get_after_eqsign(f))
+            r['h']=parse_values(get_after_eqsign(f))
+            r['l']=parse_values(get_after_eqsign(f))
             if dim==103:
                 #r['sm']=np.zeros([r['na'],r['nb'],r['ng']])
                 r['sm']=np.zeros([r['ng'],r['nb'],r['na']])
-                amin,amax,ainc=0,0,1
-                if r['na']==1:
-                    amin,amax,ainc=0,r['na'],1
-                elif r['na']>1:
-                    amin,amax,ainc=r['na']-1,-1,-1
-                for g in range(r['ng']):
-                    for a in range(amin,amax,ainc):
-                        d=get_after_eqsign(f)
-                        d=d.split(',')
-                        for b in range(r['nb']):
-							#r['sm'][a][b][g]=d[b]
-                            r['sm'][g][b][a]=d[b]
+                #rows of nb values for each g, a from na to 1: r['sm'][g][b][a]=row[b]
+                rows=read_rows(f,r['ng']*r['na'],r['nb'])
+                r['sm'][:]=rows.reshape(r['ng'],r['na'],r['nb'])[:,::-1,:].transpose(0,2,1)
             elif dim==102:
                 r['sm']=np.zeros([r['nb'],r['ng']])
-                if r['nb']==1:
-                    amin,amax,ainc=0,r['nb'],1
-                elif r['nb']>1:
-                    amin,amax,ainc=r['nb']-1,-1,-1
-                for b in range(amin,amax,ainc):
-                    d=get_after_eqsign(f)
-                    d=d.split(',')
-                    for g in range(r['ng']):
-                        r['sm'][b][g]=d[g]
+                #rows of ng values for b from nb to 1: r['sm'][b][g]=row[g]
+                r['sm'][:]=read_rows(f,r['nb'],r['ng'])[::-1,:]
         else:
 
             p={}
@@ -696,12 +678,9 @@ def _read_ruc_block(f,legacy):
         ds=d.split('=')
         f.seek(ft)
         if ds[0].lower()=='d1':
-            d=get_after_eqsign(f)
-            r['d1']=np.asarray(d.split(','),dtype=np.double)
-            d=get_after_eqsign(f)
-            r['d2']=np.asarray(d.split(','),dtype=np.double)
-            d=get_after_eqsign(f)
-            r['d3']=np.asarray(d.split(','),dtype=np.double)
+            r['d1']=parse_values(get_after_eqsign(f))
+            r['d2']=parse_values(get_after_eqsign(f))
+            r['d3']=parse_values(get_after_eqsign(f))
             # print('d1 = ',r['d1'])
 
         if 'msm' not in r:
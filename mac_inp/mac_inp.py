@@ -1,6 +1,7 @@
 """functions for reading MAC input files"""
 import numpy as np
 from util.get_model_hierarchy import get_model_hierarchy
+from util.get_ori_vectors import set_crot_oris
 from .Read_Constit import Read_Constit
 from .Read_RUC import Read_RUC
 from .Read_Print import Read_Print
@@ -15,12 +16,14 @@ from .Read_Therm import Read_Therm
 from .Read_FailureSubcell import Read_FailureSubcell
 from .Read_PDFA import Read_PDFA
 from .Get_MsRM_D import get_msrm_d
+from .Mac_Lexer import MacLexer
+from .Mac_Snapshot import get_snapshot_name,get_source_hash,load_snapshot,save_snapshot
 
 class mac_inp(): #pylint: disable=C0103
     """
     mac_inp - reads and extracts keyword data from *.MAC files
     """
-    def __init__(self,name=None,raw_input=None,echo=True):
+    def __init__(self,name=None,raw_input=None,echo=True,snapshot=True):
         """
         initializes class
 
@@ -28,7 +31,9 @@ class mac_inp(): #pylint: disable=C0103
             name (str): MAC file name including extension.
             raw_input (list): strings containing raw NASMAT input
             echo (bool): flag to control echoing data to screen
-            
+            snapshot (bool): flag to load the parsed file from <name>.npz if it matches
+                             the file, and to save it there after parsing otherwise
+
         Returns:
             None.
         """
@@ -38,6 +43,7 @@ class mac_inp(): #pylint: disable=C0103
         self.name=name
         self.raw_input=raw_input
         self.echo=echo
+        self.snapshot=snapshot
         self._mac_inp_func()
 
     def _mac_inp_func(self): #pylint: disable=R0912,R0914,R0915
@@ -63,86 +69,95 @@ class mac_inp(): #pylint: disable=C0103
             with open(fname,'w', encoding='utf-8') as f:
                 for line in m['raw_input']:
                     f.write(line)
+            #the written text is parsed without reading the file again
+            f=MacLexer(text=''.join(raw_input))
         else:
-            with open(fname,'r', encoding='utf-8') as f:
-                m['raw_input']=f.readlines()
-
-        with open(fname,'r', encoding='utf-8') as f:
-            if echo:
-                print(f"For {fname}, the following keywords are present:")
-            d=f.readline().lstrip().rstrip().upper()
-
-            if not d.startswith('*'):
-                m['title']=d
-                d=f.readline().lstrip().rstrip().upper()
-
-            msrm={}
-            while True:
-                if d == '*CONSTITUENTS':
-                    if echo:
-                        print('*CONSTITUENTS found')
-                    m['constit']=Read_Constit(f)
-                elif d == '*RUC':
-                    if echo:
-                        print('*RUC found')
-                    msrm=Read_RUC(f,fname[:-4])
-                elif d == '*RUC_LEGACY':
-                    if echo:
-                        print('*RUC_LEGACY found')
-                    msrm=Read_RUC(f,fname[:-4],legacy=True)
-                elif d == '*MECH':
-                    if echo:
-                        print('*MECH found')
-                    m['mech']=Read_Mech(f)
-                elif d == '*MULTIPHYSICS':
-                    if echo:
-                        print('*MULTIPHYSICS found')
-                    m['multiphysics']=Read_Mech(f)
-                elif d == '*THERM':
-                    if echo:
-                        print('*THERM found')
-                    m['therm']=Read_Therm(f)
-                elif d == '*SOLVER':
-                    if echo:
-                        print('*SOLVER found')
-                    m['solver']=Read_Solver(f)
-                elif d in ('*FAILURE_SUBCELL','*FAILURE SUBCELL'):
-                    if echo:
-                        print('*FAILURE_SUBCELL found')
-                    m['failsub']=Read_FailureSubcell(f)
-                elif d == '*PDFA':
+            with open(fname,'rb') as f:
+                src=f.read()
+            src_hash=get_source_hash(fname,src)
+            if self.snapshot:
+                mac=load_snapshot(fname,src_hash)
+                if mac is not None:
                     if echo:
-                        print('*PDFA found')
-                    m['pdfa']=Read_PDFA(f)
-                elif d == '*PRINT':
-                    if echo:
-                        print('*PRINT found')
-                    m['print']=Read_Print(f)
-                elif d == '*HDF5':
-                    if echo:
-                        print('*HDF5 found')
-                    m['hdf5']=Read_HDF5(f)
-                elif d == '*PROBLEM_TYPE':
-                    if echo:
-                        print('*PROBLEM_TYPE found')
-                    m['probtype']=Read_ProbType(f)
-                elif d == '*EXTERNAL_SETTINGS':
-                    if echo:
-                        print('*EXTERNAL_SETTINGS found')
-                    m['ext']=Read_External(f)
-                elif d == '*XYPLOT':
-                    if echo:
-                        print('*XYPLOT found')
-                    m['xy']=Read_XYPlot(f)
-                elif d == '*MATLAB':
-                    if echo:
-                        print('*MATLAB found')
-                    m['matlab']=Read_Matlab(f)
+                        print(f"For {fname}, the parsed file is loaded from "
+                              f"{get_snapshot_name(fname)}")
+                    #name of the path used now, not the one of the first parse
+                    self.mac={'name':m['name'],**mac}
+                    return
+            f=MacLexer(text=src.decode('utf-8'))
+            m['raw_input']=f.readlines()
 
-                d=f.readline()
-                if not d: #handle case of blank lines between keywords
-                    break
-                d=d.lstrip().rstrip().upper()
+        if echo:
+            print(f"For {fname}, the following keywords are present:")
+        f.seek(0)
+        d=f.readline().lstrip().rstrip().upper()
+        if not d.startswith('*'):
+            m['title']=d
+
+        msrm={}
+        #readers start after their keyword, lines of unknown keywords are skipped
+        for d,start,_ in f.keyword_blocks():
+            f.seek(start)
+            if d == '*CONSTITUENTS':
+                if echo:
+                    print('*CONSTITUENTS found')
+                m['constit']=Read_Constit(f)
+            elif d == '*RUC':
+                if echo:
+                    print('*RUC found')
+                msrm=Read_RUC(f,fname[:-4])
+            elif d == '*RUC_LEGACY':
+                if echo:
+                    print('*RUC_LEGACY found')
+                msrm=Read_RUC(f,fname[:-4],legacy=True)
+            elif d == '*MECH':
+                if echo:
+                    print('*MECH found')
+                m['mech']=Read_Mech(f)
+            elif d == '*MULTIPHYSICS':
+                if echo:
+                    print('*MULTIPHYSICS found')
+                m['multiphysics']=Read_Mech(f)
+            elif d == '*THERM':
+                if echo:
+                    print('*THERM found')
+                m['therm']=Read_Therm(f)
+            elif d == '*SOLVER':
+                if echo:
+                    print('*SOLVER found')
+                m['solver']=Read_Solver(f)
+            elif d in ('*FAILURE_SUBCELL','*FAILURE SUBCELL'):
+                if echo:
+                    print('*FAILURE_SUBCELL found')
+                m['failsub']=Read_FailureSubcell(f)
+            elif d == '*PDFA':
+                if echo:
+                    print('*PDFA found')
+                m['pdfa']=Read_PDFA(f)
+            elif d == '*PRINT':
+                if echo:
+                    print('*PRINT found')
+                m['print']=Read_Print(f)
+            elif d == '*HDF5':
+                if echo:
+                    print('*HDF5 found')
+                m['hdf5']=Read_HDF5(f)
+            elif d == '*PROBLEM_TYPE':
+                if echo:
+                    print('*PROBLEM_TYPE found')
+                m['probtype']=Read_ProbType(f)
+            elif d == '*EXTERNAL_SETTINGS':
+                if echo:
+                    print('*EXTERNAL_SETTINGS found')
+                m['ext']=Read_External(f)
+            elif d == '*XYPLOT':
+                if echo:
+                    print('*XYPLOT found')
+                m['xy']=Read_XYPlot(f)
+            elif d == '*MATLAB':
+                if echo:
+                    print('*MATLAB found')
+                m['matlab']=Read_Matlab(f)
 
         #assign dimension
         for key in msrm['rucs'].keys():
@@ -202,43 +217,7 @@ class mac_inp(): #pylint: disable=C0103
         #update orientations if CROT is present
         if 'crot' in msrm:
             for key,new_ori in msrm['crot'].items():
-                ruc=msrm['rucs'][key]
-                sz=ruc['sm'].size
-                sh=ruc['sm'].shape
-                ruc['ORI_X1'] = np.zeros((sz,3),dtype=float)
-                ruc['ORI_X2'] = np.zeros((sz,3),dtype=float)
-                ruc['ORI_X3'] = np.zeros((sz,3),dtype=float)
-                for ori in new_ori:
-                    #extract nasmat subvolume indices
-                    ia,ib,ig = ori[0:3]
-                    #python index ordering
-                    #2d: r['sm'][b][g], 3d: r['sm'][g][b][a]
-
-                    #assuming d1, calculate other two vectors for coordinate system
-                    d1=np.array(ori[3:])
-                    if abs(d1[0])<1e-9: #fix for singularity in d2 calc
-                        d1[0] = 1e-9
-                    d2=np.array([-(d1[1]**2 +d1[2]**2)/d1[0],d1[1],d1[2]])
-                    d3=np.array([0.0,-(d1[0]*d1[2] - d2[0]*d1[2]),
-                                 d1[0]*d1[1] - d2[0]*d1[1]])
-                    #convert all vectors into unit vectors
-                    d1=d1/np.linalg.norm(d1)
-                    d2=d2/np.linalg.norm(d2)
-                    d3=d3/np.linalg.norm(d3)
-                    #assign to appropriate position in ori array
-                    iloc = -1
-                    if ruc['DIM']=='2D':
-                        iloc = (ib-1) * sh[1] + (ig-1)
-                    elif ruc['DIM']=='3D':
-                        iloc = (ig-1) * (sh[1] * sh[2]) + (ib-1) * sh[2] + (ia-1)
-
-                    ruc['ORI_X1'][iloc]=d1
-                    ruc['ORI_X2'][iloc]=d2
-                    ruc['ORI_X3'][iloc]=d3
-
-                ruc['ORI_X1_NORM']=np.sqrt(np.sum(ruc['ORI_X1']**2,axis=1))
-                ruc['ORI_X2_NORM']=np.sqrt(np.sum(ruc['ORI_X2']**2,axis=1))
-                ruc['ORI_X3_NORM']=np.sqrt(np.sum(ruc['ORI_X3']**2,axis=1))
+                set_crot_oris(msrm['rucs'][key],new_ori)
 
         #Replace negative material numbers with positive
         all_mats=[np.arange(1,m['constit']['nmats']+1)]
@@ -250,8 +229,8 @@ class mac_inp(): #pylint: disable=C0103
         for key in msrm['rucs'].keys():
             sm=msrm['rucs'][key]['sm']
             sm=sm.astype(int)
-            vmapf = np.vectorize(msrm['rev_mat_map'].get)
-            msrm['rucs'][key]['sm']=vmapf(sm)
+            #all_mats is sorted, so its index is rev_mat_map for every material
+            msrm['rucs'][key]['sm']=np.searchsorted(all_mats,sm)
             msrm['rucs'][key]['all_mats']=sm
             msrm['rucs'][key]['all_mats_uniq'],\
                 msrm['rucs'][key]['all_mats_uniq_cnt']=np.unique(sm, return_counts=True)
@@ -276,3 +255,6 @@ class mac_inp(): #pylint: disable=C0103
         # print('res hierarchy: ', m['hierarchy']['res']['hrchy'])
         # print('res item: ', m['hierarchy']['res']['items'])
         self.mac = m
+
+        if self.snapshot and not raw_input:
+            save_snapshot(m,fname,src_hash)
@@ -1,4 +1,5 @@
 """class for writing NASMAT keyword data to output file"""
+import io
 import numpy as np
 
 class mac_out(): #pylint: disable=C0103,R0903
@@ -26,27 +27,30 @@ class mac_out(): #pylint: disable=C0103,R0903
         self.filename=name
         self.str_cutoff=str_cutoff
 
+        #keywords are written to a buffer and then to the file at once
+        f=self.file=io.StringIO()
+        if 'title' in self.kw.keys():
+            f.write(self.kw['title']+'\n')
+
+        self._write_print()
+        self._write_constituents()
+        self._write_ruc()
+        self._write_mech_mulitphys(multiphys=False)
+        self._write_mech_mulitphys(multiphys=True)
+        self._write_boundary()
+        self._write_therm()
+        self._write_solver()
+        self._write_failure_subcell()
+        self._write_pdfa()
+        self._write_hdf5()
+        self._write_probtype()
+        self._write_ext()
+        self._write_xy()
+        self._write_matlab()
+        self.file.write('*END')
+
         with open(name,'w', encoding='utf-8') as f:
-            self.file=f
-            if 'title' in self.kw.keys():
-                f.write(self.kw['title']+'\n')
-
-            self._write_print()
-            self._write_constituents()
-            self._write_ruc()
-            self._write_mech_mulitphys(multiphys=False)
-            self._write_mech_mulitphys(multiphys=True)
-            self._write_boundary()
-            self._write_therm()
-            self._write_solver()
-            self._write_failure_subcell()
-            self._write_pdfa()
-            self._write_hdf5()
-            self._write_probtype()
-            self._write_ext()
-            self._write_xy()
-            self._write_matlab()
-            self.file.write('*END')
+            f.write(self.file.getvalue())
 
     def _write_str(self,string,delim=','):
         """
@@ -61,36 +65,35 @@ class mac_out(): #pylint: disable=C0103,R0903
         None.
         """
 
-        f=self.file
         cutoff=self.str_cutoff
 
-        cv=len(string)
-        if cv<=cutoff:
-            f.write(string)
-        else:
-            while cv>cutoff:
-                #handle delim separated lists
-                res = [i for i in range(len(string)) if string.startswith(delim,i)]
-                for i in res:
-                    if i-cutoff<0:
-                        ind=0
-                    else:
-                        ind=i
-                        break
-                #handle case where no res found
-                if not res:
-                    ind = string.rfind(' ', 0, cutoff + 1)
-
-                if ind!=0:
-                    f.write(string[:ind+1]+'&\n ')
-                    string=string[ind+1:]
-                else:
-                    f.write(string)
-                    string=''
-                cv=len(string)
-            #write "leftovers" if present
-            if string:
-                f.write(string)
+        if len(string)<=cutoff:
+            self.file.write(string)
+            return
+
+        #each line is wrapped at the first delim at least cutoff characters from its start,
+        #searching forward from the last wrap keeps this linear in the string length
+        parts=[]
+        start=0
+        while len(string)-start>cutoff:
+            ind=string.find(delim,start+cutoff)
+            if ind>=0:
+                ind-=start
+            elif string.find(delim,start)>=0: #only delims before cutoff
+                ind=0
+            else:
+                #handle case where no delim found, the rest is written if there is no space
+                ind=max(string.rfind(' ',start,start+cutoff+1)-start,0)
+
+            if ind!=0:
+                parts.append(string[start:start+ind+1]+'&\n ')
+                start+=ind+1
+            else:
+                parts.append(string[start:])
+                start=len(string)
+        #write "leftovers" if present
+        parts.append(string[start:])
+        self.file.write(''.join(parts))
 
     def _write_comments(self,comments):
         """
@@ -328,28 +331,30 @@ class mac_out(): #pylint: disable=C0103,R0903
         sm=ruc['sm'].astype(int).copy()
 
         if 'mat_map' in self.kw.keys():
-            m = {key:self.kw['mat_map'][key] for key in self.kw['mat_map'].keys()}
-            def map_to_new(x):
-                return m.get(x, x)
-            vmap = np.vectorize(map_to_new)
-            sm = vmap(sm)
-
+            #material indices to material numbers, others are kept
+            m={int(key):val for key,val in self.kw['mat_map'].items()
+               if isinstance(key,(int,np.integer))}
+            if m:
+                keys=np.asarray(sorted(m))
+                vals=np.asarray([m[key] for key in keys.tolist()])
+                k=np.clip(np.searchsorted(keys,sm),0,len(keys)-1)
+                sm=np.where(keys[k]==sm,vals[k],sm)
+
+        #rows in the order read by mac_inp, formatted at once
         if ruc['DIM']=='3D':
             if len(sm.shape)<3:
                 sm=sm.reshape(ruc['ng'],ruc['nb'],ruc['na'])
-            for g in range(ruc['ng']):
-                self.file.write(f"# -- gamma = {g+1}\n")
-                for a in range(ruc['na'], 0, -1):
-                    # if ruc['nb']==1 and ruc['ng']==1:
-                    #     print('sm: ', sm)
-                    #     nstr=self._kw_one_line({'sm':sm[a-1].tolist()})
-                    # else:
-                    nstr=self._kw_one_line({'sm':sm[g,:,a-1].tolist()})
-                    self._write_str(nstr)
+            rows=sm[:,:,::-1].transpose(0,2,1).reshape(-1,sm.shape[1])
+            nrows=ruc['na']
         else:
-            for b in range(ruc['nb']-1, -1, -1):
-                nstr=self._kw_one_line({'sm':sm[b,:].tolist()})
-                self._write_str(nstr)
+            rows=sm[::-1,:]
+            nrows=0
+        rows=[' sm='+','.join(row)+'\n' for row in rows.astype(str).tolist()]
+
+        for i,nstr in enumerate(rows):
+            if nrows and i%nrows==0:
+                self.file.write(f"# -- gamma = {i//nrows+1}\n")
+            self._write_str(nstr)
 
     def _write_mech_mulitphys(self,multiphys=False):
         """
@@ -4,6 +4,8 @@ import os
 import tkinter as tk
 import copy
 import math
+import asyncio
+import threading
 #import time
 from tkinter import filedialog
 import numpy as np
@@ -110,6 +112,8 @@ class Main(QMainWindow): #pylint: disable=R0902,R0904
         self.timer.timeout.connect(self.plot_h5_play_inc)
         self.inc_mode = 1 #1 for increasing, -1 for decreasing
         self.update_fields = False
+        self.nasmat_exe=None
+        self.nasmat_thread=None
 
     def closeEvent(self,event): #pylint: disable=C0103
         """
@@ -126,6 +130,7 @@ class Main(QMainWindow): #pylint: disable=R0902,R0904
         filestr = npp.get('cur_file')
 
         if not filestr:
+            self.cancel_nasmat()
             event.accept()
             return
 
@@ -163,6 +168,23 @@ class Main(QMainWindow): #pylint: disable=R0902,R0904
             else:
                 event.ignore()
 
+        if event.isAccepted():
+            self.cancel_nasmat()
+
+    def cancel_nasmat(self):
+        """
+        Function to stop a running NASMAT analysis.
+
+        Parameters:
+            None.
+
+        Returns:
+            None.
+        """
+
+        if self.nasmat_thread is not None and self.nasmat_thread.is_alive():
+            self.nasmat_exe.cancel()
+
     @pyqtSlot(str, QColor)
     def _append_text(self,text,color):
         """
@@ -633,7 +655,7 @@ class Main(QMainWindow): #pylint: disable=R0902,R0904
         vtk_widget=self.findChild(QWidget, "vtk_widget")
         if vtk_widget:
             npp.set('vtk_settings',vs)
-            vtk_widget.update()
+            vtk_widget.set_hidemat(hide_mat)
 
     def show_hide_title(self):
         """
@@ -877,6 +899,26 @@ class Main(QMainWindow): #pylint: disable=R0902,R0904
             npp.set('vtk_settings',vs)
             vtk_widget.update()
 
+    def toggle_surface_only(self):
+        """
+        Callback function to render only the outer surface of MacroAPI meshes.
+
+        Parameters:
+            None.
+
+        Returns:
+            None.
+        """
+
+        npp=NASMATPrePost()
+        vs=npp.get('vtk_settings')
+        ci=npp.get('selected')
+        vs[id(ci)]['surface_only']=not vs[id(ci)].get('surface_only',False)
+        vtk_widget=self.findChild(QWidget, "vtk_widget")
+        if vtk_widget:
+            npp.set('vtk_settings',vs)
+            vtk_widget.update()
+
     def plot_change_range(self):
         """
         Callback function to change variable plot range.
@@ -1301,9 +1343,42 @@ class Main(QMainWindow): #pylint: disable=R0902,R0904
             print('WARNING: h5 files not able to be run from NASMAT. Create an input file first.')
             return
 
-        nm_exe=NASMAT(npps['NASMAT_SOLVER'],npps["HDF5_PATH"],npps['INTEL_PATH'],
-                            npps['INTEL_OPTS'])
-        nm_exe.run(mac=mac)
+        if self.nasmat_thread is not None and self.nasmat_thread.is_alive():
+            print('WARNING: NASMAT is already running. Wait for it to finish first.')
+            return
+
+        self.nasmat_exe=NASMAT(npps['NASMAT_SOLVER'],npps["HDF5_PATH"],npps['INTEL_PATH'],
+                               npps['INTEL_OPTS'])
+        #solver is run in a worker thread so the UI stays responsive
+        self.nasmat_thread=threading.Thread(target=asyncio.run,
+                                            args=(self._run_nasmat_async(self.nasmat_exe,mac),),
+                                            daemon=True)
+        self.nasmat_thread.start()
+
+    async def _run_nasmat_async(self,nm_exe,mac):
+        """
+        Function to print NASMAT events while the solver runs (called from a worker thread).
+
+        Parameters:
+            nm_exe (NASMAT): NASMAT class used to run the solver
+            mac (str): mac file to execute
+
+        Returns:
+            None.
+        """
+
+        async for event in nm_exe.run_async(mac):
+            if event['event']=='started':
+                print(f"Running NASMAT for {event['mac']}...")
+            elif event['event']=='finished':
+                if event['cancelled']:
+                    print("NASMAT run cancelled.")
+                elif event['returncode'] != 0:
+                    print("An error occurred while setting up the environment or running NASMAT.")
+                else:
+                    print("NASMAT executed successfully.")
+            else:
+                print(event['line'])
 
 
     def attach_h5(self):
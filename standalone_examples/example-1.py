@@ -2,7 +2,6 @@
 
 import os
 import sys
-import numpy as np
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from vtkmodules.vtkRenderingCore import (# pylint: disable=E0611,W0404,C0413
@@ -45,12 +44,10 @@ if PLOT!='RUC' and os.path.exists(h5file):
     h5=GetH5(h5name=h5file)
     #Find increment with max stress-22
     nincs = h5.get_number_incs()
-    stress22 = np.zeros(nincs)
-    for i in range(nincs):
-        H5STR = (f"NASMAT Data/Level=0/Parent RUCID=0, RUCDef MSM=0, IA=0, IB=0, IG=0, "
-                f"IPA=0, IPB=0, IPG=0/Inc={i+1}/Stress")
-        h5d = h5.get_data_by_str(H5STR)
-        stress22[i] = h5d[..., 1] #extract 22-component of stress
+    H5STR = ("NASMAT Data/Level=0/Parent RUCID=0, RUCDef MSM=0, IA=0, IB=0, IG=0, "
+             "IPA=0, IPB=0, IPG=0")
+    #extract 22-component of stress for all increments
+    stress22 = h5.get_history(H5STR, 'Stress', comp=1).reshape(nincs)
     max_ind = stress22.argmax()
     print(f"Max Stress-22 of {stress22.max()} found at increment {max_ind+1}")
 else:
@@ -114,7 +114,7 @@ base, _ = os.path.splitext(INFILE)
 if CONVERT_TO_STACKS:
     macfile=base+'-stacks.MAC'
     s=Stackify(rucs=nasmatkw['ruc']['rucs'],lev0_mod=202,stack_mod=103,
-                nmats=nasmatkw['constit']['nmats'],rem_dup=False,
+                nmats=nasmatkw['constit']['nmats'],
                 crot=nasmatkw['ruc']['crot']['0'])
     nasmatkw['ruc']['rucs'].update(s.newrucs)
     nasmatkw['ruc']['nrucs']=len(nasmatkw['ruc']['rucs'].keys())
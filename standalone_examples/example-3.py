@@ -8,9 +8,9 @@ import matplotlib.pyplot as plt
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from util.npp_settings import get_npp_settings #pylint: disable=C0413
-from util.sub_param import SubParam #pylint: disable=C0413
-from util.output_parser import output_parser #pylint: disable=C0413
-from NASMAT import NASMAT #pylint: disable=C0413
+from util.sub_param_template import SubParamTemplate #pylint: disable=C0413
+from util.sweep_results import SweepResults #pylint: disable=C0413
+from NASMAT import NASMATBatch, JobCache #pylint: disable=C0413
 
 
 #truncated normal function for varying parameters
@@ -56,46 +56,33 @@ wdir=os.path.join(os.getcwd(),'standalone_examples')
 macfile=os.path.join(wdir,INFILE)
 
 #Create NASMAT jobs by performing parameter substitutions
-macjobs = []
-for i,(E_M_i, vf_F_i, vf_V_i, Xn_M_i) in enumerate(zip(E_M, vf_F, vf_V, Xn_M)):
-    #update default values, keys must match parameters in macfile
-    update_param = {'E_M':E_M_i, 'vf_F':vf_F_i, 'vf_V':vf_V_i,
-                    'Xn_M':Xn_M_i,'macro_name':i}
-    macjobs.append(macfile[:-4]+f"_{i}.MAC")
-    #substitute and create ids
-    SubParam(param_mac=macfile,update_param=update_param,workdir=wdir,fileid=i)
+#keys must match parameters in macfile, all jobs are written in one pass
+samples = {'E_M':E_M, 'vf_F':vf_F, 'vf_V':vf_V, 'Xn_M':Xn_M, 'macro_name':np.arange(NJOBS)}
+macjobs = SubParamTemplate(macfile).write(samples,workdir=wdir)
 
 # Run NASMAT
 if RUN_NASMAT:
-    for job in macjobs:
-        nasmat=NASMAT(npps['NASMAT_SOLVER'],npps['HDF5_PATH'],npps['INTEL_PATH'],npps['INTEL_OPTS'])
-        nasmat.run(mac=job)
+    #jobs are run in parallel, one solver process per job. Decks solved in a previous run
+    #are restored from the job cache (use force=True to rerun them)
+    batch=NASMATBatch(npps['NASMAT_SOLVER'],npps['HDF5_PATH'],npps['INTEL_PATH'],npps['INTEL_OPTS'],
+                      cache=JobCache())
+    batch.run(mac=macjobs)
+
+#Parse output and *_macro.data files of all jobs and store them in one file for later use.
+#nproc>1 parses files in parallel, but requires the script to be inside an
+#if __name__ == "__main__": block on Windows
+res = SweepResults.collect(macjobs,params=samples,nproc=1)
+res.save(os.path.join(wdir,INFILE[:-4]+'_results.npz'))
 
 #Get output data for plotting
-outdata = {'E22':np.zeros(NJOBS),'S22':np.zeros(NJOBS)}
-#Parse output file and extract effective properties
-macout = [file[:-4]+'.out' for file in macjobs]
-for i,file in enumerate(macout):
-    d = output_parser(fname=file)
-    outdata['E22'][i] = d['E22S']
-
-#Parse *.data files
-for i,file in enumerate(macout):
-    directory, filename = os.path.split(file)
-    base, _ = os.path.splitext(filename)
-
-    data_file = os.path.join(directory, base.upper()+'_macro.data')
-    d = np.loadtxt(data_file)
+outdata = {'E22':res.props['E22S'],'S22':np.zeros(NJOBS)}
+for i,file in enumerate(res.files):
+    d = res.get_curve(i)
 
     outdata['S22'][i] = d[:,1].max()
     max_ind = d[:,1].argmax()
     if max_ind == d.shape[0] - 1:
-        print(f"Warning: maximum value occurs at last index of data in {data_file}.")
-
-
-#convert data to array for plotting
-for key,val in outdata.items():
-    outdata[key]=np.asarray(val)
+        print(f"Warning: maximum value occurs at last index of data for {file}.")
 
 
 # Create 2x2 subplot figure
@@ -0,0 +1,46 @@
+"""tests for NASMAT.job_cache"""
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from NASMAT.job_cache import JobCache #pylint: disable=C0413
+
+
+def _write(path,text):
+    with open(path,'w',encoding='utf-8') as f:
+        f.write(text)
+
+
+def _write_job(workdir,base,text):
+    _write(os.path.join(workdir,base+'.MAC'),'*RUC '+base)
+    _write(os.path.join(workdir,base+'.out'),text)
+    _write(os.path.join(workdir,base+'.h5'),text)
+    _write(os.path.join(workdir,base.upper()+'_macro.data'),text)
+
+
+def test_outputs_of_prefixed_job(tmp_path):
+    """outputs of ply_fine are not outputs of ply (decks in the same directory)"""
+    workdir=str(tmp_path/'jobs')
+    os.makedirs(workdir)
+    _write_job(workdir,'ply','ply')
+    _write_job(workdir,'ply_fine','ply_fine')
+    cache=JobCache(str(tmp_path/'cache'))
+
+    names=sorted(os.path.basename(o['src']) for o in cache._find_outputs(workdir,'ply')) #pylint: disable=W0212
+    assert names==['PLY_macro.data','ply.h5','ply.out']
+
+    key=cache.get_key(os.path.join(workdir,'ply.MAC'),'solver')
+    cache.store(key,workdir,'ply')
+    for name in ('ply.out','ply.h5','PLY_macro.data'):
+        os.remove(os.path.join(workdir,name))
+
+    files=cache.restore(key,workdir,'ply')
+    assert sorted(os.path.basename(f) for f in files)==['PLY_macro.data','ply.h5','ply.out']
+    for name in ('ply.out','ply.h5','PLY_macro.data'):
+        with open(os.path.join(workdir,name),encoding='utf-8') as f:
+            assert f.read()=='ply'
+
+    #outputs of ply_fine are kept as they are
+    cache.release(workdir,'ply')
+    for name in ('ply_fine.out','ply_fine.h5','PLY_FINE_macro.data'):
+        with open(os.path.join(workdir,name),encoding='utf-8') as f:
+            assert f.read()=='ply_fine'
@@ -3,7 +3,27 @@ from vtkmodules.vtkCommonDataModel import vtkCellLocator # pylint: disable=E0611
 from vtkmodules.vtkCommonCore import vtkIdList # pylint: disable=E0611
 from vtkmodules.vtkCommonDataModel import vtkUnstructuredGrid # pylint: disable=E0611
 
-def cell_id_to_indices(cid,grid,irregular=False,key_input=False,tol=0.0001):
+def get_cell_indices(cid,grid):
+    """
+    Function to get the subvolume index arrays of a cell (see vtk_plot.add_index_arrays)
+
+    Parameters:
+        cid (int): input vtk cell id
+        grid (vtkDataSet): input vtk grid
+
+    Returns:
+        dict: 'IA','IB','IG','RUCID', and 'LEVEL' values of the cell (None if the grid
+              does not have the arrays)
+    """
+
+    cd=grid.GetCellData()
+    if not cd.HasArray('IA'):
+        return None
+    return {name:int(cd.GetArray(name).GetValue(cid))
+            for name in ('IA','IB','IG','RUCID','LEVEL') if cd.HasArray(name)}
+
+
+def cell_id_to_indices(cid,grid,irregular=False,key_input=False,tol=0.0001,dflag=None): #pylint: disable=R0913,R0917
     """
     Function to calculate vtk ruc indices from vtk cell id
 
@@ -13,12 +33,15 @@ def cell_id_to_indices(cid,grid,irregular=False,key_input=False,tol=0.0001):
         irregular (bool): flag to distinguish between macroapi grid inputs
         key_input (bool): flag to distinguish between plot modes
         tol (float): tolerance on line searching
+        dflag (str): problem dimension, indices are read from the grid index arrays
+                     if given (no cell locator is built)
 
 
     Returns:
         None.
     """
 
+    ind=get_cell_indices(cid,grid) if dflag else None
     if irregular and not key_input:
         ix=grid.GetCellData().GetArray("MarcoAPI Element ID").GetValue(cid)
         iy=0
@@ -27,6 +50,12 @@ def cell_id_to_indices(cid,grid,irregular=False,key_input=False,tol=0.0001):
         ix=grid.GetCellData().GetArray("SM-IND").GetValue(cid)
         iy=0
         iz=0
+    elif ind is not None:
+        #x changes fastest (alpha for 3D, gamma for 2D)
+        if dflag=='2D':
+            ix,iy,iz=ind['IG'],ind['IB'],ind['IA']
+        else:
+            ix,iy,iz=ind['IA'],ind['IB'],ind['IG']
     else:
         if not isinstance(grid, vtkUnstructuredGrid):
             nx, ny, _ = grid.GetDimensions()
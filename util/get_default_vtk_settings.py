@@ -32,6 +32,11 @@ def get_default_vtk_settings():
     vtk_settings['show_values']=False #shows result values on subvolumes
                                    #if True (may significnatly slow down visualization!)
     vtk_settings['show_subvol_edges']=True #shows subvolume edges in the plot
+    vtk_settings['surface_only']=False #renders only the outer surface of MacroAPI meshes
+                                       #(faster for large meshes)
+    vtk_settings['interaction_lod']='decimate' #proxy shown while rotating surface_only plots:
+                                               #'decimate', 'outline', or None
+    vtk_settings['lod_cells']=100000 #surfaces with more cells use the proxy while rotating
 
     vtk_settings['show_title'] = True #shows title text if True
     vtk_settings['show_axes'] = True #shows coordinate axes if True
@@ -53,6 +58,10 @@ def get_default_vtk_settings():
     vtk_settings['selected-subvol']={'cell_id':None,'indices':[]} #selected subvolume indices
     vtk_settings['rotate_to_material']=False #Flag to rotate unit cell results to material
                                              #coordinate system from unit cell system
+    vtk_settings['cache_results']=True #keeps plotted h5 results in memory for faster
+                                       #switching between increments
+    vtk_settings['prefetch_incs']=4 #number of increments read ahead in the background
+                                    #when cache_results is True (0 to disable)
     #Camera settings
     vtk_settings['echo-camera-pos']=False #enable to print camera settings to screen
                                           #useful for manually picking/settings views
@@ -0,0 +1,62 @@
+""" functions to get subvolume orientation vectors from CROT input"""
+import numpy as np
+
+def get_ori_vectors(d1):
+    """
+    gets the unit vectors of the local coordinate systems defined by d1 vectors
+
+    Parameters:
+        d1 (np.ndarray): (n,3) d1 vectors (e.g., from CROT)
+
+    Returns:
+        d1 (np.ndarray): (n,3) unit d1 vectors
+        d2 (np.ndarray): (n,3) unit d2 vectors
+        d3 (np.ndarray): (n,3) unit d3 vectors
+    """
+
+    d1=np.array(d1,dtype=float).reshape(-1,3)
+    d1[np.abs(d1[:,0])<1e-9,0]=1e-9 #fix for singularity in d2 calc
+    #assuming d1, calculate other two vectors for coordinate system
+    d2=d1.copy()
+    d2[:,0]=-(d1[:,1]**2+d1[:,2]**2)/d1[:,0]
+    d3=np.cross(d1,d2)
+    #convert all vectors into unit vectors
+    d1/=np.linalg.norm(d1,axis=1)[:,None]
+    d2/=np.linalg.norm(d2,axis=1)[:,None]
+    d3/=np.linalg.norm(d3,axis=1)[:,None]
+    return d1,d2,d3
+
+def set_crot_oris(ruc,crot):
+    """
+    sets the orientation arrays (ORI_X1, ORI_X2, ORI_X3 and their norms) of a ruc
+
+    Parameters:
+        ruc (dict): ruc parameters, orientations of MT rucs (DIM='MT') are set for the
+                    last subvolume
+        crot (list): CROT input, [ia,ib,ig,d1_1,d1_2,d1_3] for each subvolume
+
+    Returns:
+        None.
+    """
+
+    sz=ruc['sm'].size
+    sh=np.shape(ruc['sm'])
+    ruc['ORI_X1'] = np.zeros((sz,3),dtype=float)
+    ruc['ORI_X2'] = np.zeros((sz,3),dtype=float)
+    ruc['ORI_X3'] = np.zeros((sz,3),dtype=float)
+    if len(crot)>0:
+        crot=np.asarray(crot,dtype=float).reshape(-1,6)
+        #python index ordering
+        #2d: r['sm'][b][g], 3d: r['sm'][g][b][a]
+        ia,ib,ig=crot[:,:3].astype(int).T-1
+        if ruc.get('DIM')!='MT' and len(sh)==3:
+            iloc=ig*(sh[1]*sh[2])+ib*sh[2]+ia
+        elif ruc.get('DIM')!='MT' and len(sh)==2:
+            iloc=ib*sh[1]+ig
+        else:
+            iloc=np.full(ia.shape,-1)
+        ruc['ORI_X1'][iloc],ruc['ORI_X2'][iloc],ruc['ORI_X3'][iloc]=get_ori_vectors(crot[:,3:])
+
+    ruc['ORI_X1_NORM']=np.sqrt(np.sum(ruc['ORI_X1']**2,axis=1))
+    ruc['ORI_X2_NORM']=np.sqrt(np.sum(ruc['ORI_X2']**2,axis=1))
+    ruc['ORI_X3_NORM']=np.sqrt(np.sum(ruc['ORI_X3']**2,axis=1))
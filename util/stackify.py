@@ -1,20 +1,22 @@
 """Class for getting converting a single unit cell to RUC stacks """
 import numpy as np
 from tqdm import tqdm
+from util.get_ori_vectors import get_ori_vectors
 
 class Stackify():
     """
     Stackify - utility function for converting a 3D unit cell to columns of 3D unit cells (stacks)
     """
     def __init__(self,rucs=None,stack_dir=1,lev0_mod=103,stack_mod=103,nmats=None,
-                 crot=None,combine_stacks=None,rem_dup=False):
+                 crot=None,combine_stacks=None,rem_dup=True):
         """
         Initialize class.
 
         Parameters:
             rucs (dict): all RUCs in the model
-            stack_dir (int): stack direction - currently only set up to work with stacks 
-                             in the x1-direction (stack_dir=1)
+            stack_dir (int): stack direction - stacks in the x1- (stack_dir=1), x2- (2),
+                             or x3-direction (3), 2D highest level models (lev0_mod=102
+                             or 202) require stack_dir=1
             lev0_mod (int): NASMAT *RUC MOD parameter for highest level model
             stack_mod (int): NASMAT *RUC MOD parameter for individual stacks
             nmats (int): NASMAT *CONSTITUENT NMATS parameter, total number of constituents
@@ -23,8 +25,8 @@ class Stackify():
                                              to combine, keys can only be 'g' currently
                 format: combine_stacks = {'g': [[1,3],[6,8]]} -
                         combines g=1-3 and g=6-8 into a single stack each
-            rem_dup (bool, optional): flag to remove duplicate stacks - may slow down setup a lot
-                                      not really needed with new crot input in NASMAT       
+            rem_dup (bool, optional): flag to replace stacks with the same inputs and
+                                      orientations by a single stack
 
         Returns:
             None.
@@ -32,8 +34,10 @@ class Stackify():
 
         if not rucs:
             raise ValueError("rucs dictionary cannot be empty")
-        if stack_dir!=1:
-            raise ValueError("stack_dir currently only permitted to have a value of 1")
+        if stack_dir not in (1,2,3):
+            raise ValueError("stack_dir must be 1, 2, or 3")
+        if stack_dir!=1 and lev0_mod in (102,202):
+            raise ValueError("2D highest level models (lev0_mod=102 or 202) require stack_dir=1")
         if not nmats:
             raise ValueError("nmats must be defined")
 
@@ -48,9 +52,11 @@ class Stackify():
 
         self.mapping={}
         self.stacks={}
+        self.stack_pos={} #index of each stack in self.oris
         self.newrucs={}
         self.newglob = None
         self.newcrot = None
+        self.oris = self._get_oris()
 
         self._convert()
 
@@ -66,57 +72,59 @@ class Stackify():
             None.
         """
         glob=self.rucs['0']
+        sm=glob['sm']
+
+        ax,outer,inner=self._get_stack_axes()
+        lens=['l','h','d']
+
+        newglob={}
+        newglob['d']=self._get_stack_len('d') if ax==2 else glob['d']
+        newglob['na']=1 if ax==2 else glob['na']
+        newglob['nb']=1 if ax==1 else glob['nb']
+        newglob['ng']=1 if ax==0 else glob['ng']
+        newglob['mod']=self.lev0_mod
+        #stack ids, numbered with the inner axis changing fastest
+        ids=np.arange(sm.shape[outer]*sm.shape[inner],dtype=float)
+        ids=ids.reshape(sm.shape[outer],sm.shape[inner],1)
+        newglob['sm']=np.ascontiguousarray(np.transpose(ids,np.argsort([outer,inner,ax])))
+        newglob['h']=self._get_stack_len('h') if ax==1 else glob['h']
+        newglob['l']=self._get_stack_len('l') if ax==0 else glob['l']
+        newglob['msm']=0
+        newglob['archid']=99
+        newglob['DIM']=str(self.lev0_mod)[2]+'D'
+
+        #sm of all stacks as one strided view, views[i,j] is the sm of a stack (1 along the
+        #axes other than ax), same for d, h, l along the axes other than ax
+        views=np.expand_dims(np.transpose(sm,(outer,inner,ax)),
+                             tuple(2+i for i in range(3) if i!=ax))
+        rows=[np.asarray(glob[lens[i]])[:,None] for i in range(3)]
 
         sc=0
-        if self.stack_dir==1:
-            newglob={}
-            if np.float64==glob['d'].dtype:
-                newglob['d']=np.array([np.sum(glob['d'])])
-            else:#parameter expression
-                p=[i.replace('{','').replace('}','') for i in glob['d']]
-                newglob['d']=np.array(['{'+'+'.join(p)+'}'])
-
-
-            newglob['na']=1
-            newglob['nb']=glob['nb']
-            newglob['ng']=glob['ng']
-            newglob['mod']=self.lev0_mod
-            newglob['sm']=np.zeros([newglob['ng'],newglob['nb'],newglob['na']])
-            newglob['h']=glob['h']
-            newglob['l']=glob['l']
-            newglob['msm']=0
-            newglob['archid']=99
-            newglob['DIM']=str(self.lev0_mod)[2]+'D'
-            for b in range(glob['nb']):
-                for g in range(glob['ng']):
-                    s=self.stacks[str(sc)]={}
-                    s['d']=glob['d']
-                    s['h']=np.array([glob['h'][b]])
-                    s['l']=np.array([glob['l'][g]])
-                    s['na']=glob['na']
-                    s['nb']=1
-                    s['ng']=1
-                    s['sm']=glob['sm'][g:g+1,b:b+1,:]
-                    s['mod']=self.stack_mod
-                    s['archid']=99
-                    s['DIM']=str(self.stack_mod)[2]+'D'
-                    newglob['sm'][g,b,0]=sc
-                    sc+=1
-
-        elif self.stack_dir==2:
-            #TODO: add stack_dir=2 support
-            raise NotImplementedError('stack_dir=2 is not implemented yet.')
-        elif self.stack_dir==3:
-            #TODO: add stack_dir=3 support
-            raise NotImplementedError('stack_dir=3 is not implemented yet.')
+        for i in range(sm.shape[outer]):
+            for j in range(sm.shape[inner]):
+                ind={outer:i,inner:j}
+                s=self.stacks[str(sc)]={}
+                s['d']=glob['d'] if ax==2 else rows[2][ind[2]]
+                s['h']=glob['h'] if ax==1 else rows[1][ind[1]]
+                s['l']=glob['l'] if ax==0 else rows[0][ind[0]]
+                s['na']=glob['na'] if ax==2 else 1
+                s['nb']=glob['nb'] if ax==1 else 1
+                s['ng']=glob['ng'] if ax==0 else 1
+                s['sm']=views[i,j]
+                s['mod']=self.stack_mod
+                #oris index, oris axes are (a,b,g)
+                self.stack_pos[str(sc)]=tuple(slice(None) if k==ax else ind[k] for k in (2,1,0))
+                s['archid']=99
+                s['DIM']=str(self.stack_mod)[2]+'D'
+                sc+=1
 
         self.newglob=newglob
 
         if self.rem_dup:
-            pass #not tested recently
-            # print('Removing stack duplicates...')
-            # self.stacks,newglob['sm']=self.rem_dups(self.stacks,newglob['sm'])
-            # self.newglob=newglob
+            nstacks=len(self.stacks)
+            self.stacks,newglob['sm']=self._rem_dups(self.stacks,newglob['sm'])
+            print(f"Removed {nstacks-len(self.stacks)} duplicate stacks, "
+                  f"{len(self.stacks)} stacks left")
 
         if self.combine_stacks and self.stack_dir==1:
             #TODO: verify logic to comine stacks, not tested recently
@@ -126,6 +134,41 @@ class Stackify():
         self._update_rucs()
         self._set_mapping()
 
+    def _get_stack_axes(self):
+        """
+        function to get the axes of the input ruc sm (g,b,a) for the stack direction
+
+        Parameters:
+            None.
+
+        Returns:
+            ax (int): axis along the stacks
+            outer (int): axis of the outer stack loop
+            inner (int): axis of the inner stack loop, stack ids change fastest along it
+        """
+
+        ax=3-self.stack_dir
+        outer,inner=[i for i in (2,1,0) if i!=ax] #a,b,g order
+        return ax,outer,inner
+
+    def _get_stack_len(self,key):
+        """
+        function to get the total length of the input ruc in the stack direction
+
+        Parameters:
+            key (str): 'd', 'h', or 'l' for the stack direction
+
+        Returns:
+            np.ndarray: summed length, or the sum as a parameter expression
+        """
+
+        vals=self.rucs['0'][key]
+        if np.float64==vals.dtype:
+            return np.array([np.sum(vals)])
+        #parameter expression
+        p=[i.replace('{','').replace('}','') for i in vals]
+        return np.array(['{'+'+'.join(p)+'}'])
+
 
     def _combine_all_stacks(self):
         """
@@ -219,13 +262,19 @@ class Stackify():
         stacks=self.stacks
         newglob=self.newglob
 
+        ax,outer,inner=self._get_stack_axes()
+        #stack ids in the input ruc (outer,inner), before the re-map
+        stack_ids=np.transpose(newglob['sm'],(outer,inner,ax))[:,:,0].astype(int)
+
         newsm={}
         #re-map glob sm
         ic=-17
+        lut=np.zeros(max(int(key) for key in stacks)+1)
         for key in stacks.keys():
             newsm[key]=ic #key - stack id, value - new id
-            newglob['sm'][newglob['sm']==float(key)]=ic
+            lut[int(key)]=ic
             ic-=1
+        newglob['sm'][...]=lut[newglob['sm'].astype(int)]
 
         # Begin creating new ruc dict
         newrucs={'0':newglob}
@@ -267,19 +316,24 @@ class Stackify():
         kls=[int(i) for i in sm_map.keys()]
         kls.sort()
         kls=[str(i) for i in kls]
+        old_ids=np.array([float(key2) for key2 in kls])
+        new_ids=np.array([sm_map[key2] for key2 in kls],dtype=float)
         for key,n in newrucs.items():
             if key=='0':
                 continue
             if 'raw_input' not in n.keys():
+                if 'sm' in n:
+                    #all ids re-mapped at once
+                    pos=np.minimum(np.searchsorted(old_ids,n['sm']),old_ids.size-1)
+                    found=old_ids[pos]==n['sm']
+                    n['sm'][found]=new_ids[pos[found]]
+                    continue
                 for key2 in kls:
                     #n['Msm']=sm_map[key2]
-                    if 'sm' in n:
-                        n['sm'][n['sm']==float(key2)]=sm_map[key2]
-                    else:
-                        if n['f']==int(key2):
-                            n['m']=sm_map[key2]
-                        if n['m']==int(key2):
-                            n['m']=sm_map[key2]
+                    if n['f']==int(key2):
+                        n['m']=sm_map[key2]
+                    if n['m']==int(key2):
+                        n['m']=sm_map[key2]
 
         #Catching previous Msms
         for key,val in newrucs.items():
@@ -296,62 +350,48 @@ class Stackify():
 
         crot_st={}
         if self.crot:
-            na=self.rucs['0']['na']
-            nb=self.rucs['0']['nb']
-            ng=self.rucs['0']['ng']
-            oris=np.zeros((na,nb,ng,3),dtype=float)
-            for c in self.crot:
-                oris[c[0]-1,c[1]-1,c[2]-1,:]=np.asarray([c[3],c[4],c[5]])
-
-            for ib in range(nb):
-                for ig in range(ng):
-                    a=oris[:,ib,ig,:]
-                    # mask=np.any(a!=0, axis=1)
-                    crot_tmp=[]
-                    for ia in range(na):
-                        o=a[ia,:]
-                        if np.any(o!=0):
-                            crot_tmp.append([ia+1,1,1,o[0],o[1],o[2]])
-                    if crot_tmp:
-                        if newrucs['0']['DIM']=='3D':
-                            mat_key = str(int(newrucs['0']['sm'][ig,ib,0]))
-                        else:
-                            mat_key = str(int(newrucs['0']['sm'][ib,ig]))
-
-                        crot_st[mat_key]=crot_tmp
-
-            for key, ruc in newrucs.items():
-                if key in crot_st:
-                    rcrot = crot_st[key]
-                    sz=ruc['sm'].size
-                    sh=ruc['sm'].shape
-                    ruc['ORI_X1'] = np.zeros((sz,3),dtype=float)
-                    ruc['ORI_X2'] = np.zeros((sz,3),dtype=float)
-                    ruc['ORI_X3'] = np.zeros((sz,3),dtype=float)
-
-                    for ori in rcrot:
-                        #extract nasmat subvolume indices
-                        ia,ib,ig = ori[0:3]
-                        #assuming d1, calculate other two vectors for coordinate system
-                        d1=np.array(ori[3:])
-                        if abs(d1[0])<1e-9: #fix for singularity in d2 calc
-                            d1[0] = 1e-9
-                        d2=np.array([-(d1[1]**2 +d1[2]**2)/d1[0],d1[1],d1[2]])
-                        d3=np.array([0.0,-(d1[0]*d1[2] - d2[0]*d1[2]),
-                                     d1[0]*d1[1] - d2[0]*d1[1]])
-                        #convert all vectors into unit vectors
-                        d1=d1/np.linalg.norm(d1)
-                        d2=d2/np.linalg.norm(d2)
-                        d3=d3/np.linalg.norm(d3)
-                        #assign to appropriate position in ori array
-                        iloc = (ig-1) * (sh[1] * sh[2]) + (ib-1) * sh[2] + (ia-1)
-                        ruc['ORI_X1'][iloc]=d1
-                        ruc['ORI_X2'][iloc]=d2
-                        ruc['ORI_X3'][iloc]=d3
-
-                    ruc['ORI_X1_NORM']=np.sqrt(np.sum(ruc['ORI_X1']**2,axis=1))
-                    ruc['ORI_X2_NORM']=np.sqrt(np.sum(ruc['ORI_X2']**2,axis=1))
-                    ruc['ORI_X3_NORM']=np.sqrt(np.sum(ruc['ORI_X3']**2,axis=1))
+            #orientations along each stack (outer,inner,stack,3)
+            oris=np.transpose(self.oris,(2-outer,2-inner,2-ax,3))
+            io,ii,ist=np.nonzero(np.any(oris!=0,axis=3))
+            vecs=oris[io,ii,ist]
+            #subvolume indices in the stacks
+            ind=np.ones((io.size,3),dtype=int)
+            ind[:,2-ax]=ist+1
+            rows=[i+v for i,v in zip(ind.tolist(),vecs.tolist())]
+
+            #all orientation vectors in one pass
+            x1,x2,x3=get_ori_vectors(vecs)
+
+            #entries of each stack in the input ruc, in stack order
+            first=np.ones(io.size,dtype=bool)
+            first[1:]=(io[1:]!=io[:-1])|(ii[1:]!=ii[:-1])
+            start=np.flatnonzero(first)
+            stop=np.r_[start[1:],io.size].astype(int)
+            new_keys=lut[stack_ids[io[start],ii[start]]].astype(int)
+            last={}
+            for grp,(mat_key,i,j) in enumerate(zip(new_keys.tolist(),start.tolist(),
+                                                   stop.tolist())):
+                crot_st[str(mat_key)]=rows[i:j]
+                last[str(mat_key)]=grp
+
+            #orientation arrays of all stacks in crot_st from the same entries, stacks have
+            #a single column so the subvolume index is the position in the stack
+            keys=list(crot_st)
+            grp_key=np.full(start.size,-1)
+            grp_key[[last[key] for key in keys]]=np.arange(len(keys))
+            ent_key=grp_key[np.cumsum(first)-1]
+            m=ent_key>=0
+            ori_x=[]
+            for x in (x1,x2,x3):
+                ori_x.append(np.zeros((len(keys),oris.shape[2],3),dtype=float))
+                ori_x[-1][ent_key[m],ist[m]]=x[m]
+            ori_norm=[np.sqrt(np.sum(x**2,axis=2)) for x in ori_x]
+
+            for k,key in enumerate(keys):
+                ruc=newrucs[key]
+                ruc['ORI_X1'],ruc['ORI_X2'],ruc['ORI_X3']=(x[k] for x in ori_x)
+                ruc['ORI_X1_NORM'],ruc['ORI_X2_NORM'],ruc['ORI_X3_NORM']=(
+                    x[k] for x in ori_norm)
 
 
         self.newrucs=newrucs
@@ -370,53 +410,69 @@ class Stackify():
             glob_sm (np.ndarray): updated material arrangement matrix for ruc
         """
 
-        dup_stk={}
-        dup_found=True
-        while dup_found:
-            dup_found=False
-            dups=[]
-            master_key = None
-            # for key in stacks.keys():
-            for key in tqdm(stacks.keys(),desc='Looking at stacks: ', total=len(stacks.keys())):
-                if dups:
-                    dup_found=True
-                    break
-                for key2 in stacks.keys():
-                    dup=self._id_dup(stacks[key],stacks[key2])
-                    if dup and key!=key2:
-                        master_key=key
-                        dups.append(key2)
-
-            if dups:
-                dup_stk[master_key]=dups
-                for i in dups:
-                    glob_sm[glob_sm==float(i)]=master_key
-                [stacks.pop(k) for k in dups] #pylint: disable=W0106
+        #stacks with the same canonical bytes (dict keys, hashed once) are duplicates
+        masters={}
+        remap={}
+        for key,stack in tqdm(stacks.items(),desc='Looking at stacks: ',total=len(stacks)):
+            master=masters.setdefault(self._get_stack_bytes(key,stack),key)
+            if master!=key:
+                remap[key]=master
+
+        if remap:
+            #stack ids in glob_sm are replaced by the id of the first identical stack
+            lut=np.arange(max(int(key) for key in stacks)+1,dtype=float)
+            for key,master in remap.items():
+                lut[int(key)]=float(master)
+            glob_sm[...]=lut[glob_sm.astype(int)]
+            for key in remap:
+                stacks.pop(key)
 
         return stacks,glob_sm
 
+    def _get_stack_bytes(self,key,stack):
+        """
+        function to get a canonical byte representation of the inputs and orientations
+        of a stack
 
-    def _id_dup(self,d1,d2):
+        Parameters:
+            key (str): stack id
+            stack (dict): stack parameters
+
+        Returns:
+            bytes: equal for stacks with the same na, nb, ng, mod, d, h, l, sm, and crot
         """
-        function to identify duplicate stacks
+
+        parts=[repr((stack['na'],stack['nb'],stack['ng'],stack['mod'])).encode()]
+        arrs=[np.asarray(stack[arr]) for arr in ['d','h','l','sm']]
+        pos=self.stack_pos.get(key)
+        if self.oris is not None and pos is not None:
+            arrs.append(self.oris[pos])
+        for arr in arrs:
+            parts.append(f"{arr.dtype.str}{arr.shape}".encode())
+            parts.append(np.ascontiguousarray(arr).tobytes())
+        return b'|'.join(parts)
+
+    def _get_oris(self):
+        """
+        function to get the crot orientation of each subvolume of the input ruc
 
         Parameters:
-            d1,d1 (dict): two stacks to compare
+            None.
 
         Returns:
-            bool: flag to tell if two stacks are the same
+            oris (np.ndarray): (na,nb,ng,3) d1 vectors (zeros if not given),
+                               None if there is no crot input
         """
 
-        if d1['na']!= d2['na']:
-            return False
-        if d1['nb']!= d2['nb']:
-            return False
-        if d1['ng']!= d2['ng']:
-            return False
-        if d1['mod']!= d2['mod']:
-            return False
+        if not self.crot:
+            return None
+        ruc=self.rucs['0']
+        oris=np.zeros((ruc['na'],ruc['nb'],ruc['ng'],3),dtype=float)
+        c=np.asarray(self.crot,dtype=float).reshape(-1,6)
+        ia,ib,ig=c[:,:3].astype(int).T-1
+        oris[ia,ib,ig,:]=c[:,3:]
+        return oris
 
-        return all(np.array_equal(d1[arr], d2[arr]) for arr in ['d','h','l','sm'])
 
     def _set_mapping(self):
         """
@@ -0,0 +1,224 @@
+"""Class for substituting NASMAT parameters into many input decks at once"""
+import os
+import re
+import ast
+import operator as op
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+#parameter or expression slot in a MAC file, e.g., {E_M=3.0E3}, {E_M}, {0.5*E_M/(1+NU_M)}
+SLOT_RE = re.compile(r'{[^{}\n]*}')
+
+#allowed operations for expressions
+OPS = {
+    ast.Add: op.add,
+    ast.Sub: op.sub,
+    ast.Mult: op.mul,
+    ast.Div: op.truediv,
+    ast.Pow: op.pow,
+    ast.USub: op.neg,
+    ast.UAdd: op.pos,
+    ast.Mod: op.mod,
+    ast.FloorDiv: op.floordiv,
+}
+
+
+def compile_expr(expr):
+    """
+    function to compile an expression into a function of the parameter values
+
+    Parameters:
+        expr (str): expression containing numbers, parameter names and OPS
+
+    Returns:
+        func (callable): func(values) evaluates the expression, values is a dict of
+                         parameter name to float or np.ndarray (evaluated element-wise)
+        names (set): parameter names used in the expression
+    """
+
+    names=set()
+
+    def _compile(node):
+        if isinstance(node, ast.Constant) and isinstance(node.value,(int,float)):
+            val=float(node.value)
+            return lambda v: val
+        if isinstance(node, ast.Name):
+            name=node.id
+            names.add(name)
+            return lambda v: v[name]
+        if isinstance(node, ast.UnaryOp) and type(node.op) in OPS:
+            f_op,f_a=OPS[type(node.op)],_compile(node.operand)
+            return lambda v: f_op(f_a(v))
+        if isinstance(node, ast.BinOp) and type(node.op) in OPS:
+            f_op,f_a,f_b=OPS[type(node.op)],_compile(node.left),_compile(node.right)
+            return lambda v: f_op(f_a(v),f_b(v))
+        raise ValueError(f"Unsafe expression: {expr}")
+
+    try:
+        tree=ast.parse(expr.strip(), mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"Unable to parse expression: {expr}") from e
+
+    return _compile(tree.body),names
+
+
+class SubParamTemplate():
+    """
+    NASMAT parameter substitution for many decks from one template
+
+    The template MAC file uses the same parameter and expression syntax as SubParam.
+    It is read and parsed once, expressions are compiled once, and any number of decks
+    can then be rendered from a table of parameter samples (e.g., a dict of np.ndarrays
+    or a pandas DataFrame), with expressions evaluated for all samples at once.
+
+    Unlike SubParam, parameters without a default value must be given in the samples
+    (there is no prompt for input) and the working directory is not changed.
+    """
+    def __init__(self,param_mac):
+        """
+        initialization routine for class
+
+        Parameters:
+            param_mac (str): MAC input file containing parameters
+
+        Returns:
+            None.
+        """
+
+        self.param_mac=param_mac
+        with open(param_mac,'r',encoding='utf-8') as f:
+            text=f.read()
+
+        self.defaults={} #default value str for each parameter
+        self.exprs={} #compiled function for each expression
+        self.slots=[] #parameter name or expression for each slot, in order
+        literals=[]
+        pos=0
+        for m in SLOT_RE.finditer(text):
+            literals.append(text[pos:m.start()])
+            pos=m.end()
+            item=m.group()[1:-1]
+            if '=' in item:
+                key,val=item.split('=',1)
+                self.defaults[key]=val
+                item=key
+            elif any(x in item for x in ['+','-','/','*']) and item not in self.exprs:
+                self.exprs[item]=compile_expr(item)
+            self.slots.append(item)
+        literals.append(text[pos:])
+
+        self.params=sorted({s for s in self.slots if s not in self.exprs} |
+                           {n for _,names in self.exprs.values() for n in names})
+        #one format str for the whole deck, slot values are filled with the % operator
+        self._fmt='%s'.join(lit.replace('%','%%') for lit in literals)
+
+    def _get_columns(self,samples):
+        """
+        function to get the str value of every slot for every sample
+
+        Parameters:
+            samples (dict or DataFrame): parameter values, each a scalar or 1D array
+
+        Returns:
+            cols (list): np.ndarray of str values for each slot
+            n (int): number of samples
+        """
+
+        vals={}
+        for key,val in samples.items():
+            vals[key]=np.atleast_1d(np.asarray(val))
+        n=max([v.shape[0] for v in vals.values()],default=1)
+        for key,val in vals.items():
+            if val.shape[0] not in (1,n):
+                raise ValueError(f"Parameter {key} has {val.shape[0]} values, expected {n}")
+
+        missing=[p for p in self.params if p not in vals and p not in self.defaults]
+        if missing:
+            raise ValueError(f"No values given for parameters: {', '.join(missing)}")
+
+        text={} #str values of each parameter, as written to the deck
+        num={} #float values of each parameter, used in expressions
+        for p in self.params:
+            if p in vals:
+                text[p]=np.broadcast_to(vals[p].astype(str),(n,))
+            else:
+                text[p]=np.full(n,self.defaults[p],dtype=object)
+        for _,names in self.exprs.values():
+            for p in names:
+                if p not in num:
+                    num[p]=vals[p].astype(np.float64) if p in vals else float(self.defaults[p])
+
+        for expr,(func,_) in self.exprs.items():
+            res=np.broadcast_to(np.asarray(func(num),dtype=np.float64),(n,))
+            text[expr]=np.char.mod('%12E',res)
+
+        return [text[s] for s in self.slots],n
+
+    def render(self,samples):
+        """
+        function to create the text of the substituted decks
+
+        Parameters:
+            samples (dict or DataFrame): parameter values, each a scalar or 1D array
+
+        Returns:
+            decks (list): str of each substituted deck
+        """
+
+        cols,n=self._get_columns(samples)
+        if not cols:
+            return [self._fmt.replace('%%','%')]*n
+        return [self._fmt % row for row in zip(*[c.tolist() for c in cols])]
+
+    def get_filenames(self,fileid,workdir=None):
+        """
+        function to get the file names of substituted decks
+
+        Parameters:
+            fileid (list): ID numbers to append to the file names
+            workdir (str): output directory (defaults to template directory)
+
+        Returns:
+            files (list): file names ending in _<fileid>.MAC
+        """
+
+        if workdir is None:
+            workdir=os.path.dirname(os.path.abspath(self.param_mac))
+        base=os.path.basename(self.param_mac)[:-4]
+        return [os.path.join(workdir,f"{base}_{i}.MAC") for i in fileid]
+
+    def write(self,samples,workdir=None,fileid=None,nthreads=1):
+        """
+        function to create the substituted deck files
+
+        Parameters:
+            samples (dict or DataFrame): parameter values, each a scalar or 1D array
+            workdir (str): output directory (defaults to template directory)
+            fileid (list): ID numbers to append to the file names (defaults to 0,1,...)
+            nthreads (int): number of threads used to write files
+
+        Returns:
+            files (list): names of the written files
+        """
+
+        decks=self.render(samples)
+        if fileid is None:
+            fileid=range(len(decks))
+        files=self.get_filenames(fileid,workdir)
+        if len(files)!=len(decks):
+            raise ValueError(f"{len(files)} file ids given for {len(decks)} samples")
+        if workdir:
+            os.makedirs(workdir,exist_ok=True)
+
+        def _write(args):
+            with open(args[0],'w',encoding='utf-8') as f:
+                f.write(args[1])
+
+        if nthreads and nthreads>1:
+            with ThreadPoolExecutor(max_workers=nthreads) as pool:
+                list(pool.map(_write,zip(files,decks)))
+        else:
+            for item in zip(files,decks):
+                _write(item)
+
+        return files
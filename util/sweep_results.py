@@ -0,0 +1,248 @@
+"""Class for collecting NASMAT outputs from many jobs into one file"""
+import os
+import re
+import glob
+from concurrent.futures import ProcessPoolExecutor
+import h5py
+import numpy as np
+from util.output_parser import output_parser
+
+#job id appended to the MAC file name by SubParam/SubParamTemplate (e.g., deck_12.MAC)
+JOB_ID_RE = re.compile(r'_(\d+)$')
+
+
+def _parse_job(fname,lam=False):
+    """
+    function to parse the outputs of one NASMAT job (run in a worker process)
+
+    Parameters:
+        fname (str): name of NASMAT *.out file
+        lam (bool): flag to read *LAMINATE output
+
+    Returns:
+        d (dict): 'props' (dict of floats), 'error' (bool), and 'curve' (np.ndarray or None)
+    """
+
+    d={'props':{},'error':True,'curve':None}
+    if os.path.isfile(fname):
+        out=output_parser(fname=fname,lam=lam)
+        d['error']=bool(out.pop('ERROR'))
+        d['props']={key:float(val) for key,val in out.items()}
+
+    directory,filename=os.path.split(fname)
+    base,_=os.path.splitext(filename)
+    data_file=os.path.join(directory,base.upper()+'_macro.data')
+    if os.path.isfile(data_file):
+        d['curve']=np.atleast_2d(np.loadtxt(data_file))
+
+    return d
+
+
+def _select_param(key,val,job_id):
+    """
+    function to get the values of an input parameter for a set of jobs
+
+    Parameters:
+        key (str): parameter name
+        val (np.ndarray, list, dict, or scalar): values indexed by job id, values keyed by
+                                                 job id, or a value used for all jobs
+        job_id (np.ndarray): id of each job
+
+    Returns:
+        np.ndarray: value of each job
+    """
+
+    if isinstance(val,dict):
+        missing=[i for i in job_id.tolist() if i not in val]
+        if missing:
+            raise ValueError(f"Parameter {key} has no values for job ids {missing[:10]}")
+        return np.asarray([val[i] for i in job_id.tolist()])
+
+    val=np.asarray(val)
+    if not val.ndim:
+        return np.full(job_id.shape[0],val)
+    if job_id.size and job_id.max()>=val.shape[0]:
+        raise ValueError(f"Parameter {key} has {val.shape[0]} values, but job ids go up to "
+                         f"{job_id.max()}. Use a dict keyed by job id for other ids.")
+    return val[job_id]
+
+
+class SweepResults():
+    """
+    SweepResults - effective properties, elapsed times, error flags, and *_macro.data
+    curves of a set of NASMAT jobs (e.g., a parameter sweep), stored by column.
+
+    Curves of all jobs are stored in one array, the rows of job i are
+    curves[curve_offsets[i]:curve_offsets[i+1]] (see get_curve).
+    """
+    def __init__(self,job_id,files,error,props,curves,curve_offsets,params=None): #pylint: disable=R0913,R0917
+        """
+        initialize class
+
+        Parameters:
+            job_id (np.ndarray): id of each job
+            files (np.ndarray): *.out file of each job
+            error (np.ndarray): bool flag for jobs with errors or missing outputs
+            props (dict): np.ndarray of each output value, nan if not found
+            curves (np.ndarray): *_macro.data rows of all jobs
+            curve_offsets (np.ndarray): start row of each job in curves (njobs+1)
+            params (dict): np.ndarray of each input parameter
+
+        Returns:
+            None.
+        """
+
+        self.job_id=np.asarray(job_id)
+        self.files=np.asarray(files,dtype=str)
+        self.error=np.asarray(error,dtype=bool)
+        self.props=props
+        self.curves=curves
+        self.curve_offsets=curve_offsets
+        self.params=params if params else {}
+
+    def __len__(self):
+        return self.job_id.shape[0]
+
+    @classmethod
+    def collect(cls,files,params=None,lam=False,nproc=None):
+        """
+        function to parse the outputs of a set of NASMAT jobs
+
+        Parameters:
+            files (str or list): job directory (all *.out files are read) or list of
+                                 *.out or *.MAC files
+            params (dict): input parameter values of each job (e.g., the samples written
+                           with SubParamTemplate), arrays indexed by job id, dicts keyed by
+                           job id, or scalars. Job ids must be in the file names.
+            lam (bool): flag to read *LAMINATE output
+            nproc (int): number of processes used to parse files (defaults to number of cores).
+                         Scripts using more than one process on Windows must be run from
+                         within an if __name__ == "__main__": block.
+
+        Returns:
+            SweepResults: collected results sorted by job id
+        """
+
+        if isinstance(files,str):
+            files=glob.glob(os.path.join(files,'*.out'))
+        files=[os.path.splitext(f)[0]+'.out' for f in files]
+
+        #sort by the job id in the file name, if present
+        ids=[]
+        named=True
+        for i,f in enumerate(files):
+            m=JOB_ID_RE.search(os.path.splitext(os.path.basename(f))[0])
+            ids.append(int(m.group(1)) if m else i)
+            named=named and m is not None
+        order=np.argsort(ids,kind='stable')
+        job_id=np.asarray(ids,dtype=np.int64)[order]
+        files=[files[i] for i in order]
+
+        nproc=nproc or os.cpu_count() or 1
+        if nproc>1 and len(files)>1:
+            with ProcessPoolExecutor(max_workers=nproc) as pool:
+                jobs=list(pool.map(_parse_job,files,[lam]*len(files),
+                                   chunksize=max(1,len(files)//(4*nproc))))
+        else:
+            jobs=[_parse_job(f,lam) for f in files]
+
+        n=len(jobs)
+        keys=sorted({key for job in jobs for key in job['props']})
+        props={key:np.full(n,np.nan) for key in keys}
+        for i,job in enumerate(jobs):
+            for key,val in job['props'].items():
+                props[key][i]=val
+
+        #curves of all jobs in one array, padded with nan if the number of columns differs
+        ncol=max([job['curve'].shape[1] for job in jobs if job['curve'] is not None],default=0)
+        nrows=[0 if job['curve'] is None else job['curve'].shape[0] for job in jobs]
+        curve_offsets=np.zeros(n+1,dtype=np.int64)
+        curve_offsets[1:]=np.cumsum(nrows)
+        curves=np.full((curve_offsets[-1],ncol),np.nan)
+        for i,job in enumerate(jobs):
+            if job['curve'] is not None:
+                curves[curve_offsets[i]:curve_offsets[i+1],:job['curve'].shape[1]]=job['curve']
+
+        sel_params={}
+        if params:
+            if not named:
+                raise ValueError("Job ids not found in all file names (e.g., deck_12.out), "
+                                 "params can not be matched to the jobs")
+            sel_params={key:_select_param(key,val,job_id) for key,val in params.items()}
+
+        return cls(job_id,files,[job['error'] for job in jobs],props,curves,curve_offsets,
+                   sel_params)
+
+    def get_curve(self,i):
+        """
+        function to get the *_macro.data rows of a job
+
+        Parameters:
+            i (int): job index (not job id)
+
+        Returns:
+            np.ndarray: *_macro.data rows (empty if not found)
+        """
+
+        return self.curves[self.curve_offsets[i]:self.curve_offsets[i+1]]
+
+    def save(self,fname):
+        """
+        function to write the results to a *.npz or *.h5 file
+
+        Parameters:
+            fname (str): output file name, format set by extension
+
+        Returns:
+            None.
+        """
+
+        data={'job_id':self.job_id,'files':self.files,'error':self.error,
+              'curves':self.curves,'curve_offsets':self.curve_offsets}
+        data.update({f"props/{key}":val for key,val in self.props.items()})
+        data.update({f"params/{key}":val for key,val in self.params.items()})
+
+        if fname.lower().endswith('.npz'):
+            np.savez(fname,**data)
+        elif fname.lower().endswith(('.h5','.hdf5')):
+            with h5py.File(fname,'w') as f:
+                for key,val in data.items():
+                    if val.dtype.kind=='U':
+                        f.create_dataset(key,data=val.astype(object),
+                                         dtype=h5py.string_dtype(encoding='utf-8'))
+                    else:
+                        f.create_dataset(key,data=val)
+        else:
+            raise ValueError(f"Unknown sweep results format: {fname}. Use *.npz or *.h5")
+
+    @classmethod
+    def load(cls,fname):
+        """
+        function to read results written with save
+
+        Parameters:
+            fname (str): *.npz or *.h5 file name
+
+        Returns:
+            SweepResults: stored results
+        """
+
+        data={}
+        if fname.lower().endswith('.npz'):
+            with np.load(fname,allow_pickle=False) as f:
+                for key in f.files:
+                    data[key]=f[key]
+        else:
+            with h5py.File(fname,'r') as f:
+                def _visit(name,obj):
+                    if isinstance(obj,h5py.Dataset):
+                        if h5py.check_string_dtype(obj.dtype):
+                            data[name]=np.asarray(obj.asstr()[()],dtype=str)
+                        else:
+                            data[name]=obj[()]
+                f.visititems(_visit)
+
+        props={key[6:]:val for key,val in data.items() if key.startswith('props/')}
+        params={key[7:]:val for key,val in data.items() if key.startswith('params/')}
+        return cls(data['job_id'],data['files'],data['error'],props,data['curves'],
+                   data['curve_offsets'],params)
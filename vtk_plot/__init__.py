@@ -1 +1,2 @@
 from .vtk_plot import VtkPlot
+from .scene_manager import SceneManager
@@ -0,0 +1,203 @@
+"""Class for clipping grids with a box using a precomputed spatial index"""
+import zlib
+import numpy as np
+from vtkmodules.vtkCommonDataModel import vtkDataObject # pylint: disable=E0611
+from vtkmodules.vtkFiltersCore import vtkThreshold # pylint: disable=E0611
+from vtk.util.numpy_support import numpy_to_vtk,vtk_to_numpy # pylint: disable=E0401,E0611
+
+#name of the cell array used to keep (1) or clip (0) each cell
+CLIP_NAME = 'CLIPPED'
+
+#minimum time between clip updates while the box widget is dragged (s)
+CLIP_INTERVAL = 0.05
+
+
+class ClipIndex():
+    """
+    ClipIndex - bounds of the cells of an unstructured grid, sorted along each axis.
+
+    The cells inside an axis-aligned box are found with a range query (np.searchsorted) on
+    the box face with the fewest candidate cells, and only those candidates are checked
+    against the other faces. Candidates of rotated boxes are also tested against the box
+    planes. As with vtkExtractGeometry, only cells with all points inside the box are kept.
+    """
+    def __init__(self,grid):
+        """
+        initialize class
+
+        Parameters:
+            grid (vtkUnstructuredGrid): grid to clip, e.g., the output of the mask filter
+
+        Returns:
+            None.
+        """
+
+        self.grid=grid
+        self.key=get_index_key(grid)
+        self.ncells=grid.GetNumberOfCells()
+
+        pts=vtk_to_numpy(grid.GetPoints().GetData()).astype(np.float64) \
+            if self.ncells else np.zeros((0,3))
+        cells=grid.GetCells()
+        offsets=vtk_to_numpy(cells.GetOffsetsArray()).astype(np.int64)
+        conn=vtk_to_numpy(cells.GetConnectivityArray()).astype(np.int64)
+        sizes=np.diff(offsets)
+        self.pts=pts
+
+        if self.ncells and (sizes==sizes[0]).all():
+            #same cell type (hexahedra or voxels), bounds without an (ncells,npts,3) copy
+            self.conn=conn.reshape(self.ncells,sizes[0])
+            self.cmin=pts[self.conn[:,0]]
+            self.cmax=self.cmin.copy()
+            for k in range(1,sizes[0]):
+                np.minimum(self.cmin,pts[self.conn[:,k]],out=self.cmin)
+                np.maximum(self.cmax,pts[self.conn[:,k]],out=self.cmax)
+        elif self.ncells:
+            self.conn=None #rotated boxes are only clipped by their bounds
+            self.cmin=np.minimum.reduceat(pts[conn],offsets[:-1],axis=0)
+            self.cmax=np.maximum.reduceat(pts[conn],offsets[:-1],axis=0)
+        else:
+            self.conn=None
+            self.cmin=self.cmax=np.zeros((0,3))
+
+        #cell order and sorted bounds along each axis
+        self.order_min=np.argsort(self.cmin,axis=0,kind='stable')
+        self.order_max=np.argsort(self.cmax,axis=0,kind='stable')
+        self.sorted_min=np.take_along_axis(self.cmin,self.order_min,axis=0)
+        self.sorted_max=np.take_along_axis(self.cmax,self.order_max,axis=0)
+
+        self._clip_grid=None
+        self._clip_filter=None
+
+    def matches(self,grid):
+        """
+        function to check if the index can be used for a grid
+
+        Parameters:
+            grid (vtkDataSet): grid to clip
+
+        Returns:
+            bool: True if grid has the cells of the indexed grid
+        """
+
+        return self.key is not None and self.key==get_index_key(grid)
+
+    def query(self,bounds,planes=None):
+        """
+        function to find the cells inside a box
+
+        Parameters:
+            bounds (list): 6 floats with the bounds of the box
+            planes (tuple): (normals, origins) arrays of the outward box planes for rotated
+                            boxes, None for boxes aligned with the axes
+
+        Returns:
+            ids (np.ndarray): sorted ids of the cells inside the box
+        """
+
+        lo=np.asarray(bounds[0::2],dtype=np.float64)
+        hi=np.asarray(bounds[1::2],dtype=np.float64)
+
+        #number of cells passing each face of the box (cmin > lo or cmax < hi)
+        start=[np.searchsorted(self.sorted_min[:,a],lo[a],side='right') for a in range(3)]
+        stop=[np.searchsorted(self.sorted_max[:,a],hi[a],side='left') for a in range(3)]
+        counts=[self.ncells-i for i in start]+stop
+        face=int(np.argmin(counts))
+        if face<3:
+            ids=self.order_min[start[face]:,face]
+        else:
+            ids=self.order_max[:stop[face-3],face-3]
+
+        inside=(self.cmin[ids]>lo).all(axis=1) & (self.cmax[ids]<hi).all(axis=1)
+        ids=ids[inside]
+
+        if planes is not None and self.conn is not None and ids.size:
+            normals,origins=planes
+            #signed distance of every point of each candidate cell to each plane
+            pts=self.pts[self.conn[ids]]
+            dist=np.einsum('cpk,fk->cpf',pts,normals)-np.einsum('fk,fk->f',origins,normals)
+            ids=ids[(dist<0).all(axis=(1,2))]
+
+        return np.sort(ids)
+
+    def extract(self,ids):
+        """
+        function to extract cells of the indexed grid with a persistent threshold filter
+
+        Parameters:
+            ids (np.ndarray): cell ids to keep
+
+        Returns:
+            vtkUnstructuredGrid: extracted cells with all cell arrays of the grid
+        """
+
+        if self._clip_filter is None:
+            self._clip_grid=self.grid.NewInstance()
+            self._clip_filter=vtkThreshold()
+            self._clip_filter.SetInputData(self._clip_grid)
+            self._clip_filter.SetInputArrayToProcess(0,0,0,
+                                    vtkDataObject.FIELD_ASSOCIATION_CELLS,CLIP_NAME)
+            self._clip_filter.SetThresholdFunction(vtkThreshold.THRESHOLD_UPPER)
+            self._clip_filter.SetUpperThreshold(0.5)
+
+        #arrays of the grid (e.g., results) may have changed since the last clip
+        self._clip_grid.ShallowCopy(self.grid)
+        mask=np.zeros(self.ncells,dtype=np.uint8)
+        mask[ids]=1
+        vtk_arr=numpy_to_vtk(mask,deep=True)
+        vtk_arr.SetName(CLIP_NAME)
+        self._clip_grid.GetCellData().AddArray(vtk_arr)
+
+        scalars=self.grid.GetCellData().GetScalars()
+        self._clip_filter.Update()
+        clipped=self._clip_filter.GetOutput()
+        clipped.GetCellData().RemoveArray(CLIP_NAME)
+        if scalars is not None: #active scalars are reset by the filter
+            clipped.GetCellData().SetActiveScalars(scalars.GetName())
+        return clipped
+
+
+def get_index_key(grid):
+    """
+    Function to get the key of the cells of a grid, grids extracted from the same full grid
+    with the same cells have the same key
+
+    Parameters:
+        grid (vtkDataSet): grid to clip
+
+    Returns:
+        key (tuple): key of the grid cells (None if the grid has no 'vtkOriginalCellIds')
+    """
+
+    ids=grid.GetCellData().GetArray('vtkOriginalCellIds')
+    if ids is None:
+        return None
+    return (grid.GetNumberOfCells(),grid.GetNumberOfPoints(),tuple(grid.GetBounds()),
+            zlib.crc32(vtk_to_numpy(ids).tobytes()))
+
+
+def get_box_planes(polydata):
+    """
+    Function to get the planes of a rotated box widget
+
+    Parameters:
+        polydata (vtkPolyData): box widget polydata (from vtkBoxWidget.GetPolyData),
+                                8 corners, 6 face centers, and the center
+
+    Returns:
+        tuple: (normals, origins) of the outward box planes, None if the box is aligned
+               with the axes
+    """
+
+    pts=vtk_to_numpy(polydata.GetPoints().GetData()).astype(np.float64)
+    bounds=np.asarray(polydata.GetBounds()).reshape(3,2)
+    tol=1e-9*max(1.0,np.abs(bounds).max())
+    corners=pts[:8]
+    if all(np.isclose(corners[:,a,None],bounds[a][None,:],rtol=0,atol=tol).any(axis=1).all()
+           for a in range(3)):
+        return None
+
+    origins=pts[8:14]
+    normals=origins-pts[14]
+    normals/=np.linalg.norm(normals,axis=1)[:,None]
+    return normals,origins
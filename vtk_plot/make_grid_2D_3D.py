@@ -1,9 +1,13 @@
 """Functions to create a 2D or 3D rectilinear grid.""" #pylint: disable=C0103
 import numpy as np
 from vtkmodules.vtkCommonDataModel import vtkRectilinearGrid # pylint: disable=E0611
-from vtkmodules.vtkCommonCore import vtkIntArray,vtkFloatArray # pylint: disable=E0611
+from vtkmodules.vtkCommonCore import vtkFloatArray # pylint: disable=E0611
 from vtk.util.numpy_support import numpy_to_vtk # pylint: disable=E0401,E0611
 
+#cell arrays with the 0-based subvolume indices, material or RUC (<0) of the subvolume,
+#and hierarchy level (relative to the plotted RUC) of each cell
+INDEX_NAMES = ('IA','IB','IG','RUCID','LEVEL')
+
 
 def set_ori_all(ncells,name,ori):
     """
@@ -63,72 +67,100 @@ def make_grid_2d_3d(ruc,vmap,dflag):
         grid.SetXCoordinates(numpy_to_vtk(l))
         grid.SetYCoordinates(numpy_to_vtk(h))
         grid.SetZCoordinates(numpy_to_vtk(d))
-        mats=ruc['sm'].astype(int).flatten()
-        cell_data = numpy_to_vtk(mats)
-
     elif dflag=='3D':
         grid.SetDimensions(ruc['na']+1,ruc['nb']+1, ruc['ng']+1)
         grid.SetXCoordinates(numpy_to_vtk(d))
         grid.SetYCoordinates(numpy_to_vtk(h))
         grid.SetZCoordinates(numpy_to_vtk(l))
-        mats=ruc['sm'].astype(int).ravel()
-        cell_data=vtkIntArray()
-        for i,mat in enumerate(mats):
-            cell_data.InsertValue(i,mat)
 
-    cell_data.SetName('SM-IND')
-    cell_data.SetNumberOfComponents(1)
-    cell_data.SetNumberOfTuples(grid.GetNumberOfCells())
-    grid.GetCellData().AddArray(cell_data)
+    mats=np.ascontiguousarray(ruc['sm'],dtype=np.int32).ravel()
+    add_cell_array(grid,mats,'SM-IND')
 
+    rucid=mats
     if vmap:
-        sm_act = np.vectorize(vmap.get)(mats)
-        cell_data=vtkIntArray()
-        for i, val in enumerate(sm_act):
-            cell_data.InsertValue(i, val)
-
-        cell_data.SetName('SM')
-        cell_data.SetNumberOfComponents(1)
-        cell_data.SetNumberOfTuples(grid.GetNumberOfCells())
-        grid.GetCellData().AddArray(cell_data)
-
-    if 'ORI_X1' in ruc.keys():
-        ori_x1 = numpy_to_vtk(ruc['ORI_X1'])
-        ori_x1.SetName('ORI_X1')
-        ori_x1.SetNumberOfComponents(3)
-        ori_x1.SetNumberOfTuples(grid.GetNumberOfCells())
-        grid.GetCellData().AddArray(ori_x1)
-
-        ori_x1_norm = numpy_to_vtk(ruc['ORI_X1_NORM'])
-        ori_x1_norm.SetName('ORI_X1_NORM')
-        ori_x1_norm.SetNumberOfComponents(1)
-        ori_x1_norm.SetNumberOfTuples(grid.GetNumberOfCells())
-        grid.GetCellData().AddArray(ori_x1_norm)
-
-    if 'ORI_X2' in ruc.keys():
-        ori_x2 = numpy_to_vtk(ruc['ORI_X2'])
-        ori_x2.SetName('ORI_X2')
-        ori_x2.SetNumberOfComponents(3)
-        ori_x2.SetNumberOfTuples(grid.GetNumberOfCells())
-        grid.GetCellData().AddArray(ori_x2)
-
-        ori_x2_norm = numpy_to_vtk(ruc['ORI_X2_NORM'])
-        ori_x2_norm.SetName('ORI_X2_NORM')
-        ori_x2_norm.SetNumberOfComponents(1)
-        ori_x2_norm.SetNumberOfTuples(grid.GetNumberOfCells())
-        grid.GetCellData().AddArray(ori_x2_norm)
-
-    if 'ORI_X3' in ruc.keys():
-        ori_x3 = numpy_to_vtk(ruc['ORI_X3'])
-        ori_x3.SetName('ORI_X3')
-        ori_x3.SetNumberOfComponents(3)
-        ori_x3.SetNumberOfTuples(grid.GetNumberOfCells())
-        grid.GetCellData().AddArray(ori_x3)
-
-        ori_x3_norm = numpy_to_vtk(ruc['ORI_X3_NORM'])
-        ori_x3_norm.SetName('ORI_X3_NORM')
-        ori_x3_norm.SetNumberOfComponents(1)
-        ori_x3_norm.SetNumberOfTuples(grid.GetNumberOfCells())
-        grid.GetCellData().AddArray(ori_x3_norm)
+        rucid=get_mat_lut(vmap,mats)[mats-mats.min()]
+        add_cell_array(grid,rucid,'SM')
+
+    #x changes fastest (alpha for 3D, gamma for 2D)
+    nx,ny,_=[n-1 for n in grid.GetDimensions()]
+    cid=np.arange(grid.GetNumberOfCells())
+    ix,iy,iz=cid%nx,(cid//nx)%ny,cid//(nx*ny)
+    if dflag=='2D':
+        add_index_arrays(grid,iz,iy,ix,rucid)
+    else:
+        add_index_arrays(grid,ix,iy,iz,rucid)
+
+    for ori in ('ORI_X1','ORI_X2','ORI_X3'):
+        if ori in ruc.keys():
+            add_cell_array(grid,ruc[ori],ori,ncomp=3)
+            add_cell_array(grid,ruc[ori+'_NORM'],ori+'_NORM')
 
     return grid
+
+
+def get_mat_lut(vmap,mats):
+    """
+    Function to get a dense lookup array to change material numbers
+
+    Parameters:
+        vmap (dict): map to change material numbers
+        mats (np.ndarray): material numbers in grid
+
+    Returns:
+        lut (np.ndarray): new material number for each value from mats.min() to mats.max()
+    """
+
+    if mats.size==0:
+        return np.zeros(0,dtype=np.int32)
+    mmin=mats.min()
+    lut=np.full(mats.max()-mmin+1,-1,dtype=np.int32) #-1 for materials not in vmap
+    for key,val in vmap.items():
+        if mmin<=key<=mats.max():
+            lut[key-mmin]=val
+    return lut
+
+
+def add_index_arrays(grid,ia,ib,ig,rucid,level=0): #pylint: disable=R0913,R0917
+    """
+    Function to add the subvolume index arrays (INDEX_NAMES) to a grid, picked cells are
+    then found with a lookup (see util.cell_id_to_indices)
+
+    Parameters:
+        grid (vtkDataSet): grid to add arrays to
+        ia (np.ndarray or int): 0-based alpha index of the subvolume of each cell
+        ib (np.ndarray or int): 0-based beta index of the subvolume of each cell
+        ig (np.ndarray or int): 0-based gamma index of the subvolume of each cell
+        rucid (np.ndarray or int): material, or RUC (<0), of the subvolume of each cell
+        level (np.ndarray or int): hierarchy level of each cell relative to the plotted RUC
+
+    Returns:
+        None.
+    """
+
+    ncells=grid.GetNumberOfCells()
+    for name,val in zip(INDEX_NAMES,(ia,ib,ig,rucid,level)):
+        add_cell_array(grid,np.broadcast_to(np.asarray(val,dtype=np.int32),(ncells,)),name)
+
+
+def add_cell_array(grid,arr,name,ncomp=1):
+    """
+    Function to add a numpy array to the grid cell data without copying it
+
+    Parameters:
+        grid (vtkDataSet): grid to add array to
+        arr (np.ndarray): cell values
+        name (str): array name
+        ncomp (int): number of components
+
+    Returns:
+        vtk_arr (vtkDataArray): array added to grid
+    """
+
+    #numpy_to_vtk keeps a reference to the contiguous array for the life of vtk_arr
+    arr=np.ascontiguousarray(arr).reshape(grid.GetNumberOfCells(),ncomp)
+    if ncomp==1:
+        arr=arr.ravel()
+    vtk_arr=numpy_to_vtk(arr,deep=False)
+    vtk_arr.SetName(name)
+    grid.GetCellData().AddArray(vtk_arr)
+    return vtk_arr
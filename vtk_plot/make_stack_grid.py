@@ -0,0 +1,186 @@
+"""Function to create a single unstructured grid of RUC stacks."""
+import numpy as np
+from vtkmodules.vtkCommonDataModel import vtkUnstructuredGrid,vtkCellArray,VTK_HEXAHEDRON # pylint: disable=E0611
+from vtkmodules.vtkCommonCore import vtkPoints # pylint: disable=E0611
+from vtk.util.numpy_support import numpy_to_vtk,vtk_to_numpy # pylint: disable=E0401,E0611
+from .make_grid_2D_3D import make_grid_2d_3d, add_cell_array, add_index_arrays, INDEX_NAMES
+
+#point order of a hexahedron in a structured grid cell (i,j,k offsets)
+HEX_IJK = np.array([[0,0,0],[1,0,0],[1,1,0],[0,1,0],
+                    [0,0,1],[1,0,1],[1,1,1],[0,1,1]])
+
+
+def get_grid_coords(grid):
+    """
+    Function to get the coordinates of a rectilinear grid as numpy arrays
+
+    Parameters:
+        grid (vtkRectilinearGrid): input grid
+
+    Returns:
+        coords (list): np.ndarray of x, y, and z coordinates
+    """
+
+    return [vtk_to_numpy(c).astype(np.float64) for c in
+            (grid.GetXCoordinates(),grid.GetYCoordinates(),grid.GetZCoordinates())]
+
+
+def get_template(coords,cell_data):
+    """
+    Function to get the points, connectivity and cell arrays of a rectilinear grid
+
+    Parameters:
+        coords (list): np.ndarray of x, y, and z coordinates
+        cell_data (dict): np.ndarray of each cell array
+
+    Returns:
+        tmpl (dict): 'pts' (npts,3), 'conn' (ncells,8), 'ext' (z,y,x extents),
+                     and 'cell_data'
+    """
+
+    x,y,z=coords
+    nx,ny,nz=len(x),len(y),len(z)
+    #x changes fastest, matching vtk structured point ordering
+    zz,yy,xx=np.meshgrid(z,y,x,indexing='ij')
+    pts=np.column_stack([xx.ravel(),yy.ravel(),zz.ravel()])
+
+    k,j,i=np.meshgrid(np.arange(nz-1),np.arange(ny-1),np.arange(nx-1),indexing='ij')
+    ijk=np.column_stack([i.ravel(),j.ravel(),k.ravel()])[:,None,:]+HEX_IJK[None,:,:]
+    conn=ijk[:,:,0]+nx*(ijk[:,:,1]+ny*ijk[:,:,2])
+
+    return {'pts':pts,'conn':conn,'cell_data':cell_data,
+            'ext':np.array([z[-1]-z[0],y[-1]-y[0],x[-1]-x[0]])}
+
+
+def make_stack_grid(ruc,vmap,all_rucs,no_stack,maxd,offset):
+    """
+    Function to create one unstructured grid with a scaled unit cell (stack) or constituent
+    block in place of every cell of a parent RUC
+
+    Parameters:
+        ruc (dict): parent ruc parameters
+        vmap (dict): map to change material numbers
+        all_rucs (dict): all relavant rucs for plotting
+        no_stack (list): rucs to not plot as stacks
+        maxd (float): maximum stack dimension
+        offset (list): spacing added between stacks in each direction
+
+    Returns:
+        grid (vtkUnstructuredGrid): grid of hexahedra for all stacks
+        cell_start (np.ndarray): first grid cell of each parent cell (nparent+1)
+        stack_mat (np.ndarray): mapped material (RUC if < 0) of each parent cell
+        is_stack (np.ndarray): bool flag for parent cells plotted as unit cells
+    """
+
+    maingrid = make_grid_2d_3d(ruc,vmap,dflag=ruc['DIM'])
+    x,y,z=get_grid_coords(maingrid)
+    nxc,nyc=len(x)-1,len(y)-1
+    ncells=maingrid.GetNumberOfCells()
+    sm=vtk_to_numpy(maingrid.GetCellData().GetArray('SM-IND')).astype(np.int64)
+
+    cid=np.arange(ncells)
+    ix,iy,iz=cid%nxc,(cid//nxc)%nyc,cid//(nxc*nyc)
+    bx,by,bz=np.diff(x)[ix],np.diff(y)[iy],np.diff(z)[iz]
+    h_off = np.cumsum(np.insert(ruc['h'],0,0))
+    l_off = np.cumsum(np.insert(ruc['l'],0,0))
+    zero=np.zeros(ncells)
+
+    if ruc['DIM']=='2D':
+        offsets=np.column_stack([zero,iy*offset[1]+h_off[iy],ix*offset[0]+l_off[ix]])
+        dims=np.column_stack([bx,by,np.full(ncells,maxd)])
+        l_ext,h_ext,d_ext=dims.T
+    elif ruc['DIM']=='3D':
+        offsets=np.column_stack([zero,iy*offset[1]+h_off[iy],iz*offset[0]+l_off[iz]])
+        dims=np.column_stack([np.full(ncells,maxd),by,bz])
+        d_ext,h_ext,l_ext=dims.T
+    else:
+        offsets=np.zeros((ncells,3))
+        dims=np.ones((ncells,3))
+        d_ext,h_ext,l_ext=dims.T
+
+    lut=np.array([vmap[m] for m in range(sm.max()+1)] if sm.size else [],dtype=np.int64)
+    stack_mat=lut[sm]
+    is_stack=(stack_mat<0) & ~np.isin(stack_mat,np.asarray(no_stack,dtype=np.int64))
+
+    #one template per unit cell, constituents use a unit block
+    ori_names=['ORI_X1','ORI_X2','ORI_X3','ORI_X1_NORM','ORI_X2_NORM','ORI_X3_NORM']
+    unit=get_template([np.array([0.0,1.0])]*3,{})
+    groups=[]
+    for mat_act in np.unique(stack_mat[is_stack]):
+        cells=np.flatnonzero(is_stack & (stack_mat==mat_act))
+        cellgrid = make_grid_2d_3d(all_rucs[str(mat_act)],vmap,dflag=None)
+        cd=cellgrid.GetCellData()
+        tmpl=get_template(get_grid_coords(cellgrid),
+                          {cd.GetArrayName(k):vtk_to_numpy(cd.GetArray(k))
+                           for k in range(cd.GetNumberOfArrays())})
+        #scale_grid scale factors
+        groups.append({'cells':cells,'tmpl':tmpl,'scale':dims[cells]/tmpl['ext'][None,:],
+                       'data':None})
+    cells=np.flatnonzero(~is_stack)
+    if cells.size:
+        #block of (d_ext,h_ext,l_ext) scaled with scale_grid scale factors
+        scale=np.column_stack([d_ext*dims[:,0]/l_ext,h_ext*dims[:,1]/h_ext,
+                               l_ext*dims[:,2]/d_ext])[cells]
+        data={'SM-IND':sm[cells].astype(np.int32)}
+        if vmap:
+            data['SM']=stack_mat[cells].astype(np.int32)
+        data.update({name:np.zeros((cells.size,1 if 'NORM' in name else 3))
+                     for name in ori_names})
+        groups.append({'cells':cells,'tmpl':unit,'scale':scale,'data':data})
+
+    #parent cells keep their order, each followed by the cells of its stack
+    npts=np.zeros(ncells,dtype=np.int64)
+    ncell=np.zeros(ncells,dtype=np.int64)
+    for group in groups:
+        npts[group['cells']]=group['tmpl']['pts'].shape[0]
+        ncell[group['cells']]=group['tmpl']['conn'].shape[0]
+    pt_start=np.concatenate([[0],np.cumsum(npts)])
+    cell_start=np.concatenate([[0],np.cumsum(ncell)])
+
+    #only arrays present for every stack are kept (as with vtkAppendFilter)
+    names=None
+    for group in groups:
+        data=group['data'] if group['data'] is not None else group['tmpl']['cell_data']
+        names=set(data.keys()) if names is None else names & set(data.keys())
+    names=sorted(names-set(INDEX_NAMES)) if names else [] #set from the parent cells below
+
+    points=np.empty((pt_start[-1],3))
+    conn=np.empty((cell_start[-1],8),dtype=np.int64)
+    cell_data={}
+    for group in groups:
+        cells,tmpl,scale=group['cells'],group['tmpl'],group['scale']
+        npt,nc=tmpl['pts'].shape[0],tmpl['conn'].shape[0]
+        pidx=pt_start[cells][:,None]+np.arange(npt)[None,:]
+        cidx=cell_start[cells][:,None]+np.arange(nc)[None,:]
+        points[pidx]=tmpl['pts'][None,:,:]*scale[:,None,:]+offsets[cells][:,None,:]
+        conn[cidx]=tmpl['conn'][None,:,:]+pt_start[cells][:,None,None]
+        for name in names:
+            if group['data'] is not None: #one value per parent cell
+                val=group['data'][name].reshape(cells.size,1,-1)
+            else: #template values repeated for each parent cell
+                val=tmpl['cell_data'][name].reshape(1,nc,-1)
+            if name not in cell_data:
+                cell_data[name]=np.zeros((cell_start[-1],val.shape[-1]),dtype=val.dtype)
+            cell_data[name][cidx]=val
+
+    grid=vtkUnstructuredGrid()
+    pts=vtkPoints()
+    pts.SetData(numpy_to_vtk(points,deep=False))
+    grid.SetPoints(pts)
+
+    cell_array=vtkCellArray()
+    cell_array.SetData(numpy_to_vtk(np.arange(0,conn.size+1,8,dtype=np.int64),deep=False),
+                       numpy_to_vtk(conn.ravel(),deep=False))
+    grid.SetCells(VTK_HEXAHEDRON,cell_array)
+
+    for name in names:
+        ncomp=cell_data[name].shape[-1]
+        add_cell_array(grid,cell_data[name],name,ncomp=ncomp)
+
+    #indices of the parent subvolume, cells of stacked unit cells are one level down
+    main_cd=maingrid.GetCellData()
+    parent=[np.repeat(vtk_to_numpy(main_cd.GetArray(name)),ncell) for name in ('IA','IB','IG')]
+    add_index_arrays(grid,*parent,rucid=np.repeat(stack_mat,ncell),
+                     level=np.repeat(is_stack.astype(np.int32),ncell))
+
+    return grid,cell_start,stack_mat,is_stack
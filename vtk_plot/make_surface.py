@@ -0,0 +1,166 @@
+"""Functions to render only the outer surface of large grids"""
+import numpy as np
+from vtkmodules.vtkCommonDataModel import vtkPolyData # pylint: disable=E0611
+from vtkmodules.vtkFiltersGeometry import vtkDataSetSurfaceFilter # pylint: disable=E0611
+from vtkmodules.vtkFiltersCore import vtkQuadricClustering # pylint: disable=E0611
+from vtkmodules.vtkFiltersModeling import vtkOutlineFilter # pylint: disable=E0611
+from vtkmodules.vtkRenderingCore import vtkPolyDataMapper # pylint: disable=E0611
+from vtk.util.numpy_support import numpy_to_vtk,vtk_to_numpy # pylint: disable=E0401,E0611
+
+#cell array with the full grid cell id of each surface polygon (added by make_mask_filter)
+IDS_NAME = 'vtkOriginalCellIds'
+
+
+def make_surface_filter():
+    """
+    Function to create the filter extracting the outer surface of a grid. Cell arrays
+    (including IDS_NAME) are copied to the surface polygons.
+
+    Parameters:
+        None.
+
+    Returns:
+        surface_filter (vtkDataSetSurfaceFilter): surface filter, input set by set_mapper_input
+    """
+
+    surface_filter=vtkDataSetSurfaceFilter()
+    surface_filter.PassThroughCellIdsOff()
+    surface_filter.PassThroughPointIdsOff()
+    return surface_filter
+
+
+def set_mapper_input(mapper,dataset,surface_filter=None):
+    """
+    Function to set the dataset shown by a mapper, only its surface is extracted (once)
+    if a surface filter is given
+
+    Parameters:
+        mapper (vtkMapper): vtkDataSetMapper, or vtkPolyDataMapper if surface_filter is set
+        dataset (vtkDataSet): visible cells (clipped or not)
+        surface_filter (vtkDataSetSurfaceFilter): filter from make_surface_filter
+
+    Returns:
+        None.
+    """
+
+    if surface_filter is None:
+        mapper.SetInputData(dataset)
+        return
+
+    surface_filter.SetInputData(dataset)
+    surface_filter.Update()
+    #copy so the filter can be rerun for the next dataset without changing the mapper input
+    surface=vtkPolyData()
+    surface.ShallowCopy(surface_filter.GetOutput())
+    scalars=dataset.GetCellData().GetScalars()
+    if scalars is not None:
+        surface.GetCellData().SetActiveScalars(scalars.GetName())
+    mapper.SetInputData(surface)
+
+
+def update_surface_scalars(surface,full_grid,var,old_var=None):
+    """
+    Function to copy a results array of the full grid to an extracted surface
+
+    Parameters:
+        surface (vtkPolyData): surface from set_mapper_input
+        full_grid (vtkDataSet): grid with all cells and the var cell array
+        var (str): results array to copy
+        old_var (str): results array to remove from the surface
+
+    Returns:
+        None.
+    """
+
+    cd=surface.GetCellData()
+    active=cd.GetScalars().GetName() if cd.GetScalars() is not None else None
+    if old_var and old_var!=var:
+        cd.RemoveArray(old_var)
+
+    ids=vtk_to_numpy(cd.GetArray(IDS_NAME))
+    vals=vtk_to_numpy(full_grid.GetCellData().GetArray(var))[ids]
+    vtk_arr=numpy_to_vtk(np.ascontiguousarray(vals),deep=True)
+    vtk_arr.SetName(var)
+    cd.AddArray(vtk_arr)
+    cd.SetActiveScalars(var if active in (None,old_var,var) else active)
+    surface.Modified()
+
+
+def add_interaction_lod(scene,style,actor,opt='decimate',max_cells=100000):
+    """
+    Function to show a low detail proxy of an actor while the camera is moved. The proxy
+    is created from the mapper input when an interaction starts (once per input) and the
+    full surface is restored when it ends, so picking always uses the full surface.
+
+    Parameters:
+        scene (SceneManager): scene owning the observers
+        style (vtkInteractorStyle): interactor style invoking the interaction events
+        actor (vtkActor): actor of the surface
+        opt (str): 'decimate' (clustered surface with results) or 'outline' (bounding box)
+        max_cells (int): surfaces with more cells are replaced while interacting
+
+    Returns:
+        None.
+    """
+
+    proxy_mapper=vtkPolyDataMapper()
+    state={'mapper':None,'mtime':None,'edges':None}
+
+    def start_lod(obj,event): #pylint: disable=W0613
+        mapper=actor.GetMapper()
+        surface=mapper.GetInput()
+        if surface is None or surface.GetNumberOfCells()<=max_cells:
+            return
+        if state['mtime']!=(id(surface),surface.GetMTime()):
+            state['mtime']=(id(surface),surface.GetMTime())
+            if opt=='outline':
+                lod=vtkOutlineFilter()
+            else:
+                #roughly max_cells triangles for a surface spanning the bin grid
+                ndiv=max(8,int(np.sqrt(max_cells/6)))
+                lod=vtkQuadricClustering()
+                lod.SetNumberOfDivisions(ndiv,ndiv,ndiv)
+                lod.CopyCellDataOn()
+            lod.SetInputData(surface)
+            lod.Update()
+            proxy_mapper.SetInputData(lod.GetOutput())
+
+        proxy_mapper.SetScalarVisibility(opt!='outline' and mapper.GetScalarVisibility())
+        proxy_mapper.SetScalarModeToUseCellData()
+        proxy_mapper.SetLookupTable(mapper.GetLookupTable())
+        proxy_mapper.SetScalarRange(mapper.GetScalarRange())
+        state['mapper']=mapper
+        state['edges']=actor.GetProperty().GetEdgeVisibility()
+        actor.GetProperty().SetEdgeVisibility(False)
+        actor.SetMapper(proxy_mapper)
+
+    def end_lod(obj,event): #pylint: disable=W0613
+        if state['mapper'] is None:
+            return
+        actor.SetMapper(state['mapper'])
+        actor.GetProperty().SetEdgeVisibility(state['edges'])
+        state['mapper']=None
+        obj.GetInteractor().Render()
+
+    scene.add_observer(style,'StartInteractionEvent',start_lod)
+    scene.add_observer(style,'EndInteractionEvent',end_lod)
+
+
+def get_original_cell_id(dataset,cell_id):
+    """
+    Function to get the full grid cell id of a picked surface polygon
+
+    Parameters:
+        dataset (vtkDataSet): picked dataset
+        cell_id (int): picked cell id
+
+    Returns:
+        int: full grid cell id (-1 if dataset is not a surface from set_mapper_input)
+    """
+
+    if not isinstance(dataset,vtkPolyData) or cell_id<0:
+        return -1
+    ids=dataset.GetCellData().GetArray(IDS_NAME)
+    if ids is None:
+        return -1
+    return int(ids.GetValue(cell_id))
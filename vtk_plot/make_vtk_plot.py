@@ -8,19 +8,21 @@ from vtkmodules.vtkRenderingCore import ( # pylint: disable=E0611
     vtkSelectVisiblePoints,vtkActor2D)
 from vtkmodules.vtkRenderingLabel import vtkLabeledDataMapper # pylint: disable=E0611
 
-from vtkmodules.vtkCommonCore import vtkLookupTable,vtkIdTypeArray,vtkIdList,vtkPoints # pylint: disable=E0611
+from vtkmodules.vtkCommonCore import vtkLookupTable,vtkIdList,vtkPoints # pylint: disable=E0611
 from vtkmodules.vtkInteractionWidgets import vtkScalarBarWidget # pylint: disable=E0611
 from vtkmodules.vtkFiltersCore import (vtkFeatureEdges,vtkGenerateIds,vtkGlyph3D,# pylint: disable=E0611
                                     vtkCellCenters,vtkThreshold)
 from vtkmodules.vtkCommonColor import vtkColorSeries,vtkNamedColors # pylint: disable=E0611
 from vtkmodules.vtkCommonDataModel import ( # pylint: disable=E0611
-    vtkUnstructuredGrid,vtkSelection,vtkSelectionNode,vtkDataSetAttributes,
+    vtkUnstructuredGrid,
     vtkDataObject,vtkPolyData,vtkCellArray,vtkLine)
-from vtkmodules.vtkFiltersExtraction import vtkExtractSelection # pylint: disable=E0611
 from vtkmodules.vtkFiltersSources import vtkArrowSource # pylint: disable=E0611
 from vtkmodules.vtkRenderingCore import vtkTextActor # pylint: disable=E0611
 from vtk.util.numpy_support import vtk_to_numpy # pylint: disable=E0401,E0611
 from .get_coord_sys import get_coord_sys
+from .set_visible_mats import make_mask_filter
+from .make_surface import (make_surface_filter,set_mapper_input,add_interaction_lod,
+                           get_original_cell_id)
 
 def make_vtk_plot(self,dflag,edges_to_plot=None,macroapi=False):
     """
@@ -43,40 +45,31 @@ def make_vtk_plot(self,dflag,edges_to_plot=None,macroapi=False):
     # Get renderer and interactor from window
     rwi = rw.GetInteractor()
     renderer=rw.GetRenderers().GetFirstRenderer()
+    self.scene.clear()
     renderer.RemoveAllViewProps()
 
-    ids = vtkIdTypeArray()
-    ids.SetNumberOfComponents(1)
-    if hidemat:
-        alist=grid.GetCellData().GetArray('SM-IND')
-        [ids.InsertNextValue(i) for i in range(alist.GetNumberOfValues())#pylint: disable=W0106
-            for j in hidemat if alist.GetComponent(i,0)==j]
-
-    selectionnode = vtkSelectionNode()
-    selectionnode.SetFieldType(vtkSelectionNode.CELL)
-    selectionnode.SetContentType(vtkSelectionNode.INDICES)
-    selectionnode.SetSelectionList(ids)
-    selection = vtkSelection()
-    selection.AddNode(selectionnode)
-    extractselection = vtkExtractSelection()
-    extractselection.SetInputData(0, grid)
-    extractselection.SetInputData(1, selection)
-    extractselection.Update()
-    selected = vtkUnstructuredGrid()
-    selected.ShallowCopy(extractselection.GetOutput())
-    #print("There are %s cells in the selection" % selected.GetNumberOfCells())
-    hideactor = vtkActor()
-    hideactor.GetProperty().SetOpacity(0)
-    hidemapper = vtkDataSetMapper()
-    hidemapper.SetInputData(selected)
-    selectionnode.GetProperties().Set(vtkSelectionNode.INVERSE(), 1)
-    extractselection.Update()
-    vis_subs = vtkUnstructuredGrid()
-    vis_subs.ShallowCopy(extractselection.GetOutput())
+    #visible cells are extracted with a mask array, hidden materials can then be changed
+    #by updating the mask (see VtkPlot.set_hidemat) without rebuilding the pipeline
+    full_grid = grid.NewInstance()
+    full_grid.ShallowCopy(grid)
+    mask_filter = make_mask_filter(full_grid,hidemat)
+    vis_subs = mask_filter.GetOutput()
+    self.mask_filter = mask_filter
+
+    #objects kept by the scene manager for fast result updates
+    props={'full_grid':full_grid,'mask_filter':mask_filter,'grid':self.grid}
 
     # Setup mapper and actors
-    mapper2 = vtkDataSetMapper()
-    mapper2.SetInputData(vis_subs)
+    surface_filter = None
+    if macroapi and vs.get('surface_only'):
+        #only the outer surface is rendered (see make_surface)
+        surface_filter = make_surface_filter()
+        mapper2 = vtkPolyDataMapper()
+        props['surface_filter']=surface_filter
+    else:
+        mapper2 = vtkDataSetMapper()
+        mapper2.SetInputData(vis_subs)
+    self.surface_filter = surface_filter
     mapper2.SetScalarModeToUseCellData() #req'd for unstructured grid
                                          #default is to use point data (not defined)
     if (not vs['show_res'] and vis_subs.GetCellData()):
@@ -126,6 +119,7 @@ def make_vtk_plot(self,dflag,edges_to_plot=None,macroapi=False):
             #     dr[1]+=10
             mapper2.SetScalarRange(dr)
         mapper2.SetLookupTable(lut)
+        props['lut']=lut
 
         if vs['var']!='MATNUM':
 
@@ -167,8 +161,12 @@ def make_vtk_plot(self,dflag,edges_to_plot=None,macroapi=False):
                 scalar_bar_widget.On()
                 scalar_bar_widget.Render()
 
-            rwi.AddObserver('LeftButtonPressEvent',sb_update)
+            self.scene.add_observer(rwi,'LeftButtonPressEvent',sb_update)
+            props['scalar_bar']=scalar_bar
+            props['scalar_bar_widget']=scalar_bar_widget
 
+    if surface_filter is not None:
+        set_mapper_input(mapper2,vis_subs,surface_filter)
     mapper2.Update()
     self.vis_subs_mapper = mapper2
 
@@ -193,6 +191,11 @@ def make_vtk_plot(self,dflag,edges_to_plot=None,macroapi=False):
             # Get the picked cell
             dataset = cellpicker.GetDataSet()
 
+            #surface polygons are drawn as their element of the full grid
+            if surface_filter is not None and get_original_cell_id(dataset,cell_id)!=-1:
+                cell_id = get_original_cell_id(dataset,cell_id)
+                dataset = full_grid
+
             #account for case where edges are hovered over (vtkPolyData objects)
             if not isinstance(dataset, vtkUnstructuredGrid):
                 edge_actor.VisibilityOff()
@@ -263,6 +266,9 @@ def make_vtk_plot(self,dflag,edges_to_plot=None,macroapi=False):
     actor2.GetProperty().SetOpacity(vs['opacity'])
     renderer.AddActor(actor2)
     #renderer.AddActor(hideActor) #uncomment to show hidden cells
+    if surface_filter is not None and vs.get('interaction_lod'):
+        add_interaction_lod(self.scene,rwi.GetInteractorStyle(),actor2,
+                            opt=vs['interaction_lod'],max_cells=vs.get('lod_cells',100000))
 
     arrow_actors,label_actors=get_coord_sys(grid,dflag,vs)
     if vs['show_axes']:
@@ -277,26 +283,26 @@ def make_vtk_plot(self,dflag,edges_to_plot=None,macroapi=False):
             if not vs['show_ori'][i]:
                 continue
 
-            vis_subs.GetCellData().SetActiveScalars(var+'_NORM')
-            vis_subs.GetCellData().SetActiveVectors(var)
-
+            #arrays are selected by name so the glyphs follow updates of the mask filter
             nz=vtkThreshold()
             nz.SetInputArrayToProcess(0, 0, 0,
-                            vtkDataObject.FIELD_ASSOCIATION_CELLS,
-                            vtkDataSetAttributes.SCALARS)
-            nz.SetInputData(vis_subs)
+                            vtkDataObject.FIELD_ASSOCIATION_CELLS,var+'_NORM')
+            nz.SetInputConnection(mask_filter.GetOutputPort())
             nz.SetLowerThreshold(1e-5)
             #nz.SetAttributeModeToUseCellData()
-            nz.Update()
 
             cell_centers = vtkCellCenters()
             # cell_centers.SetInputData(vis_subs)
-            cell_centers.SetInputData(nz.GetOutput())
+            cell_centers.SetInputConnection(nz.GetOutputPort())
             arrow = vtkArrowSource()
             arrow_glyph = vtkGlyph3D()
             arrow_glyph.SetSourceConnection(arrow.GetOutputPort())
             arrow_glyph.SetInputConnection(cell_centers.GetOutputPort())
             arrow_glyph.SetVectorModeToUseVector()
+            arrow_glyph.SetInputArrayToProcess(0, 0, 0,
+                            vtkDataObject.FIELD_ASSOCIATION_POINTS,var+'_NORM')
+            arrow_glyph.SetInputArrayToProcess(1, 0, 0,
+                            vtkDataObject.FIELD_ASSOCIATION_POINTS,var)
             if not vs['ori_scale']:
                 vs['ori_scale']=1.0
             arrow_glyph.SetScaleFactor(vs['ori_scale'])
@@ -341,7 +347,7 @@ def make_vtk_plot(self,dflag,edges_to_plot=None,macroapi=False):
     array_names = {vis_subs.GetCellData().GetArrayName(i):i
                     for i in range(vis_subs.GetCellData().GetNumberOfArrays())}
     ids = vtkGenerateIds()
-    ids.SetInputData(vis_subs)
+    ids.SetInputConnection(mask_filter.GetOutputPort())
 
     self.grid.DeepCopy(vis_subs)
 
@@ -439,21 +445,51 @@ def make_vtk_plot(self,dflag,edges_to_plot=None,macroapi=False):
 
     rw.Render()
 
+    props.update({'mapper':mapper2,'actor':actor2,'picker':cellpicker,'edge_actor':edge_actor,
+                  'camera':camera,'text_actor':text_actor})
+    self.scene.set_scene(self,dflag,props)
+
     if vs['make_video']:
+        write_video_frame(vs)
+
+
+def write_video_frame(vs):
+    """
+    Function to write the current render window image to the output video
+
+    Parameters:
+        vs (dict): vtk settings
+
+    Returns:
+        None.
+    """
 
-        vs['window_to_image_filter'].Modified()
-        vs['window_to_image_filter'].Update()
+    vs['video'].write(get_video_frame(vs['window_to_image_filter']))
+    if vs['ind']==vs['sweep'][1]-1:
+        vs['video'].release()
+
+
+def get_video_frame(window_to_image_filter):
+    """
+    Function to get the current render window image as a video frame
+
+    Parameters:
+        window_to_image_filter (vtkWindowToImageFilter): RGB filter of the render window
+
+    Returns:
+        frame (np.ndarray): (height, width, 3) BGR image for cv2
+    """
 
-        vtk_image = vs['window_to_image_filter'].GetOutput()
-        width, height, _ = vtk_image.GetDimensions()
+    window_to_image_filter.Modified()
+    window_to_image_filter.Update()
 
-        vtk_array = vtk_image.GetPointData().GetScalars()
-        components = vtk_array.GetNumberOfComponents()
-        arr = vtk_to_numpy(vtk_array)
-        arr = arr.reshape(height, width, components)
-        frame = cv2.cvtColor(arr, cv2.COLOR_RGB2BGR)# pylint: disable=E1101
-        frame = cv2.flip(frame, 0)# pylint: disable=E1101
+    vtk_image = window_to_image_filter.GetOutput()
+    width, height, _ = vtk_image.GetDimensions()
 
-        vs['video'].write(frame)
-        if vs['ind']==vs['sweep'][1]-1:
-            vs['video'].release()
+    vtk_array = vtk_image.GetPointData().GetScalars()
+    components = vtk_array.GetNumberOfComponents()
+    arr = vtk_to_numpy(vtk_array)
+    arr = arr.reshape(height, width, components)
+    frame = cv2.cvtColor(arr, cv2.COLOR_RGB2BGR)# pylint: disable=E1101
+    frame = cv2.flip(frame, 0)# pylint: disable=E1101
+    return frame
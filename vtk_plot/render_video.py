@@ -0,0 +1,233 @@
+"""Functions to render h5 results offscreen in parallel and export them as a video"""
+import os
+import sys
+import argparse
+import multiprocessing as mp
+import cv2
+from vtkmodules.vtkRenderingCore import vtkRenderWindow,vtkRenderer,vtkWindowToImageFilter # pylint: disable=E0611
+from vtkmodules.vtkRenderingUI import vtkGenericRenderWindowInteractor # pylint: disable=E0611
+import vtkmodules.vtkRenderingOpenGL2# pylint: disable=W0611
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from util.get_default_vtk_settings import get_default_vtk_settings #pylint: disable=C0413
+from mac_inp import mac_inp #pylint: disable=C0413
+from geth5 import GetH5 #pylint: disable=C0413
+from .vtk_plot import VtkPlot #pylint: disable=C0413
+from .scene_manager import SceneManager #pylint: disable=C0413
+from .make_vtk_plot import get_video_frame #pylint: disable=C0413
+
+#plot option for each result dimension
+DIM_OPT = {'2D':'2DR','3D':'3DR','MT':'MT'}
+
+
+def render_video(h5name,item='1',var='Stress',comp=0,first=1,last=None,outname=None, #pylint: disable=R0913,R0914,R0917
+                 mac=None,njobs=None,fps=10,size=(1280,720),vs=None,queue_size=None):
+    """
+    Function to render increments of an h5 result offscreen and write them to a video.
+    Increments are split across worker processes, each with its own offscreen render
+    window, and frames are passed through a bounded queue to one encoder process.
+
+    Scripts calling this function on Windows must do so from within an
+    if __name__ == "__main__": block.
+
+    Parameters:
+        h5name (str): NASMAT h5 results file
+        item (str): key of the result in the results hierarchy (as in the Results tab)
+        var (str): h5 variable to plot
+        comp (int): 0-based component (magnitude if larger than the number of components)
+        first (int): first increment to render (1-based)
+        last (int): last increment to render (1-based, defaults to the last increment)
+        outname (str): output *.mp4 file (defaults to <h5 name>-<var>.mp4)
+        mac (str): MAC file used to create the h5 file (defaults to <h5 name>.MAC)
+        njobs (int): number of render processes (defaults to number of cores - 1)
+        fps (int): video frames per second
+        size (tuple): width and height of the video
+        vs (dict): vtk settings (defaults to get_default_vtk_settings)
+        queue_size (int): maximum number of frames waiting to be encoded
+
+    Returns:
+        nframes (int): number of frames written
+    """
+
+    base,_=os.path.splitext(h5name)
+    if mac is None:
+        mac=base+'.MAC'
+    if outname is None:
+        outname=f"{base}-{var}.mp4"
+
+    mi=mac_inp(name=mac,echo=False)
+    res=mi.mac['hierarchy']['res']['items'][str(item)]
+    ruc=mi.mac['ruc']['rucs'][str(res['matnum'])]
+
+    #the results index is written once here instead of by each worker
+    h5=GetH5(h5name=h5name,echo=False)
+    ninc=h5.ninc
+    h5.close()
+    last=min(last or ninc,ninc)
+    inds=list(range(first-1,last))
+
+    if vs is None:
+        vs=get_default_vtk_settings()
+    vs.update({'map':mi.mac['mat_map'],'revmap':mi.mac['rev_mat_map'],'show_res':True,
+               'var':var,'comp':comp,'selected_result':res,'lvl':res['lvl'],
+               'hover':False,'make_video':False,
+               'cache_results':False}) #each increment is only read once
+
+    njobs=max(1,min(njobs or (os.cpu_count() or 2)-1,len(inds)))
+    job={'h5':h5name,'opt':DIM_OPT[res['dim']],'ruc':ruc,'vs':vs,'size':tuple(size),
+         'title':f"{var} - RUCID:{item}"}
+
+    ctx=mp.get_context('spawn') #vtk and OpenGL state is not shared with the workers
+    frames=ctx.Queue(maxsize=queue_size or 2*njobs)
+    nframes=ctx.Value('i',0)
+    encoder=ctx.Process(target=_encode_frames,args=(frames,outname,fps,inds,njobs,nframes))
+    encoder.start()
+    #increments are interleaved so frames arrive close to the order they are written
+    workers=[ctx.Process(target=_render_frames,args=(i,inds[i::njobs],job,frames))
+             for i in range(njobs)]
+    for w in workers:
+        w.start()
+    for i,w in enumerate(workers):
+        w.join()
+        if w.exitcode!=0:
+            print(f"WARNING: render process {i} failed, its frames are skipped")
+            if encoder.is_alive():
+                frames.put((None,i))
+    encoder.join()
+
+    print(f"Wrote {nframes.value} of {len(inds)} frames to {outname}")
+    return nframes.value
+
+
+def make_offscreen_window(size):
+    """
+    Function to create an offscreen render window (EGL or OSMesa is used when there is no
+    display, set VTK_DEFAULT_OPENGL_WINDOW=vtkOSMesaRenderWindow to force software rendering)
+
+    Parameters:
+        size (tuple): width and height
+
+    Returns:
+        rw (vtkRenderWindow): render window with a renderer and interactor
+    """
+
+    rw=vtkRenderWindow()
+    rw.SetOffScreenRendering(1)
+    rw.SetSize(*size)
+    renderer=vtkRenderer()
+    renderer.SetBackground(0.80, 0.88, 0.92)
+    rw.AddRenderer(renderer)
+    #plots add observers and widgets to the interactor, it is never started
+    interactor=vtkGenericRenderWindowInteractor()
+    interactor.SetRenderWindow(rw)
+    return rw
+
+
+def _render_frames(wid,inds,job,frames):
+    """
+    Function run by each render process
+
+    Parameters:
+        wid (int): worker number
+        inds (list): 0-based increments to render
+        job (dict): plot inputs from render_video
+        frames (Queue): output (increment, frame) pairs, (None, wid) when finished
+
+    Returns:
+        None.
+    """
+
+    try:
+        rw=make_offscreen_window(job['size'])
+        w2if=vtkWindowToImageFilter()
+        w2if.SetInput(rw)
+        w2if.SetInputBufferTypeToRGB()
+        w2if.ReadFrontBufferOff()
+
+        h5=GetH5(h5name=job['h5'],echo=False)
+        vs=job['vs']
+        scene=SceneManager(rw) #only results are updated after the first frame
+        for ind in inds:
+            vs['ind']=ind
+            vs['window_text']=f"{job['title']}, Inc={ind+1}"
+            vp=VtkPlot(opt=job['opt'],ruc=job['ruc'],h5=h5,hidemat=[],rw=rw,vs=vs,scene=scene)
+            vp.start()
+            frames.put((ind,get_video_frame(w2if)))
+    finally:
+        frames.put((None,wid))
+
+
+def _encode_frames(frames,outname,fps,inds,nworkers,nframes): #pylint: disable=R0913,R0917
+    """
+    Function run by the encoder process, frames are written in increment order
+
+    Parameters:
+        frames (Queue): (increment, frame) pairs from the render processes
+        outname (str): output video file
+        fps (int): video frames per second
+        inds (list): 0-based increments in the video
+        nworkers (int): number of render processes
+        nframes (Value): shared int set to the number of frames written
+
+    Returns:
+        None.
+    """
+
+    writer=[]
+    def _write(frame):
+        if not writer: #size is set by the first frame
+            fourcc = cv2.VideoWriter_fourcc(*'mp4v')  # Codec for .mp4 files #pylint: disable=E1101
+            writer.append(cv2.VideoWriter(outname,fourcc,fps,(frame.shape[1],frame.shape[0])))#pylint: disable=E1101
+        writer[0].write(frame)
+        nframes.value+=1
+
+    pending={}
+    skipped=set()
+    done=set()
+    pos=0
+    while len(done)<nworkers:
+        ind,frame=frames.get()
+        if ind is None:
+            #increments of a finished (or failed) render process that were not received
+            #are skipped, so later frames are not held in memory until all processes end
+            if frame not in done:
+                done.add(frame)
+                skipped.update(i for i in inds[frame::nworkers] if i not in pending)
+        else:
+            skipped.discard(ind)
+            pending[ind]=frame
+        while pos<len(inds) and (inds[pos] in pending or inds[pos] in skipped):
+            if inds[pos] in pending:
+                _write(pending.pop(inds[pos]))
+            pos+=1
+
+    #frames received after their increment was skipped
+    for ind in sorted(pending):
+        _write(pending.pop(ind))
+    if writer:
+        writer[0].release()
+
+
+if __name__ == "__main__":
+
+    #run as: python -m vtk_plot.render_video results.h5 --var Stress --comp 1 --first 1 --last 50
+    parser=argparse.ArgumentParser(description='Render NASMAT h5 results to a video offscreen.')
+    parser.add_argument('h5',help='NASMAT h5 results file')
+    parser.add_argument('--item',default='1',help='result hierarchy item (RUCID)')
+    parser.add_argument('--var',default='Stress',help='h5 variable')
+    parser.add_argument('--comp',type=int,default=0,help='0-based component')
+    parser.add_argument('--first',type=int,default=1,help='first increment (1-based)')
+    parser.add_argument('--last',type=int,default=None,help='last increment (1-based)')
+    parser.add_argument('--mac',default=None,help='MAC file (defaults to <h5 name>.MAC)')
+    parser.add_argument('--out',default=None,help='output *.mp4 file')
+    parser.add_argument('--njobs',type=int,default=None,help='number of render processes')
+    parser.add_argument('--fps',type=int,default=10,help='frames per second')
+    parser.add_argument('--size',type=int,nargs=2,default=[1280,720],help='width height')
+    parser.add_argument('--range',type=float,nargs=2,default=None,help='plot range min max')
+    args=parser.parse_args()
+
+    vsa=get_default_vtk_settings()
+    if args.range:
+        vsa['plot_range']=args.range
+    render_video(args.h5,item=args.item,var=args.var,comp=args.comp,first=args.first,
+                 last=args.last,outname=args.out,mac=args.mac,njobs=args.njobs,fps=args.fps,
+                 size=args.size,vs=vsa)
@@ -0,0 +1,218 @@
+"""Byte-bounded LRU cache for h5 result arrays used in plots."""
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from geth5 import add_file_callback
+
+#default memory limit for cached result arrays (bytes)
+DEFAULT_MAX_BYTES = 512*1024**2
+
+class ResultCache():
+    """
+    ResultCache - stores the final (rotated, scaled and flattened) cell arrays
+    for plotted h5 results so that revisiting an increment does not read the h5 file again.
+    Arrays can also be computed ahead of time in a background thread.
+    """
+    def __init__(self,max_bytes=DEFAULT_MAX_BYTES):
+        """
+        initialize class
+
+        Parameters:
+            max_bytes (int): maximum number of bytes held by the cached arrays
+
+        Returns:
+            None.
+        """
+
+        self.max_bytes=max_bytes
+        self.nbytes=0
+        self._data=OrderedDict()
+        self._pending=set()
+        self._last_ind={}
+        self._lock=threading.Lock()
+        self._pool=None
+
+    def __contains__(self,key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def get(self,key):
+        """
+        function to get a cached array and mark it as recently used
+
+        Parameters:
+            key (tuple): cache key
+
+        Returns:
+            np.ndarray: cached array (None if not present)
+        """
+
+        with self._lock:
+            arr=self._data.get(key)
+            if arr is not None:
+                self._data.move_to_end(key)
+            return arr
+
+    def put(self,key,arr):
+        """
+        function to add an array to the cache, evicting the least recently used arrays
+        as needed. Arrays are made read-only since they are shared with vtk.
+
+        Parameters:
+            key (tuple): cache key
+            arr (np.ndarray): array to store
+
+        Returns:
+            None.
+        """
+
+        if arr.nbytes>self.max_bytes:
+            return
+        arr.flags.writeable=False
+        with self._lock:
+            if key in self._data:
+                self.nbytes-=self._data.pop(key).nbytes
+            self._data[key]=arr
+            self.nbytes+=arr.nbytes
+            while self.nbytes>self.max_bytes:
+                _,old=self._data.popitem(last=False)
+                self.nbytes-=old.nbytes
+
+    def get_or_compute(self,key,func):
+        """
+        function to get a cached array, computing and storing it if not present
+
+        Parameters:
+            key (tuple): cache key
+            func (callable): function with no arguments returning the array
+
+        Returns:
+            np.ndarray: cached or newly computed array
+        """
+
+        arr=self.get(key)
+        if arr is None:
+            arr=func()
+            self.put(key,arr)
+        return arr
+
+    def step_direction(self,base_key,ind):
+        """
+        function to get the direction the increments are being stepped through
+
+        Parameters:
+            base_key (tuple): cache key without the increment
+            ind (int): current 0-based increment
+
+        Returns:
+            int: -1 if stepping backwards, otherwise 1
+        """
+
+        with self._lock:
+            last=self._last_ind.get(base_key)
+            self._last_ind[base_key]=ind
+        if last is not None and last>ind:
+            return -1
+        return 1
+
+    def prefetch(self,items):
+        """
+        function to compute arrays in a background thread if they are not cached
+
+        Parameters:
+            items (list): (key, func) pairs, func has no arguments and returns the array
+
+        Returns:
+            None.
+        """
+
+        with self._lock:
+            if self._pool is None:
+                self._pool=ThreadPoolExecutor(max_workers=1,
+                                              thread_name_prefix='npp-prefetch')
+            todo=[(k,f) for k,f in items if k not in self._data and k not in self._pending]
+            self._pending.update(k for k,_ in todo)
+
+        for key,func in todo:
+            self._pool.submit(self._prefetch_one,key,func)
+
+    def _prefetch_one(self,key,func):
+        """
+        function to compute and store a single prefetched array
+
+        Parameters:
+            key (tuple): cache key
+            func (callable): function with no arguments returning the array
+
+        Returns:
+            None.
+        """
+
+        try:
+            if key not in self:
+                self.put(key,func())
+        except Exception as e: #pylint: disable=W0718
+            print(f"Warning: unable to prefetch h5 results: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def cancel_prefetch(self):
+        """
+        function to cancel the pending prefetches, waiting for a running prefetch to finish
+        (e.g., before its h5 file is closed)
+
+        Parameters:
+            None.
+
+        Returns:
+            None.
+        """
+
+        with self._lock:
+            pool=self._pool
+            self._pool=None
+        if pool is not None:
+            pool.shutdown(wait=True,cancel_futures=True)
+        with self._lock:
+            self._pending.clear()
+
+    def clear(self):
+        """
+        function to remove all cached arrays
+
+        Parameters:
+            None.
+
+        Returns:
+            None.
+        """
+
+        with self._lock:
+            self._data.clear()
+            self._last_ind.clear()
+            self.nbytes=0
+
+    def reset(self):
+        """
+        function to cancel the pending prefetches and remove all cached arrays, called
+        when an h5 file is opened or closed
+
+        Parameters:
+            None.
+
+        Returns:
+            None.
+        """
+
+        self.cancel_prefetch()
+        self.clear()
+
+
+#shared cache used by update_h5
+RESULT_CACHE = ResultCache()
+add_file_callback(RESULT_CACHE.reset)
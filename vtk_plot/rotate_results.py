@@ -0,0 +1,132 @@
+"""Functions to rotate h5 results from the unit cell to the material coordinate system."""
+import threading
+from collections import OrderedDict
+import numpy as np
+
+#variables that can be rotated to the material coordinate system
+ALLOWED_ROTATIONS = ['Strain','ME.Strain','IN.Strain','TH.Strain','ALPHA','Stress']
+
+#tensor indices for each Voigt component (11,22,33,23,13,12)
+VOIGT_I = np.array([0,1,2,1,0,0])
+VOIGT_J = np.array([0,1,2,2,2,1])
+
+#number of cells rotated at once when transformation matrices are not cached
+CHUNK_SIZE = 65536
+
+#transformation matrices are only cached for models below this size (bytes)
+TMAT_CACHE_BYTES = 64*1024**2
+#number of data groups with cached transformation matrices
+TMAT_CACHE_LEN = 8
+_TMAT_CACHE = OrderedDict()
+_TMAT_LOCK = threading.Lock() #results may also be rotated in a prefetch thread
+
+
+def get_voigt_rotation(rot,eng_shear=True):
+    """
+    Function to get the Voigt transformation matrices for a set of rotation matrices
+
+    Parameters:
+        rot (np.ndarray): rotation matrices with shape (ncells,3,3)
+        eng_shear (bool): flag for engineering shear quantities (strains)
+
+    Returns:
+        tmat (np.ndarray): Voigt transformation matrices with shape (ncells,6,6)
+    """
+
+    #local_ij = rot_ik rot_jl global_kl, with the symmetric shear terms combined
+    i,j=VOIGT_I[:,None],VOIGT_J[:,None]
+    k,l=VOIGT_I[None,:],VOIGT_J[None,:]
+    tmat=rot[:,i,k]*rot[:,j,l]
+    shear=rot[:,i,l]*rot[:,j,k]
+    shear[:,:,:3]=0.0
+    tmat+=shear
+
+    if eng_shear: #convert engineering to tensorial shear quantities and back
+        factor=np.array([1.0,1.0,1.0,2.0,2.0,2.0])
+        tmat*=factor[None,:,None]/factor[None,None,:]
+
+    return tmat
+
+
+def rotate_voigt(data,tmat=None,rot=None,eng_shear=True,chunk_size=CHUNK_SIZE):
+    """
+    Function to rotate Voigt arrays in place
+
+    Parameters:
+        data (np.ndarray): float Voigt array with shape (ncells,6), overwritten
+        tmat (np.ndarray): Voigt transformation matrices with shape (ncells,6,6)
+        rot (np.ndarray): rotation matrices with shape (ncells,3,3), used in chunks
+                          when tmat is not given
+        eng_shear (bool): flag for engineering shear quantities (strains)
+        chunk_size (int): number of cells rotated at once
+
+    Returns:
+        data (np.ndarray): rotated Voigt array
+    """
+
+    ncells=data.shape[0]
+    for i0 in range(0,ncells,chunk_size):
+        i1=min(i0+chunk_size,ncells)
+        if tmat is not None:
+            t=tmat[i0:i1]
+        else:
+            t=get_voigt_rotation(rot[i0:i1],eng_shear=eng_shear)
+        data[i0:i1]=np.einsum('nij,nj->ni',t,data[i0:i1])
+
+    return data
+
+
+def rotate_to_material(h5grp,h5data,var,cache_key=None,echo=True):
+    """
+    Function to rotate h5 results to the material coordinate system if possible
+
+    Parameters:
+        h5grp (h5py.Group): h5 group containing the results and ROT arrays
+        h5data (np.ndarray): results read from h5grp, last axis is the Voigt component
+        var (str): variable name
+        cache_key (tuple): key to reuse transformation matrices between increments
+                           (e.g., h5 file and data group without the increment)
+        echo (bool): option to control screen printing
+
+    Returns:
+        h5data (np.ndarray): rotated results (unchanged if rotation is not possible)
+    """
+
+    if var not in ALLOWED_ROTATIONS:
+        if echo:
+            print(f"Rotation not performed for {var}")
+        return h5data
+
+    if 'ROT' not in h5grp:
+        if echo:
+            print('WARNING: ROT array not available to rotate to material axes.')
+        return h5data
+
+    eng_shear = var!='Stress'
+    orig_shape=h5data.shape
+    data=np.array(h5data,dtype=np.float64).reshape(-1,orig_shape[-1])
+    rot=h5grp['ROT'][()].reshape((-1,3,3))
+
+    if cache_key is None or data.shape[0]*36*8>TMAT_CACHE_BYTES:
+        #large models are rotated in chunks to limit peak memory
+        rotate_voigt(data,rot=rot,eng_shear=eng_shear)
+    else:
+        #ROT rarely changes between increments, reuse matrices while it is the same
+        key=cache_key+(eng_shear,)
+        with _TMAT_LOCK:
+            cached=_TMAT_CACHE.get(key)
+            if cached is not None and np.array_equal(cached[0],rot):
+                tmat=cached[1]
+                _TMAT_CACHE.move_to_end(key)
+            else:
+                tmat=None
+        if tmat is None:
+            tmat=get_voigt_rotation(rot,eng_shear=eng_shear)
+            with _TMAT_LOCK:
+                _TMAT_CACHE[key]=(rot,tmat)
+                _TMAT_CACHE.move_to_end(key)
+                if len(_TMAT_CACHE)>TMAT_CACHE_LEN:
+                    _TMAT_CACHE.popitem(last=False)
+        rotate_voigt(data,tmat=tmat)
+
+    return data.reshape(orig_shape)
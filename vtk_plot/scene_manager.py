@@ -0,0 +1,309 @@
+"""Class for keeping the vtk objects of a plot between updates"""
+import numpy as np
+from vtk.util.numpy_support import vtk_to_numpy # pylint: disable=E0401,E0611
+from .make_vtk_plot import write_video_frame
+from .set_visible_mats import set_visible_mats,MASK_NAME
+from .make_surface import set_mapper_input,update_surface_scalars
+
+#vtk settings that change the objects in a plot, other settings only change data or camera
+SCENE_KEYS = ('show_res','show_axes','show_ori','show_ids','show_mats','show_values','hover',
+              'show_subvol_edges','opacity','cmap','plot_colorbar_levels','plot_levels',
+              'hide_var_title','scalar_bar_pos','show_title','echo-camera-pos','ori_scale',
+              'surface_only','interaction_lod','lod_cells')
+
+#camera settings applied when a plot is created
+CAMERA_KEYS = ('camera-focal-point','camera-position','camera-view-up')
+
+
+def _freeze(val):
+    """
+    Function to get a hashable copy of a vtk setting
+
+    Parameters:
+        val (object): setting value
+
+    Returns:
+        object: val with lists and dicts converted to tuples
+    """
+
+    if isinstance(val,dict):
+        return tuple(sorted((k,_freeze(v)) for k,v in val.items()))
+    if isinstance(val,(list,tuple,np.ndarray)):
+        return tuple(_freeze(v) for v in val)
+    return val
+
+
+def get_mask(props):
+    """
+    Function to get a copy of the visibility mask of a scene
+
+    Parameters:
+        props (dict): scene objects with the 'full_grid'
+
+    Returns:
+        np.ndarray: uint8 visibility of each cell (None if not set)
+    """
+
+    arr=props['full_grid'].GetCellData().GetArray(MASK_NAME)
+    return None if arr is None else vtk_to_numpy(arr).copy()
+
+
+class SceneManager():
+    """
+    SceneManager - owns the vtk objects of the plot in a render window (grid, mask filter,
+    mapper, scalar bar, labels, etc.) across updates.
+
+    A plot is only rebuilt by make_vtk_plot when its structure changes. When only the plotted
+    result or hidden materials change (e.g., a new increment or component), update_scalars
+    swaps the cell array, visibility mask, and scalar range in place. The names of the
+    changed objects are kept in self.changed.
+    """
+    def __init__(self,rw):
+        """
+        initialize class
+
+        Parameters:
+            rw (vtkRenderWindow): vtk render window
+
+        Returns:
+            None.
+        """
+
+        self.rw=rw
+        self.key=None
+        self.props={}
+        self.changed=[]
+        self.var=None
+        self._refs=None
+        self._camera=None
+        self._mask=None
+        self._observers=[]
+
+    def get_key(self,plot,dflag):
+        """
+        function to get the key of everything that changes the objects of a plot
+
+        Parameters:
+            plot (VtkPlot): plot to be shown
+            dflag (str): problem dimension
+
+        Returns:
+            key (tuple): plots with the same key differ only in their results
+        """
+
+        vs=plot.vs
+        h5=getattr(plot.h5,'filename',None) or id(plot.h5) #h5py objects are re-created
+        return (plot.opt,dflag,id(plot.ruc) if plot.ruc else None,h5,
+                _freeze(vs['map']),vs['var']=='MATNUM',
+                vs['var'] if vs['show_values'] else None,
+                tuple(_freeze(vs.get(key)) for key in SCENE_KEYS))
+
+    def can_update(self,plot,dflag):
+        """
+        function to check if the current scene can show a plot by updating its results
+
+        Parameters:
+            plot (VtkPlot): plot to be shown
+            dflag (str): problem dimension
+
+        Returns:
+            bool: True if update_scalars can be used
+        """
+
+        return (self.key is not None and plot.vs['show_res'] and
+                self.key==self.get_key(plot,dflag))
+
+    def set_scene(self,plot,dflag,props):
+        """
+        function to take ownership of the objects of a newly created plot
+
+        Parameters:
+            plot (VtkPlot): plot that was created
+            dflag (str): problem dimension
+            props (dict): vtk objects of the plot
+
+        Returns:
+            None.
+        """
+
+        self.key=self.get_key(plot,dflag)
+        #references kept so ids in the key are not reused
+        self._refs=(plot.ruc,plot.h5)
+        self.props.update(props)
+        self.var=plot.vs['var']
+        self._camera=_freeze([plot.vs[key] for key in CAMERA_KEYS])
+        #surfaces are only extracted again if the visible cells change
+        self._mask=get_mask(self.props) if 'surface_filter' in self.props else None
+        self.changed=sorted(self.props)
+
+    def add_observer(self,obj,event,func):
+        """
+        function to add an observer that is removed with the scene
+
+        Parameters:
+            obj (vtkObject): observed object
+            event (str): event name
+            func (callable): callback
+
+        Returns:
+            tag (int): observer tag
+        """
+
+        tag=obj.AddObserver(event,func)
+        self._observers.append((obj,tag))
+        return tag
+
+    def replace_prop(self,name,prop):
+        """
+        function to replace a scene object, the old object is removed from the renderer
+
+        Parameters:
+            name (str): object name
+            prop (vtkProp or vtkAbstractWidget): new object (None to only remove)
+
+        Returns:
+            None.
+        """
+
+        old=self.props.pop(name,None)
+        if old is not None and old is not prop:
+            if hasattr(old,'Off'): #widgets
+                old.Off()
+            else:
+                self.rw.GetRenderers().GetFirstRenderer().RemoveViewProp(old)
+        if prop is not None:
+            self.props[name]=prop
+
+    def clear(self):
+        """
+        function to remove the current scene, widgets are disabled and observers removed
+
+        Parameters:
+            None.
+
+        Returns:
+            None.
+        """
+
+        for obj,tag in self._observers:
+            obj.RemoveObserver(tag)
+        for prop in self.props.values():
+            if hasattr(prop,'Off'):
+                prop.Off()
+        self._observers=[]
+        self.props={}
+        self.key=None
+        self.var=None
+        self._refs=None
+        self._mask=None
+        self.changed=[]
+
+    def update_scalars(self,plot,dflag):
+        """
+        function to show new results of the current scene, the results array (vs['var'])
+        must already be in self.props['full_grid']
+
+        Parameters:
+            plot (VtkPlot): plot to be shown, its grid, mapper, and mask filter are set
+                            to the scene objects
+            dflag (str): problem dimension
+
+        Returns:
+            changed (list): names of the changed objects
+        """
+
+        vs=plot.vs
+        props=self.props
+        changed=['full_grid','mask_filter','mapper']
+
+        old_var=self.var
+        full_cd=props['full_grid'].GetCellData()
+        if self.var!=vs['var']:
+            full_cd.RemoveArray(self.var)
+            self.var=vs['var']
+
+        mask=set_visible_mats(props['full_grid'],plot.hidemat)
+        mask_filter=props['mask_filter']
+        mask_filter.Update()
+        vis_subs=mask_filter.GetOutput()
+        cd=vis_subs.GetCellData()
+        #same active scalars as make_vtk_plot
+        cd.SetActiveScalars('SM-IND' if any(vs['show_ori']) else vs['var'])
+
+        mapper=props['mapper']
+        surface_filter=props.get('surface_filter')
+        if surface_filter is None:
+            mapper.SetInputData(vis_subs) #clipping is applied again with VtkPlot.set_clipper
+        elif self._mask is not None and np.array_equal(mask,self._mask):
+            #results are copied to the current surface by cell id
+            update_surface_scalars(mapper.GetInput(),props['full_grid'],vs['var'],old_var)
+        else:
+            set_mapper_input(mapper,vis_subs,surface_filter)
+            self._mask=mask.copy()
+            changed.append('surface_filter')
+        srange = cd.GetArray(vs['var']).GetRange()
+        print('Actual Data Range in Plot: ', srange)
+        if vs['plot_range']:
+            mapper.SetScalarRange(vs['plot_range'])
+        else:
+            mapper.SetScalarRange(list(srange))
+
+        vs['title']=vs['var']
+        scalar_bar=props.get('scalar_bar')
+        if scalar_bar is not None and not vs['hide_var_title']:
+            if scalar_bar.GetTitle()!=vs['var']:
+                scalar_bar.SetTitle(vs['var'])
+                changed.append('scalar_bar')
+
+        text_actor=props.get('text_actor')
+        if text_actor is not None and text_actor.GetInput()!=vs['window_text']:
+            text_actor.SetInput(vs['window_text'])
+            changed.append('text_actor')
+
+        if dflag=='3D' and self._set_camera(vs):
+            changed.append('camera')
+
+        props['grid'].DeepCopy(vis_subs)
+        changed.append('grid')
+
+        plot.grid=props['grid']
+        plot.mask_filter=mask_filter
+        plot.surface_filter=surface_filter
+        plot.vis_subs_mapper=mapper
+
+        self.rw.Render()
+        if vs['make_video']:
+            write_video_frame(vs)
+
+        self.changed=changed
+        return changed
+
+    def _set_camera(self,vs):
+        """
+        function to apply the camera settings if they were changed since the plot was created
+        (e.g., with sync_3d_cameras), the current view is kept otherwise
+
+        Parameters:
+            vs (dict): vtk settings
+
+        Returns:
+            bool: True if the camera was changed
+        """
+
+        renderer=self.rw.GetRenderers().GetFirstRenderer()
+        camera=renderer.GetActiveCamera()
+        new=[vs[key] for key in CAMERA_KEYS]
+        if any(val is None or len(val)==0 for val in new) or _freeze(new)==self._camera:
+            return False
+        self._camera=_freeze(new)
+
+        current=(camera.GetFocalPoint(),camera.GetPosition(),camera.GetViewUp())
+        if np.allclose(current,np.asarray(new,dtype=float)): #e.g., stored after mouse events
+            return False
+
+        camera.SetFocalPoint(new[0])
+        camera.SetPosition(new[1])
+        camera.SetViewUp(new[2])
+        renderer.ResetCamera()
+        renderer.ResetCameraClippingRange()
+        return True
@@ -0,0 +1,71 @@
+"""Functions to hide materials with a cell mask instead of rebuilding the vtk pipeline"""
+import numpy as np
+from vtkmodules.vtkCommonCore import VTK_ID_TYPE # pylint: disable=E0611
+from vtkmodules.vtkCommonDataModel import vtkDataObject # pylint: disable=E0611
+from vtkmodules.vtkFiltersCore import vtkThreshold # pylint: disable=E0611
+from vtk.util.numpy_support import numpy_to_vtk,vtk_to_numpy # pylint: disable=E0401,E0611
+
+#name of the cell array used to show (1) or hide (0) each cell
+MASK_NAME = 'VISIBLE'
+
+
+def set_visible_mats(grid,hidemat):
+    """
+    Function to set the visibility mask of a grid from the materials to hide
+
+    Parameters:
+        grid (vtkDataSet): grid with an 'SM-IND' cell array
+        hidemat (list): ints of material integers to hide in the plot
+
+    Returns:
+        mask (np.ndarray): uint8 visibility of each cell, shared with the grid MASK_NAME array
+    """
+
+    cd=grid.GetCellData()
+    ncells=grid.GetNumberOfCells()
+    if not cd.HasArray(MASK_NAME) or cd.GetArray(MASK_NAME).GetNumberOfTuples()!=ncells:
+        vtk_arr=numpy_to_vtk(np.ones(ncells,dtype=np.uint8),deep=True)
+        vtk_arr.SetName(MASK_NAME)
+        cd.AddArray(vtk_arr)
+    vtk_arr=cd.GetArray(MASK_NAME)
+
+    #view of the vtk array, updated in place
+    mask=vtk_to_numpy(vtk_arr)
+    if hidemat and cd.HasArray('SM-IND'):
+        sm=vtk_to_numpy(cd.GetArray('SM-IND'))
+        mask[:]=~np.isin(sm.reshape(ncells,-1)[:,0],np.asarray(hidemat))
+    else:
+        mask[:]=1
+    vtk_arr.Modified()
+    return mask
+
+
+def make_mask_filter(grid,hidemat):
+    """
+    Function to create a persistent filter extracting the visible cells of a grid
+
+    Parameters:
+        grid (vtkDataSet): grid with an 'SM-IND' cell array
+        hidemat (list): ints of material integers to hide in the plot
+
+    Returns:
+        mask_filter (vtkThreshold): filter with the visible cells as output, rerun after
+                                    set_visible_mats to change the hidden materials
+    """
+
+    #ids of the full grid, kept in the output for labels and cell picking
+    cd=grid.GetCellData()
+    if not cd.HasArray('vtkOriginalCellIds'):
+        vtk_arr=numpy_to_vtk(np.arange(grid.GetNumberOfCells(),dtype=np.int64),deep=True,
+                             array_type=VTK_ID_TYPE)
+        vtk_arr.SetName('vtkOriginalCellIds')
+        cd.AddArray(vtk_arr)
+    set_visible_mats(grid,hidemat)
+
+    mask_filter=vtkThreshold()
+    mask_filter.SetInputData(grid)
+    mask_filter.SetInputArrayToProcess(0,0,0,vtkDataObject.FIELD_ASSOCIATION_CELLS,MASK_NAME)
+    mask_filter.SetThresholdFunction(vtkThreshold.THRESHOLD_UPPER)
+    mask_filter.SetUpperThreshold(0.5)
+    mask_filter.Update()
+    return mask_filter
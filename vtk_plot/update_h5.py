@@ -1,8 +1,9 @@
 """Updates input grid h5 results."""
+import os
 import numpy as np
 from vtk.util.numpy_support import numpy_to_vtk  # pylint: disable=E0401,E0611
-from util.convert_to_2nd_order_tensor import convert_to_2nd_order_tensor
-from util.convert_to_voigt import convert_to_voigt
+from .result_cache import RESULT_CACHE
+from .rotate_results import rotate_to_material
 
 def update_h5(grid,h5,ruc,vs,dflag):
     """
@@ -20,7 +21,73 @@ def update_h5(grid,h5,ruc,vs,dflag):
     """
 
     cell_data=grid.GetCellData()
-    array_names=[cell_data.GetArrayName(i) for i in range(cell_data.GetNumberOfArrays())]
+
+    if vs.get('cache_results',False):
+        base_key=get_cache_key(h5,ruc,vs,dflag)
+        ind=vs['ind']
+        h5data=RESULT_CACHE.get_or_compute(base_key+(ind,),
+                                    lambda: get_h5_result(h5,ruc,vs,dflag,ind))
+
+        #read the next increments in the background while the current one is plotted
+        nfetch=vs.get('prefetch_incs',0)
+        if nfetch:
+            step=RESULT_CACHE.step_direction(base_key,ind)
+            vs_copy=dict(vs)
+            fetch=[i for i in range(ind+step,ind+step*(nfetch+1),step) if 0<=i<h5.ninc]
+            RESULT_CACHE.prefetch([(base_key+(i,),
+                                    lambda i=i: get_h5_result(h5,ruc,vs_copy,dflag,i,echo=False))
+                                    for i in fetch])
+    else:
+        h5data=get_h5_result(h5,ruc,vs,dflag,vs['ind'])
+
+    #arrays with the same name are replaced, numpy data is referenced rather than copied
+    h5d = numpy_to_vtk(h5data, deep=False)
+    h5d.SetNumberOfComponents(1)
+    h5d.SetName(vs['var'])
+    cell_data.AddArray(h5d)
+
+
+def get_cache_key(h5,ruc,vs,dflag):
+    """
+    Function to get the result cache key (without the increment) for the plotted result
+
+    Parameters:
+        h5 (GetH5 class): class containing h5 data
+        ruc (dict): ruc parameters
+        vs (dict) : vtk settings
+        dflag (str): problem definition
+
+    Returns:
+        tuple: cache key
+    """
+
+    res=vs['selected_result']
+    grp_key=(vs['h5-parent'],res['lvl'],res['ruc'],res['matnum'],res['subvol'],
+             res['parent-NB'],res['parent-NG'])
+    scale=tuple(sorted(vs['scale_res'].items())) if vs['scale_res'] else None
+    vmap=tuple(sorted(vs['map'].items())) if vs['var']=='MATNUM' else None
+
+    #results of a re-run written to the same file have a new size or modification time
+    st=os.stat(h5.h5name)
+    return (h5.h5name,st.st_size,st.st_mtime,grp_key,vs['var'],vs['comp'],
+            vs['rotate_to_material'],scale,dflag,ruc['nb'],ruc['ng'],vmap)
+
+
+def get_h5_result(h5,ruc,vs,dflag,ind,echo=True):
+    """
+    Function to read, rotate, and flatten h5 results for one increment
+
+    Parameters:
+        h5 (GetH5 class): class containing h5 data
+        ruc (dict): ruc parameters
+        vs (dict) : vtk settings
+        dflag (str): problem definition
+        ind (int): 0-based increment number
+        echo (bool): option to control screen printing
+
+    Returns:
+        h5data (np.ndarray): flattened float32 cell data
+    """
 
     res=vs['selected_result']
     lvl = res['lvl']
@@ -34,38 +101,16 @@ def update_h5(grid,h5,ruc,vs,dflag):
         grp=vs['h5-parent']
     else:
         grp=None
-    h5str=h5.get_data_str(lvl,pid,msm,ic,nb,ng,1,1,1,vs['ind']+1,grp)
-    print('Plotting data at H5 location: ', h5str)
+    h5str=h5.get_data_str(lvl,pid,msm,ic,nb,ng,1,1,1,ind+1,grp)
+    if echo:
+        print('Plotting data at H5 location: ', h5str)
     h5grp=h5.get_data_by_str(h5str)
     h5data=h5grp[f"{vs['var']}"][:,:,:,:,:,:,:]
 
     #Rotate to material coordinate system if necessary
     if vs['rotate_to_material']:
-
-        allowed_rotations=['Strain','ME.Strain','IN.Strain','TH.Strain','ALPHA','Stress']
-        eng_shear=True
-        if vs['var'] in allowed_rotations:
-            perform_rotation=True
-            if vs['var']=='Stress':
-                eng_shear=False
-        else:
-            perform_rotation=False
-            print(f"Rotation not performed for {vs['var']}")
-
-        if perform_rotation and 'ROT' not in h5grp:
-            print('WARNING: ROT array not available to rotate to material axes.')
-            perform_rotation = False
-
-        if perform_rotation:
-            orig_shape=h5data.shape
-            data_per_cell = h5data.reshape(-1,h5data.shape[-1])
-            rotdata=np.array(h5grp['ROT'][:,:,:,:,:,:,:])
-            rot = rotdata.reshape(-1,rotdata.shape[-1]).reshape((-1, 3, 3))
-            rott = np.transpose(rot, axes=(0, 2, 1))
-            global_tensors=convert_to_2nd_order_tensor(data_per_cell,eng_shear=eng_shear)
-            local_tensors = rot @ global_tensors @ rott
-            newdata=convert_to_voigt(local_tensors,eng_shear=eng_shear)
-            h5data=newdata.reshape(orig_shape)
+        h5data=rotate_to_material(h5grp,h5data,vs['var'],echo=echo,
+                                  cache_key=(h5.h5name,os.path.dirname(h5str)))
 
     if dflag=='2D':
         nx,ny,nz = 1,ruc['nb'],ruc['ng']
@@ -98,13 +143,4 @@ def update_h5(grid,h5,ruc,vs,dflag):
             if func=='abs':
                 h5data=np.abs(h5data)
 
-    if vs['var'] not in array_names:
-        h5d = numpy_to_vtk(h5data.flatten())
-        h5d.SetNumberOfComponents(1)
-        h5d.SetName(vs['var'])
-        cell_data.AddArray(h5d)
-    else:
-        h5d=cell_data.GetArray(vs['var'])
-        h5f=h5data.flatten()
-        h5d.SetVoidArray(h5f,len(h5f),1)
-        h5d.Modified()
+    return np.ascontiguousarray(h5data,dtype=np.float32).ravel()
@@ -1,7 +1,8 @@
 """class for creating vtk plots of grid objects with and without results shown """
+import time
 import cv2
 from vtkmodules.vtkRenderingCore import vtkWindowToImageFilter,vtkActor,vtkPolyDataMapper # pylint: disable=E0611
-from vtkmodules.vtkCommonDataModel import vtkPolyData # pylint: disable=E0611
+from vtkmodules.vtkCommonDataModel import vtkPolyData,vtkUnstructuredGrid # pylint: disable=E0611
 from vtkmodules.vtkFiltersSources import vtkOutlineSource # pylint: disable=E0611
 from vtkmodules.vtkInteractionWidgets import vtkBoxWidget # pylint: disable=E0611
 from vtkmodules.vtkFiltersCore import vtkImplicitPolyDataDistance # pylint: disable=E0611
@@ -10,13 +11,18 @@ from .vtk_plot_2D_3D import vtk_plot_2d_3d
 from .vtk_plot_stacks import vtk_plot_stacks
 from .vtk_plot_ugrid import vtk_plot_ugrid
 from .vtk_plot_MT import vtk_plot_mt
+from .set_visible_mats import set_visible_mats
+from .make_surface import set_mapper_input
+from .clip_index import ClipIndex,CLIP_INTERVAL,get_box_planes,get_index_key
+from .scene_manager import SceneManager
 
 class VtkPlot():
     """
     VtkPlot - creates vtk plots based for unit cells and finite element meshes
     """
     def __init__(self, opt='2DR', ruc=None, h5=None, hidemat=None, rw=None, vs=None,
-                all_rucs=None, grp_mats=None,no_stack=None,sweep=None,update_res_only=False):
+                all_rucs=None, grp_mats=None,no_stack=None,sweep=None,update_res_only=False,
+                scene=None):
         """
         initialize class
 
@@ -31,6 +37,8 @@ class VtkPlot():
         grp_mats (dict): mapping from mapped sm value to new desired value
         no_stack(list): rucs to not plot as stacks
         sweep(tuple): two start/finish increments for plotting
+        scene (SceneManager): objects of the current plot in rw, reused when only the
+                              results change (a new SceneManager is used if None)
 
         Returns:
             None.
@@ -52,6 +60,10 @@ class VtkPlot():
         self.update_res_only=update_res_only
         self.grid=None
         self.box_widget_init=None
+        self.mask_filter=None
+        self.surface_filter=None
+        self.update_slicing=None
+        self.scene=scene if scene is not None else SceneManager(rw)
 
     def _start_render(self):
         """
@@ -140,7 +152,10 @@ class VtkPlot():
             None.
         """
 
-        grid=self.vis_subs_mapper.GetInput()
+        if self.mask_filter is not None:
+            grid=self.mask_filter.GetOutput()
+        else:
+            grid=self.vis_subs_mapper.GetInput()
         bounds = grid.GetBounds()
         if not new_bounds:
             update_init=False
@@ -170,6 +185,7 @@ class VtkPlot():
         box_actor.SetMapper(box_mapper)
         box_actor.GetProperty().SetColor(1, 0, 0)  #red
         box_actor.VisibilityOff()
+        self.scene.replace_prop('box_actor',box_actor)
         self.rw.GetRenderers().GetFirstRenderer().AddActor(box_actor)
 
         #Add a vtkBoxWidget for interactivity
@@ -180,9 +196,12 @@ class VtkPlot():
         box_widget.PlaceWidget(new_bounds)
         # box_widget.SetHandleSize(0.1)
         box_widget.Off()  # Start with the widget disabled
+        self.scene.replace_prop('box_widget',box_widget)
 
         #Use an implicit distance function to decide what cells are inside a the box widget
+        #(grids without a spatial index, see ClipIndex)
         implicit_distance = vtkImplicitPolyDataDistance()
+        last_update=[0.0]
 
         # Filter to extract cells within the box - excludes boundary cells
         def _update_slicing(widget, event): #pylint: disable=W0613
@@ -191,23 +210,37 @@ class VtkPlot():
 
             Parameters:
                 widget (vtkBoxWidget): object to update
-                event (str): name of event (not used)
+                event (str): name of event, updates are throttled and rotated boxes are
+                             only clipped by their bounds during 'InteractionEvent'
             Returns:
                 None.
             """
+            dragging=event=='InteractionEvent'
+            if dragging and time.perf_counter()-last_update[0]<CLIP_INTERVAL:
+                return
+
             polydata = vtkPolyData()
             widget.GetPolyData(polydata)
-            implicit_distance.SetInput(polydata)
             self.vs['slicer-bounds']=polydata.GetBounds()
-            extract_geometry = vtkExtractGeometry()
-            extract_geometry.SetImplicitFunction(implicit_distance)
-            extract_geometry.SetInputData(grid)
-            extract_geometry.Update()
-
-            self.vis_subs_mapper.SetInputData(extract_geometry.GetOutput())
+            clip_index=self._get_clip_index(grid)
+            if clip_index is not None:
+                planes=None if dragging else get_box_planes(polydata)
+                clipped=clip_index.extract(clip_index.query(polydata.GetBounds(),planes))
+            else:
+                implicit_distance.SetInput(polydata)
+                extract_geometry = vtkExtractGeometry()
+                extract_geometry.SetImplicitFunction(implicit_distance)
+                extract_geometry.SetInputData(grid)
+                extract_geometry.Update()
+                clipped=extract_geometry.GetOutput()
+
+            set_mapper_input(self.vis_subs_mapper,clipped,self.surface_filter)
             self.rw.Render()
+            last_update[0]=time.perf_counter()
 
         box_widget.AddObserver("InteractionEvent", _update_slicing)
+        box_widget.AddObserver("EndInteractionEvent", _update_slicing)
+        self.update_slicing=lambda: _update_slicing(box_widget,None)
         if update_init:
             _update_slicing(box_widget,None)
 
@@ -215,6 +248,65 @@ class VtkPlot():
         self.box_widget=box_widget
         self.box_actor=box_actor
 
+    def _get_clip_index(self,grid):
+        """
+        function to get the spatial index used to clip a grid, the index is kept by the
+        scene and reused while the grid has the same cells (e.g., for new results)
+
+        Parameters:
+            grid (vtkDataSet): grid to clip
+
+        Returns:
+            ClipIndex: index of grid (None if grid is not an unstructured grid from
+                       make_mask_filter)
+        """
+
+        if not isinstance(grid,vtkUnstructuredGrid) or get_index_key(grid) is None:
+            return None
+        clip_index=self.scene.props.get('clip_index')
+        if clip_index is None or not clip_index.matches(grid):
+            clip_index=ClipIndex(grid)
+            self.scene.props['clip_index']=clip_index
+        clip_index.grid=grid
+        return clip_index
+
+    def set_hidemat(self,hidemat):
+        """
+        function to change the hidden materials of the current plot by updating the
+        visibility mask, the vtk pipeline is not rebuilt
+
+        Parameters:
+            hidemat (list): ints of material integers to hide in the plot
+
+        Returns:
+            bool: False if there is no plot to update
+        """
+
+        self.hidemat=hidemat
+        if self.mask_filter is None:
+            return False
+
+        vis_subs=self.mask_filter.GetOutput()
+        scalars=vis_subs.GetCellData().GetScalars()
+        set_visible_mats(self.mask_filter.GetInput(),hidemat)
+        self.mask_filter.Update()
+        if scalars is not None: #active scalars are reset by the filter
+            vis_subs.GetCellData().SetActiveScalars(scalars.GetName())
+        self.grid.DeepCopy(vis_subs)
+
+        if self.surface_filter is not None:
+            shown=self.surface_filter.GetInput()
+        else:
+            shown=self.vis_subs_mapper.GetInput()
+        if self.update_slicing and shown is not vis_subs:
+            self.update_slicing() #clipped cells are extracted again
+        elif self.surface_filter is not None:
+            set_mapper_input(self.vis_subs_mapper,vis_subs,self.surface_filter)
+        else:
+            self.vis_subs_mapper.Modified()
+        self.rw.Render()
+        return True
+
     def get_clipper(self):
         """
         returns objects from RUC clipper
@@ -16,6 +16,11 @@ def vtk_plot_2d_3d(self,dflag='2D'):
     Returns:
         None
     """
+    if self.scene.can_update(self,dflag): #only the results array is replaced
+        update_h5(self.scene.props['full_grid'],self.h5,self.ruc,self.vs,dflag)
+        self.scene.update_scalars(self,dflag)
+        return
+
     if not self.update_res_only:
         self.grid = make_grid_2d_3d(self.ruc,self.vs['map'],dflag)
 
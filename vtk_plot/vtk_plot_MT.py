@@ -6,9 +6,9 @@ from vtkmodules.vtkCommonDataModel import vtkPolyData,vtkSphere,vtkImplicitBoole
 from vtkmodules.vtkFiltersCore import vtkAppendPolyData,vtkClipPolyData # pylint: disable=E0611
 from vtkmodules.vtkCommonTransforms import vtkTransform # pylint: disable=E0611
 from vtkmodules.vtkFiltersSources import vtkPlaneSource # pylint: disable=E0611
-from util.convert_to_2nd_order_tensor import convert_to_2nd_order_tensor
-from util.convert_to_voigt import convert_to_voigt
 from .make_vtk_plot import make_vtk_plot
+from .make_grid_2D_3D import add_index_arrays
+from .rotate_results import rotate_to_material
 
 def get_fiber_matrix_pd(vf,sm,vmap=None): #pylint: disable=R0915
     """
@@ -132,30 +132,7 @@ def vtk_plot_mt(self):
 
         #Rotate to material coordinate system if necessary
         if vs['rotate_to_material']:
-            allowed_rotations=['Strain','ME.Strain','IN.Strain','TH.Strain','ALPHA','Stress']
-            eng_shear=True
-            if vs['var'] in allowed_rotations:
-                perform_rotation=True
-                if vs['var']=='Stress':
-                    eng_shear=False
-            else:
-                perform_rotation=False
-                print(f"Rotation not performed for {vs['var']}")
-
-            if perform_rotation and 'ROT' not in h5grp:
-                print('WARNING: ROT array not available to rotate to material axes.')
-                perform_rotation = False
-
-            if perform_rotation:
-                orig_shape=h5data.shape
-                data_per_cell = h5data.reshape(-1,h5data.shape[-1])
-                rotdata=np.array(h5grp['ROT'][:,:,:,:,:,:,:])
-                rot = rotdata.reshape(-1,rotdata.shape[-1]).reshape((-1, 3, 3))
-                rott = np.transpose(rot, axes=(0, 2, 1))
-                global_tensors=convert_to_2nd_order_tensor(data_per_cell,eng_shear=eng_shear)
-                local_tensors = rot @ global_tensors @ rott
-                newdata=convert_to_voigt(local_tensors,eng_shear=eng_shear)
-                h5data=newdata.reshape(orig_shape)
+            h5data=rotate_to_material(h5grp,h5data,vs['var'])
 
         h5data=h5data[:,:,:,:,:,:,vs['comp']]
         h5data=np.moveaxis(h5data,0,2)
@@ -189,6 +166,13 @@ def vtk_plot_mt(self):
 
     pdall = vtkPolyData()
     pdall.DeepCopy(pdappend.GetOutput())
+    #matrix (subvolume 0,1,0) cells are before fiber (subvolume 0,0,0) cells
+    ib=np.arange(pdall.GetNumberOfCells())<matrix_pd.GetNumberOfCells()
+    sm=np.asarray(ruc['sm'])
+    mats=np.where(ib,sm[0][1][0],sm[0][0][0])
+    if vs['map']:
+        mats=np.vectorize(vs['map'].get)(mats)
+    add_index_arrays(pdall,0,ib,0,rucid=mats)
     self.grid=pdall
 
     dflag='2D'
@@ -1,12 +1,19 @@
 """Function to create a 3D unstructured grid.""" 
+import os
+from collections import OrderedDict
 import numpy as np
 from vtkmodules.vtkCommonCore import vtkPoints  # pylint: disable=E0611
 from vtkmodules.vtkCommonDataModel import (vtkUnstructuredGrid,vtkCellArray) # pylint: disable=E0611
 from vtk.util.numpy_support import numpy_to_vtk # pylint: disable=E0401,E0611
 from vtk import VTK_HEXAHEDRON # pylint: disable=E0611
 from .make_vtk_plot import make_vtk_plot
+from .make_grid_2D_3D import add_index_arrays
 
-def vtk_plot_ugrid(self,dflag='2D',macroapi=False): #pylint: disable=R0914
+#number of MacroAPI meshes kept, one per h5 file
+UGRID_CACHE_LEN = 4
+_UGRID_CACHE = OrderedDict()
+
+def vtk_plot_ugrid(self,dflag='2D',macroapi=False):
     """
     Makes a 3D unstructured grid for visualization
 
@@ -21,60 +28,135 @@ def vtk_plot_ugrid(self,dflag='2D',macroapi=False): #pylint: disable=R0914
     vs=self.vs
     h5=self.h5
 
-    if macroapi:
-        mesh = h5['MACROAPI MESH']
-        print('WARNING: MACROAPI only set up for plotting hexahedrons...')
-    else:
+    if macroapi and self.scene.can_update(self,dflag): #only the results array is replaced
+        add_macroapi_results(self.scene.props['full_grid'],h5,vs)
+        self.scene.update_scalars(self,dflag)
+        return
+
+    if not macroapi:
         print('Ugrid not set up to plot NASMAT standalone results...')
         return
 
     if dflag=='2D':
         print('Ugrid not setup for plotting 2D')
 
+    #copy of the cached mesh, results added to it are not kept in the cache
+    base=get_macroapi_grid(h5)
+    grid=vtkUnstructuredGrid()
+    grid.ShallowCopy(base)
+
+    if vs['show_res']:
+        add_macroapi_results(grid,h5,vs)
+
+    self.grid=grid
+    make_vtk_plot(self,dflag,macroapi=macroapi)
+
+
+def add_macroapi_results(grid,h5,vs):
+    """
+    Adds the selected MacroAPI results to the grid cell data
+
+    Parameters:
+        grid (vtkUnstructuredGrid): MacroAPI grid
+        h5 (h5py.File): h5 file containing MacroAPI results
+        vs (dict): vtk settings
+
+    Returns:
+        None.
+    """
+
+    res = h5['MACROAPI RESULTS']
+    grp=f"Inc={vs['ind']+1}/{vs['var']}"
+    cmap={0:0,1:1,2:2,3:4,4:5,5:3}
+    h5res = numpy_to_vtk(num_array=res[grp][:,cmap[vs['comp']]], deep=True)
+    h5res.SetNumberOfComponents(1)
+    h5res.SetName(vs['var'])
+    grid.GetCellData().AddArray(h5res)
+
+
+def get_macroapi_grid(h5):
+    """
+    Gets the MacroAPI mesh of an h5 file as an unstructured grid. Grids are cached by
+    file name and modification time, so changing variables or increments does not
+    rebuild the mesh.
+
+    Parameters:
+        h5 (h5py.File): h5 file containing the MacroAPI mesh
+
+    Returns:
+        grid (vtkUnstructuredGrid): mesh with 'SM-IND' and element id cell arrays, shared
+                                    with the cache (use a shallow copy to add arrays)
+    """
+
+    fname=getattr(h5,'filename',None)
+    key=(os.path.abspath(fname),os.path.getmtime(fname)) if fname and os.path.isfile(fname) \
+        else None
+    if key in _UGRID_CACHE:
+        _UGRID_CACHE.move_to_end(key)
+        return _UGRID_CACHE[key]
+
+    grid=make_macroapi_grid(h5['MACROAPI MESH'])
+    if key is not None:
+        _UGRID_CACHE[key]=grid
+        if len(_UGRID_CACHE)>UGRID_CACHE_LEN:
+            _UGRID_CACHE.popitem(last=False)
+    return grid
+
+
+def make_macroapi_grid(mesh):
+    """
+    Makes an unstructured grid from a MacroAPI mesh
+
+    Parameters:
+        mesh (h5py.Group): 'MACROAPI MESH' group with node coordinates, node numbers,
+                           and elements (id, deck material, connectivity)
+
+    Returns:
+        grid (vtkUnstructuredGrid): grid with 'SM-IND' and element id cell arrays
+    """
+
+    print('WARNING: MACROAPI only set up for plotting hexahedrons...')
+
     #get nodal coordinates
-    points=np.array(mesh['Node Coords'])
-    # Create a VTK data array from the NumPy array
-    points_data = numpy_to_vtk(num_array=points, deep=True)
-    # Set the number of components (3 for 3D points)
-    points_data.SetNumberOfComponents(3)
-    # Set the data array for the vtkPoints object
+    points=np.ascontiguousarray(mesh['Node Coords'][()],dtype=np.float64)
     pts = vtkPoints()
-    pts.SetData(points_data)
-
-    # Create a mapping function
-    nodemap = {node_id: row_number for row_number, node_id in enumerate(mesh['Node Numbers'])}
-    map_node_id_to_row_number = np.vectorize(nodemap.get)
+    pts.SetData(numpy_to_vtk(num_array=points, deep=True))
 
-    # Apply the mapping function to the element connectivity
-    ecmod = map_node_id_to_row_number(mesh['Elements'][:,2:]) #from element connectivity
+    #map node numbers in the element connectivity to point rows
+    elements=mesh['Elements'][()]
+    node_nums=np.asarray(mesh['Node Numbers'][()]).ravel()
+    order=np.argsort(node_nums,kind='stable')
+    sorted_nums=node_nums[order]
+    conn=elements[:,2:]
+    pos=np.searchsorted(sorted_nums,conn)
+    pos[pos==sorted_nums.size]=0
+    missing=sorted_nums[pos]!=conn
+    if missing.any():
+        raise ValueError(f"MacroAPI elements use undefined nodes: {np.unique(conn[missing])[:10]}")
+    ecmod=order[pos].astype(np.int64)
 
-    #create cell array
+    #create cell array from offsets and connectivity
+    npe=ecmod.shape[1]
     cells = vtkCellArray()
-    [cells.InsertNextCell(len(c), c) for c in ecmod] #pylint: disable=W0106
+    cells.SetData(numpy_to_vtk(np.arange(0,ecmod.size+1,npe,dtype=np.int64),deep=True),
+                  numpy_to_vtk(ecmod.ravel(),deep=True))
 
     # Create an unstructured grid
     grid = vtkUnstructuredGrid()
     grid.SetPoints(pts) #set points
     grid.SetCells(VTK_HEXAHEDRON, cells) #set cells
 
-    decknum = numpy_to_vtk(num_array=mesh['Elements'][:,1], deep=True)
+    decknum = numpy_to_vtk(num_array=np.ascontiguousarray(elements[:,1]), deep=True)
     decknum.SetNumberOfComponents(1)
     decknum.SetName("SM-IND")
     grid.GetCellData().AddArray(decknum)
 
-    enum = numpy_to_vtk(num_array=mesh['Elements'][:,0], deep=True)
+    enum = numpy_to_vtk(num_array=np.ascontiguousarray(elements[:,0]), deep=True)
     enum.SetNumberOfComponents(1)
     enum.SetName("MarcoAPI Element ID")
     grid.GetCellData().AddArray(enum)
 
-    if vs['show_res']:
-        res = h5['MACROAPI RESULTS']
-        grp=f"Inc={vs['ind']+1}/{vs['var']}"
-        cmap={0:0,1:1,2:2,3:4,4:5,5:3}
-        h5res = numpy_to_vtk(num_array=res[grp][:,cmap[vs['comp']]], deep=True)
-        h5res.SetNumberOfComponents(1)
-        h5res.SetName(vs['var'])
-        grid.GetCellData().AddArray(h5res)
+    #elements have no subvolumes, IA is the element row
+    add_index_arrays(grid,np.arange(grid.GetNumberOfCells()),0,0,rucid=elements[:,1])
 
-    self.grid=grid
-    make_vtk_plot(self,dflag,macroapi=macroapi)
+    return grid
@@ -10,7 +10,8 @@ from vtk.qt.QVTKRenderWindowInteractor import QVTKRenderWindowInteractor # pylin
 from PyQt5 import QtCore, QtWidgets
 from PyQt5.QtWidgets import QApplication,QTabWidget,QTreeWidget,QWidget,QComboBox # pylint: disable=E0611
 
-from vtk_plot import VtkPlot
+from vtk_plot import VtkPlot,SceneManager
+from vtk_plot.make_surface import get_original_cell_id
 from Gen_VTK_Plot_2DWeave import Gen_VTK_Plot_2DWeave
 from util.cell_id_to_indices import cell_id_to_indices
 
@@ -62,6 +63,7 @@ class vtk_widget(QtWidgets.QWidget):  #pylint: disable=I1101,C0103,R0902
 
         self.grid=None
         self.vp = None
+        self.scene = SceneManager(render_window)
         self.clip_box_widget=None
         self.clip_box_actor=None
         self.clip_box_init=None
@@ -145,7 +147,9 @@ class vtk_widget(QtWidgets.QWidget):  #pylint: disable=I1101,C0103,R0902
         if picked_cell_id != -1:
             #account for case where edges are hovered over (vtkPolyData objects)
             dataset = self.cellpicker.GetDataSet()
-            if not isinstance(dataset, vtkUnstructuredGrid):
+            #surface_only plots pick surface polygons with the cell arrays of their element
+            surface=get_original_cell_id(dataset,picked_cell_id)!=-1
+            if not isinstance(dataset, vtkUnstructuredGrid) and not surface:
                 return
 
             npp=NASMATPrePost()
@@ -183,10 +187,16 @@ class vtk_widget(QtWidgets.QWidget):  #pylint: disable=I1101,C0103,R0902
 
             #TODO: verify key_input logic
             # Grid=self.get_grid_from_renderer()
-            cids=self.grid.GetCellData().GetArray('vtkOriginalCellIds')
-            actual_cell_id=cids.GetValue(picked_cell_id)
-            ix,iy,iz = cell_id_to_indices(actual_cell_id,self.grid,
-                                        irregular=macroapi,key_input=key_input)
+            if surface or dataset.GetCellData().HasArray('IA'):
+                #cell arrays of the picked (visible, clipped, or surface) cells
+                ix,iy,iz = cell_id_to_indices(picked_cell_id,dataset,
+                                            irregular=macroapi,key_input=key_input,
+                                            dflag=dflag)
+            else:
+                cids=self.grid.GetCellData().GetArray('vtkOriginalCellIds')
+                actual_cell_id=cids.GetValue(picked_cell_id)
+                ix,iy,iz = cell_id_to_indices(actual_cell_id,self.grid,
+                                            irregular=macroapi,key_input=key_input)
 
 
             if not macroapi and dflag=='2D':
@@ -315,6 +325,7 @@ class vtk_widget(QtWidgets.QWidget):  #pylint: disable=I1101,C0103,R0902
             if self.vp:
                 self.clip_box_widget.PlaceWidget(self.clip_box_init)
                 self.vp.set_clipper(new_bounds=self.clip_box_init)
+                self.clip_box_widget,self.clip_box_actor,_=self.vp.get_clipper()
         elif key=='1': #reset camera to default view
             if self.vp:
                 npp=NASMATPrePost()
@@ -377,7 +388,7 @@ class vtk_widget(QtWidgets.QWidget):  #pylint: disable=I1101,C0103,R0902
                 ruc={}
                 self.vp=VtkPlot(opt=vs[id(ci)]['plot_opt'],ruc=ruc, h5=m1['h5'].file,
                                  hidemat=m1['HideMat'],rw=self.render_window, vs=vs[id(ci)],
-                                 update_res_only=update_res_only,sweep=sweep)
+                                 update_res_only=update_res_only,sweep=sweep,scene=self.scene)
                 self.vp.start()
                 self.vp.set_clipper(new_bounds=vs[id(ci)]['slicer-bounds'])
                 self.grid=self.vp.grid
@@ -408,7 +419,8 @@ class vtk_widget(QtWidgets.QWidget):  #pylint: disable=I1101,C0103,R0902
 
                 self.vp=VtkPlot(opt=vs[id(ci)]['plot_opt'], ruc=ruc, h5=h5,
                                  hidemat=nasmat[file]['hide_mat'], rw=self.render_window,
-                                 vs=vs[id(ci)],update_res_only=update_res_only,sweep=sweep)
+                                 vs=vs[id(ci)],update_res_only=update_res_only,sweep=sweep,
+                                 scene=self.scene)
                 self.vp.start()
                 self.vp.set_clipper(new_bounds=vs[id(ci)]['slicer-bounds'])
                 self.grid=self.vp.grid
@@ -416,10 +428,32 @@ class vtk_widget(QtWidgets.QWidget):  #pylint: disable=I1101,C0103,R0902
 
         elif vs[id(ci)]['PlotMode']=='Woven2D':
             vs[id(ci)]['rotate_grid']=False #disable grid rotations
+            self.scene.clear()
             vp=Gen_VTK_Plot_2DWeave(vs[id(ci)]['tmp_2Dweave'], self.render_window,
                                     show_mats=vs[id(ci)]['show_mats'])
             self.grid=vp.grid
 
+    def set_hidemat(self,hidemat):
+        """
+        Function to change the hidden materials, the current plot is updated in place
+        when possible instead of being re-created
+
+        Parameters:
+            hidemat (list): ints of material integers to hide in the plot
+
+        Returns:
+            None.
+        """
+
+        npp=NASMATPrePost()
+        vs = npp.get('vtk_settings')
+        ci = npp.get('selected')
+
+        if (vs[id(ci)]['PlotMode']=='Main' and self.vp and not self.vp.sweep and
+                self.vp.set_hidemat(hidemat)):
+            return
+        self.update()
+
     def get_camera(self):
         """
         Function getting camera parameters
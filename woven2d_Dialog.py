@@ -7,6 +7,7 @@ from vtk.util.numpy_support import vtk_to_numpy #pylint: disable=E0401,E0611
 from NASMAT_PrePost import NASMATPrePost
 from util.get_default_vtk_settings import get_default_vtk_settings
 from util.stackify import Stackify
+from util.get_ori_vectors import set_crot_oris
 
 
 class woven2d_Dialog(QDialog): #pylint: disable=C0103,R0902
@@ -244,33 +245,7 @@ class woven2d_Dialog(QDialog): #pylint: disable=C0103,R0902
         Returns:
             None.
         """
-        sz=r['sm'].size
-        sh=r['sm'].shape
-        r['ORI_X1'] = np.zeros((sz,3),dtype=float)
-        r['ORI_X2'] = np.zeros((sz,3),dtype=float)
-        r['ORI_X3'] = np.zeros((sz,3),dtype=float)
-        for ori in r['crot']:
-            #extract nasmat subvolume indices
-            ia,ib,ig = ori[0:3]
-            #assuming d1, calculate other two vectors for coordinate system
-            d1=np.array(ori[3:])
-            if abs(d1[0])<1e-9: #fix for singularity in d2 calc
-                d1[0] = 1e-9
-            d2=np.array([-(d1[1]**2 +d1[2]**2)/d1[0],d1[1],d1[2]])
-            d3=np.array([0.0,-(d1[0]*d1[2] - d2[0]*d1[2]),
-                         d1[0]*d1[1] - d2[0]*d1[1]])
-            #convert all vectors into unit vectors
-            d1=d1/np.linalg.norm(d1)
-            d2=d2/np.linalg.norm(d2)
-            d3=d3/np.linalg.norm(d3)
-            #assign to appropriate position in ori array
-            iloc = (ig-1) * (sh[1] * sh[2]) + (ib-1) * sh[2] + (ia-1)
-            r['ORI_X1'][iloc]=d1
-            r['ORI_X2'][iloc]=d2
-            r['ORI_X3'][iloc]=d3
-        r['ORI_X1_NORM']=np.sqrt(np.sum(r['ORI_X1']**2,axis=1))
-        r['ORI_X2_NORM']=np.sqrt(np.sum(r['ORI_X2']**2,axis=1))
-        r['ORI_X3_NORM']=np.sqrt(np.sum(r['ORI_X3']**2,axis=1))
+        set_crot_oris(r,r['crot'])
 
     def cancel_2dwoven_ruc(self):
         """